@@ -0,0 +1,205 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import functools
+import os
+import random
+import threading
+
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+from socketserver import ThreadingMixIn
+
+from PIL import Image
+
+# the words of the text of the pages
+WORDS = ['statification', 'cornetto', 'lorem', 'ipsum', 'dolor', 'sit', 'amet', 'consectetur', 'adipiscing', 'elit',
+         'sed', 'do', 'eiusmod', 'tempor', 'incididunt', 'ut', 'labore', 'et', 'dolore', 'magna', 'aliqua']
+
+
+class QuietRequestHandler(SimpleHTTPRequestHandler):
+    """
+    Serve the files of the synthetic site with keep-alive connections and without logging every request
+    """
+    protocol_version = 'HTTP/1.1'
+
+    def log_message(self, format, *args):
+        pass
+
+
+class ThreadingHTTPServer(ThreadingMixIn, HTTPServer):
+    daemon_threads = True
+
+
+class SyntheticSite(object):
+    """
+    A website generated into a directory and served by a local HTTP server, to benchmark the crawler. The site is
+    the same for the same parameters and seed :
+    - pages     :   /index.html and /pages/<i>.html, each one links to i_fanout pages so they are all reachable from
+                    the index, some links are absolute so they are rewritten by the url regex of the crawler
+    - css       :   /assets/css/<i>.css, linked by the pages, they reference images with url()
+    - js        :   /assets/js/<i>.js, linked by the pages
+    - images    :   /assets/img/<i>.png, linked by the pages and the CSS files
+    - binaries  :   /files/<i>.zip of i_binary_size random bytes, linked by the pages, they are streamed by the crawler
+                    if they are larger than MIRRORING_STREAM_MIN_SIZE
+    """
+    def __init__(self, s_directory: str, i_pages: int = 1000, i_fanout: int = 10, i_css: int = 10, i_js: int = 10,
+                 i_images: int = 50, i_binaries: int = 2, i_binary_size: int = 2097152, i_page_size: int = 4096,
+                 i_seed: int = 0):
+        """
+        :param s_directory: the directory where the site is generated
+        :param i_pages: the number of pages, the index excluded
+        :param i_fanout: the number of links to other pages of each page
+        :param i_css: the number of CSS files
+        :param i_js: the number of JS files
+        :param i_images: the number of images
+        :param i_binaries: the number of large binary files
+        :param i_binary_size: the size of each binary file in bytes
+        :param i_page_size: the approximate size of the text of each page in bytes
+        :param i_seed: the seed of the generation of the site
+        """
+        self.s_directory = s_directory
+        self.i_pages = max(i_pages, 1)
+        self.i_fanout = max(i_fanout, 1)
+        self.i_css = i_css
+        self.i_js = i_js
+        self.i_images = i_images
+        self.i_binaries = i_binaries
+        self.i_binary_size = i_binary_size
+        self.i_page_size = i_page_size
+        self.i_seed = i_seed
+        self.server = None
+        self.s_base_url = None
+
+    def get_parameters(self) -> dict:
+        """
+        :return: the parameters of the site, as saved with the results of a benchmark
+        """
+        return {
+            'pages': self.i_pages,
+            'fanout': self.i_fanout,
+            'css': self.i_css,
+            'js': self.i_js,
+            'images': self.i_images,
+            'binaries': self.i_binaries,
+            'binary_size': self.i_binary_size,
+            'page_size': self.i_page_size,
+            'seed': self.i_seed
+        }
+
+    def start(self) -> str:
+        """
+        Start the HTTP server on a free port of the local host
+        :return: the url of the site
+        """
+        handler = functools.partial(QuietRequestHandler, directory=self.s_directory)
+        self.server = ThreadingHTTPServer(('127.0.0.1', 0), handler)
+        threading.Thread(target=self.server.serve_forever, name='SyntheticSite', daemon=True).start()
+        self.s_base_url = 'http://127.0.0.1:' + str(self.server.server_address[1]) + '/'
+        return self.s_base_url
+
+    def stop(self):
+        """
+        Stop the HTTP server
+        """
+        if self.server is not None:
+            self.server.shutdown()
+            self.server.server_close()
+            self.server = None
+
+    def write(self, s_path: str, content):
+        """
+        Write a file of the site
+        :param s_path: the path of the file in the site
+        :param content: the content, str or bytes
+        """
+        s_filename = os.path.join(self.s_directory, s_path.lstrip('/'))
+        os.makedirs(os.path.dirname(s_filename), exist_ok=True)
+        with open(s_filename, 'wb') as f_file:
+            f_file.write(content.encode('utf-8') if isinstance(content, str) else content)
+
+    def get_page_links(self, i_page: int) -> list:
+        """
+        :param i_page: the number of a page, -1 for the index
+        :return: the numbers of the pages linked by the page, the pages form a tree from the index, completed by links
+                 to other pages
+        """
+        return [(i_page * self.i_fanout + i_link + 1) % self.i_pages for i_link in range(self.i_fanout)]
+
+    def get_page(self, rand: random.Random, i_page: int) -> str:
+        """
+        :param rand: the generator of random numbers of the site
+        :param i_page: the number of a page, -1 for the index
+        :return: the HTML of the page
+        """
+        a_head = []
+        if self.i_css:
+            a_head.append('<link rel="stylesheet" href="/assets/css/%d.css">' % rand.randrange(self.i_css))
+        if self.i_js:
+            a_head.append('<script src="/assets/js/%d.js"></script>' % rand.randrange(self.i_js))
+
+        a_body = ['<h1>Page %d</h1>' % i_page]
+        for i_link, i_linked_page in enumerate(self.get_page_links(i_page)):
+            # one link out of four is absolute, like the links written by a CMS
+            s_base = self.s_base_url if i_link % 4 == 0 else '/'
+            a_body.append('<a href="%spages/%d.html">%s</a>' % (s_base, i_linked_page, rand.choice(WORDS)))
+        for _ in range(min(self.i_images, 3)):
+            a_body.append('<img src="/assets/img/%d.png" alt="">' % rand.randrange(self.i_images))
+        # the binaries are linked by pages spread over the site
+        i_binaries_step = max(self.i_pages // max(self.i_binaries, 1), 1)
+        if self.i_binaries and i_page >= 0 and i_page % i_binaries_step == 0 and \
+                i_page // i_binaries_step < self.i_binaries:
+            a_body.append('<a href="/files/%d.zip">download</a>' % (i_page // i_binaries_step))
+
+        i_words = max(self.i_page_size // 7, 1)
+        a_body.append('<p>' + ' '.join(rand.choice(WORDS) for _ in range(i_words)) + '</p>')
+        return '<!DOCTYPE html>\n<html><head><meta charset="utf-8"><title>Page %d</title>%s</head><body>%s</body>' \
+               '</html>\n' % (i_page, ''.join(a_head), '\n'.join(a_body))
+
+    def generate(self):
+        """
+        Generate the files of the site, the server must be started because the absolute links contain its url
+        """
+        rand = random.Random(self.i_seed)
+
+        self.write('/index.html', self.get_page(rand, -1))
+        for i_page in range(self.i_pages):
+            self.write('/pages/%d.html' % i_page, self.get_page(rand, i_page))
+
+        for i_css in range(self.i_css):
+            a_rules = ['body { margin: 0; font-family: sans-serif; }']
+            if self.i_images:
+                a_rules += ['.block%d { background: url("../img/%d.png"); }' % (i_rule, rand.randrange(self.i_images))
+                            for i_rule in range(5)]
+            self.write('/assets/css/%d.css' % i_css, '\n'.join(a_rules))
+
+        for i_js in range(self.i_js):
+            self.write('/assets/js/%d.js' % i_js, ''.join(
+                'function f%d_%d(a) { return a + %d; }\n' % (i_js, i_function, rand.randrange(1000))
+                for i_function in range(50)))
+
+        for i_image in range(self.i_images):
+            image = Image.new('RGB', (rand.randint(16, 256), rand.randint(16, 256)),
+                              (rand.randrange(256), rand.randrange(256), rand.randrange(256)))
+            s_filename = os.path.join(self.s_directory, 'assets', 'img', '%d.png' % i_image)
+            os.makedirs(os.path.dirname(s_filename), exist_ok=True)
+            image.save(s_filename, 'PNG')
+
+        for i_binary in range(self.i_binaries):
+            # random bytes can't be compressed by the transport
+            self.write('/files/%d.zip' % i_binary,
+                       rand.getrandbits(8 * self.i_binary_size).to_bytes(self.i_binary_size, 'little')
+                       if self.i_binary_size else b'')
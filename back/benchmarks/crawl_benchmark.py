@@ -0,0 +1,375 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import argparse
+import json
+import logging
+import os
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+
+from datetime import datetime
+
+from benchmarks.SyntheticSite import SyntheticSite
+
+# the directory of scrapy_cmd.py, the crawler is launched from it like by the application
+PROJECT_DIRECTORY = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# the measures of a run that are compared between two benchmarks, True if a higher value is better
+COMPARED_MEASURES = {
+    'pages_per_second': True,
+    'wall_time': False,
+    'cpu_time': False,
+    'peak_rss_kb': False,
+    'postprocessing_time': False
+}
+
+# the number of seconds between two samples of the processes started by the crawler processes
+SAMPLE_INTERVAL = 0.1
+
+
+def get_version() -> dict:
+    """
+    :return: the version of the code that is benchmarked, the git commit and whether the working copy is modified,
+             None if the code isn't in a git repository
+    """
+    try:
+        s_commit = subprocess.check_output(['git', 'rev-parse', 'HEAD'], cwd=PROJECT_DIRECTORY,
+                                           stderr=subprocess.DEVNULL).decode('utf-8').strip()
+        b_modified = bool(subprocess.check_output(['git', 'status', '--porcelain', '--untracked-files=no'],
+                                                  cwd=PROJECT_DIRECTORY, stderr=subprocess.DEVNULL).strip())
+        return {'commit': s_commit, 'modified': b_modified}
+    except (OSError, subprocess.CalledProcessError):
+        return {'commit': None, 'modified': None}
+
+
+def get_crawl_command(s_url: str, s_output: str, s_log_file: str, s_stats_file: str, s_events_file: str,
+                      i_parse_processes: int, i_shards: int, i_shard: int, s_frontier_file: str,
+                      a_settings: list) -> list:
+    """
+    :param s_url: the url of the site
+    :param s_output: the directory of the downloaded files
+    :param s_log_file: the log file of the crawler process
+    :param s_stats_file: the file where the crawler writes the snapshot of its stats
+    :param s_events_file: the file where the crawler writes its events
+    :param i_parse_processes: the number of processes that parse the documents, 0 to parse them in the crawler
+    :param i_shards: the number of crawler processes
+    :param i_shard: the number of the shard crawled by the process
+    :param s_frontier_file: the database shared by the crawler processes of a sharded crawl
+    :param a_settings: the Scrapy settings given to the crawler, NAME=VALUE
+    :return: the command that launches a crawler process, with the arguments given by StatificationProcess
+    """
+    s_domain = re.sub('^https?://', '', s_url).rstrip('/')
+    a_command = [sys.executable, 'scrapy_cmd.py', 'crawl', '--loglevel=INFO', '--logfile=' + s_log_file,
+                 '-a', 'output=' + s_output,
+                 '-a', 'urls="' + s_url + '"',
+                 '-a', 'domains="' + s_domain.split(':')[0] + ',' + s_domain + '"',
+                 '-a', 'url_regex="' + '(https?://)?' + re.escape(s_domain) + '/?' + '"',
+                 '-a', 'url_replacement="/"',
+                 '-s', 'STATS_EXPORTER_FILE=' + s_stats_file,
+                 '-a', 'events_file=' + s_events_file]
+    if i_parse_processes > 0:
+        a_command += ['-a', 'parse_processes=' + str(i_parse_processes)]
+    if i_shards > 1:
+        a_command += ['-a', 'shards=' + str(i_shards), '-a', 'shard=' + str(i_shard),
+                      '-a', 'frontier_file=' + s_frontier_file]
+    for s_setting in a_settings:
+        a_command += ['-s', s_setting]
+    return a_command + ['mirroring']
+
+
+def read_process_stat(i_pid: int) -> tuple:
+    """
+    Read the CPU time used by a process from /proc, its children are not included
+    :param i_pid: the pid of the process
+    :return: a tuple of the parent pid, the start time in clock ticks and the CPU time in seconds of the process
+    :raise OSError if the process doesn't exist anymore
+    """
+    with open('/proc/%d/stat' % i_pid) as f_stat:
+        # the name of the process is between parentheses and can contain spaces
+        a_fields = f_stat.read().rsplit(')', 1)[1].split()
+    # the fields after the name : state, ppid, ... utime (14th field of the file), stime, ... starttime (22nd field)
+    return int(a_fields[1]), int(a_fields[19]), (int(a_fields[11]) + int(a_fields[12])) / os.sysconf('SC_CLK_TCK')
+
+
+def read_process_peak_rss(i_pid: int) -> int:
+    """
+    :param i_pid: the pid of the process
+    :return: the peak RSS of the process in kB, read from /proc
+    :raise OSError if the process doesn't exist anymore
+    """
+    with open('/proc/%d/status' % i_pid) as f_status:
+        for s_line in f_status:
+            if s_line.startswith('VmHWM:'):
+                return int(s_line.split()[1])
+    return 0
+
+
+def sample_descendants(a_pids: list, descendants: dict):
+    """
+    Sample the resources used by the processes started by the crawler processes and their descendants. The crawler
+    doesn't wait for the forkserver of the parse processes, so their resources aren't in the rusage of the crawler
+    :param a_pids: the pids of the crawler processes
+    :param descendants: the last sample of each descendant by pid and start time, a tuple of the CPU time in seconds
+                        and the peak RSS in kB, it is updated
+    """
+    try:
+        a_all_pids = [int(s_pid) for s_pid in os.listdir('/proc') if s_pid.isdigit()]
+    except OSError:
+        # /proc only exists on Linux
+        return
+    stats = {}
+    for i_pid in a_all_pids:
+        try:
+            stats[i_pid] = read_process_stat(i_pid)
+        except (OSError, ValueError, IndexError):
+            # the process has exited
+            pass
+
+    # the descendants that have already been sampled stay in the tree when their parent exits, unless their pid has
+    # been reused
+    a_tree = set(a_pids) | {i_pid for i_pid, i_start in descendants if i_pid in stats and stats[i_pid][1] == i_start}
+    b_added = True
+    while b_added:
+        b_added = False
+        for i_pid, (i_parent, i_start, f_cpu_time) in stats.items():
+            if i_parent in a_tree and i_pid not in a_tree:
+                a_tree.add(i_pid)
+                b_added = True
+
+    for i_pid in a_tree.difference(a_pids).intersection(stats):
+        i_parent, i_start, f_cpu_time = stats[i_pid]
+        try:
+            descendants[(i_pid, i_start)] = (f_cpu_time, read_process_peak_rss(i_pid))
+        except (OSError, ValueError):
+            pass
+
+
+def run_postprocessing(s_work_directory: str, s_output: str, s_log_file: str, i_shards: int) -> float:
+    """
+    Finalize the crawl like the application does when the crawler is done : merge the files of the shards, delete
+    the unwanted files and the empty directories, register the events into the database and count the files
+    :param s_work_directory: the directory of the files of the run
+    :param s_output: the directory of the downloaded files
+    :param s_log_file: the log file of the crawl
+    :param i_shards: the number of crawler processes
+    :return: the duration of the finalization in seconds
+    """
+    # imported here so the crawl isn't measured with the application loaded in the benchmark process
+    from cornetto.models import Base, open_session_db, close_session_db, get_engine
+    from cornetto.models.Statification import Statification, Status
+    from cornetto.StatificationProcess import StatificationProcess
+
+    s_database_uri = 'sqlite:///' + os.path.join(s_work_directory, 'cornetto.db')
+    Base.metadata.create_all(get_engine(s_database_uri))
+    session = open_session_db(s_database_uri)
+    session.add(Statification('', 'benchmark', 'benchmark', datetime.utcnow(), datetime.utcnow(), Status.CREATED))
+    session.commit()
+
+    process = StatificationProcess('benchmark', s_output, '', '', '', s_log_file, PROJECT_DIRECTORY,
+                                   s_database_uri, os.path.join(s_work_directory, 'pid'),
+                                   os.path.join(s_work_directory, 'lock'), os.path.join(s_work_directory, 'stats'),
+                                   i_shards=i_shards, s_frontier_file=os.path.join(s_work_directory, 'frontier.db'))
+
+    f_start = time.perf_counter()
+    if i_shards > 1:
+        process.merge_shards_files()
+    process.register_error_in_database(session)
+    f_duration = time.perf_counter() - f_start
+
+    close_session_db(s_database_uri)
+    return f_duration
+
+
+def run_crawl(s_url: str, s_work_directory: str, i_parse_processes: int, i_shards: int, a_settings: list) -> dict:
+    """
+    Crawl the site once and measure the crawl and its finalization
+    :param s_url: the url of the site
+    :param s_work_directory: the directory of the files of the run, it is created
+    :param i_parse_processes: the number of processes that parse the documents, 0 to parse them in the crawler
+    :param i_shards: the number of crawler processes
+    :param a_settings: the Scrapy settings given to the crawler, NAME=VALUE
+    :return: the measures of the run
+    """
+    s_output = os.path.join(s_work_directory, 'output')
+    os.makedirs(s_output)
+    s_log_file = os.path.join(s_work_directory, 'statif.log')
+    s_stats_file = os.path.join(s_work_directory, 'stats')
+    s_events_file = s_log_file + '.events.jsonl'
+
+    # one file per shard, like StatificationProcess
+    def get_shard_file(s_file, i_shard):
+        return s_file + '.' + str(i_shard) if i_shards > 1 else s_file
+
+    env = os.environ.copy()
+    env['PYTHONPATH'] = PROJECT_DIRECTORY
+
+    f_start = time.perf_counter()
+    a_processes = [subprocess.Popen(get_crawl_command(s_url, s_output, get_shard_file(s_log_file, i_shard),
+                                                      get_shard_file(s_stats_file, i_shard),
+                                                      get_shard_file(s_events_file, i_shard), i_parse_processes,
+                                                      i_shards, i_shard,
+                                                      os.path.join(s_work_directory, 'frontier.db'), a_settings),
+                                    cwd=PROJECT_DIRECTORY, env=env, stdout=subprocess.DEVNULL)
+                   for i_shard in range(i_shards)]
+
+    # wait4 gives the resources used by each crawler process and the processes it has waited for, the other processes
+    # of the tree (the forkserver and the parse processes) are sampled while the crawl runs, the CPU time they use
+    # after their last sample is missed
+    f_cpu_time = 0.0
+    i_peak_rss_kb = 0
+    a_pids = [process.pid for process in a_processes]
+    descendants = {}
+    a_running = list(a_processes)
+    while a_running:
+        sample_descendants(a_pids, descendants)
+        for process in list(a_running):
+            i_pid, i_status, rusage = os.wait4(process.pid, os.WNOHANG)
+            if i_pid == 0:
+                continue
+            process.returncode = os.WEXITSTATUS(i_status) if os.WIFEXITED(i_status) else -os.WTERMSIG(i_status)
+            f_cpu_time += rusage.ru_utime + rusage.ru_stime
+            i_peak_rss_kb = max(i_peak_rss_kb, rusage.ru_maxrss)
+            a_running.remove(process)
+        if a_running:
+            time.sleep(SAMPLE_INTERVAL)
+    f_wall_time = time.perf_counter() - f_start
+    a_exit_codes = [process.returncode for process in a_processes]
+    for f_descendant_cpu_time, i_descendant_peak_rss_kb in descendants.values():
+        f_cpu_time += f_descendant_cpu_time
+        i_peak_rss_kb = max(i_peak_rss_kb, i_descendant_peak_rss_kb)
+
+    stats = {'pages': 0, 'bytes': 0, 'items': 0, 'errors': 0, 'http_errors': 0}
+    for i_shard in range(i_shards):
+        try:
+            with open(get_shard_file(s_stats_file, i_shard)) as f_stats_file:
+                snapshot = json.load(f_stats_file)
+            for s_field in stats:
+                stats[s_field] += snapshot.get(s_field, 0)
+        except (FileNotFoundError, ValueError) as e:
+            logging.warning('The stats of the crawler can\'t be read ' + str(e))
+
+    f_postprocessing_time = run_postprocessing(s_work_directory, s_output, s_log_file, i_shards)
+
+    return dict(stats,
+                exit_codes=a_exit_codes,
+                wall_time=round(f_wall_time, 3),
+                pages_per_second=round(stats['pages'] / f_wall_time, 2) if f_wall_time > 0 else 0,
+                cpu_time=round(f_cpu_time, 3),
+                peak_rss_kb=i_peak_rss_kb,
+                processes=len(a_processes) + len(descendants),
+                postprocessing_time=round(f_postprocessing_time, 3))
+
+
+def compare(results: dict, previous: dict):
+    """
+    Print the relative change of the median of each measure since a previous benchmark
+    :param results: the results of the benchmark
+    :param previous: the results of the previous benchmark
+    """
+    if previous.get('site') != results['site'] or previous.get('crawler') != results['crawler']:
+        print('The previous benchmark has been run with other parameters, the comparison is not significant')
+    for s_measure, b_higher_is_better in COMPARED_MEASURES.items():
+        f_value = results['median'][s_measure]
+        f_previous_value = previous.get('median', {}).get(s_measure)
+        if not f_previous_value:
+            continue
+        f_change = (f_value - f_previous_value) / f_previous_value * 100
+        b_better = f_change > 0 if b_higher_is_better else f_change < 0
+        print('%-20s %12s -> %-12s %+7.1f%% %s' % (s_measure, f_previous_value, f_value, f_change,
+                                                   'better' if b_better else 'worse' if f_change else ''))
+
+
+def main(a_arguments: list = None):
+    parser = argparse.ArgumentParser(description='Benchmark the crawl of a synthetic website served locally.')
+    parser.add_argument('--pages', type=int, default=1000, help='the number of pages of the site')
+    parser.add_argument('--fanout', type=int, default=10, help='the number of links to other pages of each page')
+    parser.add_argument('--page-size', type=int, default=4096, help='the size of the text of each page in bytes')
+    parser.add_argument('--css', type=int, default=10, help='the number of CSS files')
+    parser.add_argument('--js', type=int, default=10, help='the number of JS files')
+    parser.add_argument('--images', type=int, default=50, help='the number of images')
+    parser.add_argument('--binaries', type=int, default=2, help='the number of large binary files')
+    parser.add_argument('--binary-size', type=int, default=2097152, help='the size of each binary file in bytes')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the generation of the site')
+    parser.add_argument('--repeat', type=int, default=3, help='the number of crawls, the median is reported')
+    parser.add_argument('--parse-processes', type=int, default=0,
+                        help='the number of processes that parse the documents (CRAWLER_PARSE_PROCESSES)')
+    parser.add_argument('--shards', type=int, default=1, help='the number of crawler processes (CRAWLER_SHARDS)')
+    parser.add_argument('--setting', action='append', default=[], metavar='NAME=VALUE',
+                        help='a Scrapy setting given to the crawler, for example '
+                             'DUPEFILTER_CLASS=scrapy_parser.BLOOMDupeFilter.BLOOMDupeFilter')
+    parser.add_argument('--work-dir', help='the directory of the site and of the crawls, kept after the benchmark '
+                                           '(by default a temporary directory that is removed)')
+    parser.add_argument('--output', help='the JSON file where the results are saved')
+    parser.add_argument('--compare', help='the JSON file of the results of a previous benchmark to compare with')
+    args = parser.parse_args(a_arguments)
+
+    s_work_directory = args.work_dir or tempfile.mkdtemp(prefix='cornetto-benchmark-')
+    site = SyntheticSite(os.path.join(s_work_directory, 'site'), args.pages, args.fanout, args.css, args.js,
+                         args.images, args.binaries, args.binary_size, args.page_size, args.seed)
+    try:
+        s_url = site.start()
+        f_start = time.perf_counter()
+        site.generate()
+        print('Site generated in %.1fs, served on %s' % (time.perf_counter() - f_start, s_url))
+
+        a_runs = []
+        for i_run in range(args.repeat):
+            s_run_directory = os.path.join(s_work_directory, 'run%d' % i_run)
+            shutil.rmtree(s_run_directory, ignore_errors=True)
+            run = run_crawl(s_url, s_run_directory, args.parse_processes, args.shards, args.setting)
+            print('Run %d : %d pages in %.2fs (%.1f pages/s), cpu %.2fs, peak RSS %d KB, post-processing %.2fs' % (
+                i_run, run['pages'], run['wall_time'], run['pages_per_second'], run['cpu_time'], run['peak_rss_kb'],
+                run['postprocessing_time']))
+            a_runs.append(run)
+    finally:
+        site.stop()
+        if not args.work_dir:
+            shutil.rmtree(s_work_directory, ignore_errors=True)
+
+    results = {
+        'benchmark': 'crawl',
+        'date': datetime.utcnow().isoformat(),
+        'version': get_version(),
+        'python': sys.version.split()[0],
+        'site': site.get_parameters(),
+        'crawler': {'parse_processes': args.parse_processes, 'shards': args.shards, 'settings': args.setting},
+        'runs': a_runs,
+        'median': {s_measure: statistics.median(run[s_measure] for run in a_runs)
+                   for s_measure in ['pages', 'bytes', 'wall_time', 'pages_per_second', 'cpu_time', 'peak_rss_kb',
+                                     'postprocessing_time']}
+    }
+    print(json.dumps(results['median'], indent=4))
+
+    if args.output:
+        with open(args.output, 'w') as f_output:
+            json.dump(results, f_output, indent=4)
+
+    if args.compare:
+        with open(args.compare) as f_previous:
+            compare(results, json.load(f_previous))
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,371 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import argparse
+import hashlib
+import json
+import os
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+
+from datetime import datetime, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+from benchmarks.crawl_benchmark import get_version
+from cornetto import create_app
+from cornetto.models import Actions, Base, Status, open_session_db, close_session_db, get_engine, enable_sqlite_wal
+from cornetto.models.ErrorTypeMIME import ErrorTypeMIME
+from cornetto.models.ExternalLink import ExternalLink
+from cornetto.models.HtmlError import HtmlError
+from cornetto.models.LargestFile import LargestFile
+from cornetto.models.ScannedFile import ScannedFile
+from cornetto.models.ScrapyError import ScrapyError
+from cornetto.models.Statification import Statification
+from cornetto.models.StatificationHistoric import StatificationHistoric
+from cornetto.StatificationProcess import StatificationProcess
+
+
+class QueryCounter(object):
+    """
+    Count the SQL queries executed by all the engines
+    """
+    def __init__(self):
+        self.i_count = 0
+        event.listen(Engine, 'before_cursor_execute', self.before_cursor_execute)
+
+    def before_cursor_execute(self, conn, cursor, statement, parameters, context, executemany):
+        self.i_count += 1
+
+
+def get_commit(i_statification: int) -> str:
+    """
+    :param i_statification: the number of a synthetic statification
+    :return: the commit sha of the statification
+    """
+    return hashlib.sha1(str(i_statification).encode('utf-8')).hexdigest()
+
+
+def generate_events(s_events_file: str, i_events: int, rand: random.Random):
+    """
+    Write the events of a synthetic crawl, in the format of CrawlEvents : external links (some of them found on several
+    pages), HTTP errors, forbidden contents and errors, then the stats of the crawl
+    :param s_events_file: the path to the events file
+    :param i_events: the number of events
+    :param rand: the generator of random numbers
+    """
+    with open(s_events_file, 'w') as f_events_file:
+        for i_event in range(i_events):
+            s_source = 'http://www.example.com/page/%d.html' % rand.randrange(i_events)
+            f_type = rand.random()
+            if f_type < 0.5:
+                # one external link out of five has already been found
+                i_link = rand.randrange(i_event + 1) if rand.random() < 0.2 else i_event
+                event_data = {'type': 'external_link', 'source': s_source,
+                              'url': 'http://external%d.example.org/link/%d' % (i_link % 1000, i_link)}
+            elif f_type < 0.8:
+                event_data = {'type': 'http_error', 'code': rand.choice([404, 404, 404, 403, 500, 502]),
+                              'url': 'http://www.example.com/missing/%d' % i_event, 'source': s_source}
+            elif f_type < 0.9:
+                event_data = {'type': 'forbidden_content', 'mime': rand.choice(['application/x-msdownload',
+                                                                                  'application/octet-stream']),
+                              'url': 'http://www.example.com/file/%d' % i_event}
+            else:
+                event_data = {'type': 'error', 'message': 'Error downloading <GET http://www.example.com/%d>' % i_event}
+            f_events_file.write(json.dumps(event_data) + '\n')
+        f_events_file.write(json.dumps({'type': 'stats', 'response_received_count': i_events}) + '\n')
+
+
+def populate_database(s_database_uri: str, i_statifications: int, i_rows: int, rand: random.Random):
+    """
+    Create committed statifications with their associated objects
+    :param s_database_uri: the uri of the database
+    :param i_statifications: the number of statifications
+    :param i_rows: the number of objects of each collection (external links, HTML errors, MIME type errors and scrapy
+                   errors) of each statification
+    :param rand: the generator of random numbers
+    """
+    session = open_session_db(s_database_uri)
+    d_date = datetime(2019, 1, 1)
+    for i_statification in range(i_statifications):
+        d_date += timedelta(days=1)
+        e_status = Status.PRODUCTION if i_statification == i_statifications - 1 else Status.SAVED
+        statification = Statification(get_commit(i_statification), 'Statification %d' % i_statification,
+                                      'A synthetic statification', d_date, d_date, e_status)
+        statification.nb_item = i_rows * 10
+        session.add(statification)
+        session.commit()
+
+        session.add_all([StatificationHistoric(statification, d_date, 'benchmark', e_action)
+                         for e_action in [Actions.CREATE_STATIFICATION, Actions.COMMIT_STATIFICATION]])
+        session.commit()
+
+        s_page = 'http://www.example.com/page/%d.html'
+        statification.add_objects_to_statification(
+            ExternalLink, session, [(s_page % rand.randrange(i_rows), 'http://external%d.example.org/link/%d' %
+                                     (rand.randrange(1000), i_row)) for i_row in range(i_rows)])
+        statification.add_objects_to_statification(
+            HtmlError, session, [(rand.choice(['404', '403', '500']), 'http://www.example.com/missing/%d' % i_row,
+                                  s_page % rand.randrange(i_rows)) for i_row in range(i_rows)])
+        statification.add_objects_to_statification(
+            ErrorTypeMIME, session, [('application/octet-stream', 'http://www.example.com/file/%d' % i_row)
+                                     for i_row in range(i_rows)])
+        statification.add_objects_to_statification(
+            ScrapyError, session, [('Error downloading <GET http://www.example.com/%d>' % i_row,)
+                                   for i_row in range(i_rows)])
+        statification.add_objects_to_statification(
+            ScannedFile, session, [(s_type, rand.randrange(1, 10000), rand.randrange(1, 10 ** 9))
+                                   for s_type in ['html', 'css', 'js', 'png', 'jpg', 'pdf', 'zip', 'other']])
+        statification.add_objects_to_statification(
+            LargestFile, session, [('/files/%d.zip' % i_file, rand.randrange(10 ** 6, 10 ** 9))
+                                   for i_file in range(20)])
+    close_session_db(s_database_uri)
+
+
+def run_ingestion(s_work_directory: str, s_database_uri: str, i_events: int, rand: random.Random,
+                  counter: QueryCounter) -> dict:
+    """
+    Register the events of a synthetic crawl into the database like the application does when the crawler is done
+    :param s_work_directory: the directory of the files of the benchmark
+    :param s_database_uri: the uri of the database
+    :param i_events: the number of events of the crawl
+    :param rand: the generator of random numbers
+    :param counter: the counter of the SQL queries
+    :return: the measures of the ingestion
+    """
+    s_log_file = os.path.join(s_work_directory, 'statif.log')
+    s_repository = os.path.join(s_work_directory, 'repository')
+    os.makedirs(s_repository, exist_ok=True)
+
+    f_start = time.perf_counter()
+    generate_events(s_log_file + '.events.jsonl', i_events, rand)
+    f_generation_time = time.perf_counter() - f_start
+
+    session = open_session_db(s_database_uri)
+    session.add(Statification('', 'Current statification', 'A synthetic crawl', datetime.utcnow(), datetime.utcnow(),
+                              Status.CREATED))
+    session.commit()
+
+    process = StatificationProcess('benchmark', s_repository, '', '', '', s_log_file, '', s_database_uri,
+                                   os.path.join(s_work_directory, 'pid'), os.path.join(s_work_directory, 'lock'),
+                                   os.path.join(s_work_directory, 'stats'))
+    i_queries = counter.i_count
+    f_start = time.perf_counter()
+    process.register_error_in_database(session)
+    f_ingestion_time = time.perf_counter() - f_start
+    i_queries = counter.i_count - i_queries
+    close_session_db(s_database_uri)
+
+    return {
+        'events': i_events,
+        'generation_time': round(f_generation_time, 3),
+        'ingestion_time': round(f_ingestion_time, 3),
+        'events_per_second': round(i_events / f_ingestion_time, 1) if f_ingestion_time > 0 else 0,
+        'queries': i_queries
+    }
+
+
+def get_routes(i_statifications: int) -> list:
+    """
+    :param i_statifications: the number of committed statifications
+    :return: the routes that are measured, a tuple (name, url) for each one
+    """
+    s_commit = get_commit(i_statifications // 2)
+    return [
+        ('status', '/api/statification/status'),
+        ('count', '/api/statification/count'),
+        ('list', '/api/statification/list?limit=10&skip=%d' % (i_statifications // 2)),
+        ('detail', '/api/statification?commit=' + s_commit),
+        ('current', '/api/statification/current'),
+        ('html_errors', '/api/statification/html_errors?limit=100&commit=' + s_commit),
+        ('external_links', '/api/statification/external_links?limit=100&order=host&commit='),
+        ('summary', '/api/statification/summary?commit=' + s_commit),
+        ('summary_current', '/api/statification/summary?commit=')
+    ]
+
+
+def run_routes(s_work_directory: str, s_database_uri: str, i_statifications: int, i_repeat: int,
+               counter: QueryCounter, b_sqlite_wal: bool = False) -> dict:
+    """
+    Request the main routes of the API with the Flask test client
+    :param s_work_directory: the directory of the files of the benchmark
+    :param s_database_uri: the uri of the database
+    :param i_statifications: the number of committed statifications
+    :param i_repeat: the number of requests of each route
+    :param counter: the counter of the SQL queries
+    :param b_sqlite_wal: True to enable the SQLite settings of DATABASE_SQLITE_WAL
+    :return: the measures of each route, by name : the duration of the first request and the median and 95th
+             percentile of the durations of the following ones in milliseconds, the size of the response and the number
+             of SQL queries of the first and of the following requests
+    """
+    app = create_app(None, {
+        'DEBUG': True,
+        'LOGLEVEL': 'WARNING',
+        'STATIC_REPOSITORY': '',
+        'URL_GIT': '',
+        'URLS': '',
+        'DOMAINS': '',
+        'LOGFILE': os.path.join(s_work_directory, 'statif.log'),
+        'PROJECT_DIRECTORY': '',
+        'PYTHONPATH': '',
+        'PIDFILE': os.path.join(s_work_directory, 'pid'),
+        'LOCKFILE': os.path.join(s_work_directory, 'lock'),
+        'STATUS_BACKGROUND': os.path.join(s_work_directory, 'status_background.json'),
+        'CRAWLER_PROGRESS_COUNTER_FILE': os.path.join(s_work_directory, 'stats'),
+        'DELETE_FILES': '',
+        'DELETE_DIRECTORIES': '',
+        'URL_REGEX': '',
+        'URL_REPLACEMENT': '',
+        'DATABASE_URI': s_database_uri,
+        'DATABASE_SQLITE_WAL': b_sqlite_wal,
+        'SQLALCHEMY_TRACK_MODIFICATIONS': False,
+        # every request builds the status
+        'STATUS_CACHE_TTL': 0
+    })
+    client = app.test_client()
+
+    routes = {}
+    for s_name, s_url in get_routes(i_statifications):
+        a_durations = []
+        a_queries = []
+        i_size = 0
+        for _ in range(i_repeat + 1):
+            i_queries = counter.i_count
+            f_start = time.perf_counter()
+            response = client.get(s_url, headers={'Accept-Encoding': 'gzip'})
+            a_durations.append((time.perf_counter() - f_start) * 1000)
+            a_queries.append(counter.i_count - i_queries)
+            i_size = len(response.get_data())
+            if response.status_code != 200:
+                print('The route %s has returned the status %d' % (s_url, response.status_code), file=sys.stderr)
+
+        a_following_durations = sorted(a_durations[1:]) or a_durations
+        routes[s_name] = {
+            'url': s_url,
+            'first_ms': round(a_durations[0], 2),
+            'median_ms': round(statistics.median(a_following_durations), 2),
+            'p95_ms': round(a_following_durations[min(int(len(a_following_durations) * 0.95),
+                                                      len(a_following_durations) - 1)], 2),
+            'response_bytes': i_size,
+            'first_queries': a_queries[0],
+            'queries': max(a_queries[1:] or a_queries)
+        }
+        print('%-16s first %9.2f ms  median %9.2f ms  p95 %9.2f ms  %3d queries  %9d bytes' % (
+            s_name, routes[s_name]['first_ms'], routes[s_name]['median_ms'], routes[s_name]['p95_ms'],
+            routes[s_name]['queries'], i_size))
+    return routes
+
+
+def compare(results: dict, previous: dict):
+    """
+    Print the change of the measures of the ingestion and of each route since a previous benchmark, the routes whose
+    number of SQL queries has changed are reported
+    :param results: the results of the benchmark
+    :param previous: the results of the previous benchmark
+    """
+    if previous.get('parameters') != results['parameters']:
+        print('The previous benchmark has been run with other parameters, the comparison is not significant')
+
+    previous_ingestion = previous.get('ingestion', {})
+    if previous_ingestion.get('ingestion_time'):
+        print('%-16s %+7.1f%% time, queries %s -> %s' % (
+            'ingestion', (results['ingestion']['ingestion_time'] - previous_ingestion['ingestion_time']) /
+            previous_ingestion['ingestion_time'] * 100, previous_ingestion.get('queries'),
+            results['ingestion']['queries']))
+
+    for s_name, route in results['routes'].items():
+        previous_route = previous.get('routes', {}).get(s_name)
+        if not previous_route or not previous_route.get('median_ms'):
+            continue
+        print('%-16s %+7.1f%% median, queries %s -> %s%s' % (
+            s_name, (route['median_ms'] - previous_route['median_ms']) / previous_route['median_ms'] * 100,
+            previous_route['queries'], route['queries'],
+            '  QUERIES CHANGED' if previous_route['queries'] != route['queries'] else ''))
+
+
+def main(a_arguments: list = None):
+    parser = argparse.ArgumentParser(description='Benchmark the ingestion of the events of a crawl and the routes of '
+                                                 'the API on a database of synthetic statifications.')
+    parser.add_argument('--statifications', type=int, default=100, help='the number of committed statifications')
+    parser.add_argument('--rows', type=int, default=1000,
+                        help='the number of objects of each collection of each committed statification')
+    parser.add_argument('--events', type=int, default=1000000,
+                        help='the number of events of the crawl of the current statification')
+    parser.add_argument('--repeat', type=int, default=10, help='the number of requests of each route')
+    parser.add_argument('--seed', type=int, default=0, help='the seed of the generation of the data')
+    parser.add_argument('--wal', action='store_true', help='enable the SQLite settings of DATABASE_SQLITE_WAL')
+    parser.add_argument('--work-dir', help='the directory of the database and of the events, kept after the '
+                                           'benchmark (by default a temporary directory that is removed)')
+    parser.add_argument('--output', help='the JSON file where the results are saved')
+    parser.add_argument('--compare', help='the JSON file of the results of a previous benchmark to compare with')
+    args = parser.parse_args(a_arguments)
+
+    rand = random.Random(args.seed)
+    counter = QueryCounter()
+    s_work_directory = args.work_dir or tempfile.mkdtemp(prefix='cornetto-benchmark-')
+    s_database_uri = 'sqlite:///' + os.path.join(s_work_directory, 'cornetto.db')
+    if args.wal:
+        enable_sqlite_wal(s_database_uri)
+    try:
+        if os.path.isfile(os.path.join(s_work_directory, 'cornetto.db')):
+            os.remove(os.path.join(s_work_directory, 'cornetto.db'))
+        Base.metadata.create_all(get_engine(s_database_uri))
+
+        f_start = time.perf_counter()
+        populate_database(s_database_uri, args.statifications, args.rows, rand)
+        f_population_time = time.perf_counter() - f_start
+        print('%d statifications populated in %.1fs' % (args.statifications, f_population_time))
+
+        ingestion = run_ingestion(s_work_directory, s_database_uri, args.events, rand, counter)
+        print('%d events ingested in %.2fs (%.0f events/s), %d queries' % (
+            ingestion['events'], ingestion['ingestion_time'], ingestion['events_per_second'], ingestion['queries']))
+
+        routes = run_routes(s_work_directory, s_database_uri, args.statifications, args.repeat, counter, args.wal)
+    finally:
+        if not args.work_dir:
+            shutil.rmtree(s_work_directory, ignore_errors=True)
+
+    results = {
+        'benchmark': 'database',
+        'date': datetime.utcnow().isoformat(),
+        'version': get_version(),
+        'python': sys.version.split()[0],
+        'parameters': {'statifications': args.statifications, 'rows': args.rows, 'events': args.events,
+                       'repeat': args.repeat, 'seed': args.seed, 'wal': args.wal},
+        'population_time': round(f_population_time, 3),
+        'ingestion': ingestion,
+        'routes': routes
+    }
+
+    if args.output:
+        with open(args.output, 'w') as f_output:
+            json.dump(results, f_output, indent=4)
+
+    if args.compare:
+        with open(args.compare) as f_previous:
+            compare(results, json.load(f_previous))
+
+    return results
+
+
+if __name__ == '__main__':
+    main()
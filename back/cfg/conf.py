@@ -35,10 +35,32 @@ LOGFILE = '/opt/cornetto/log/statif.log'
 PIDFILE = '/opt/cornetto/.pid.data'
 # define the lock file use to block operation
 LOCKFILE = '/opt/cornetto/.lock_access'
-# define the crawler progess counter file (file that store the count of file crawled) BEWARE modify MirroringSpider.py too if you change it
+# define the crawler progess counter file (file where the crawler writes the snapshot of its stats every second)
 CRAWLER_PROGRESS_COUNTER_FILE = '/opt/cornetto/.crawlerProgressCounterFile.txt'
+# enable the incremental mode, only the content modified since the previous statification will be downloaded
+CRAWLER_INCREMENTAL = False
+# define the file that store the validators (ETag, Last-Modified, hash) of the previous statification
+CRAWLER_VALIDATORS_FILE = '/opt/cornetto/.crawlerValidators.jsonl'
+# define the number of processes that parse the HTML, CSS and XML files, 0 to parse them in the crawler process
+CRAWLER_PARSE_PROCESSES = 0
+# define the number of crawler processes, each one crawls a partition of the urls of the websites
+CRAWLER_SHARDS = 1
+# define the database used by the crawler processes to hand off the urls to each other when CRAWLER_SHARDS > 1
+CRAWLER_FRONTIER_FILE = '/opt/cornetto/.crawlerFrontier.db'
+# define the directory where the crawler writes the state of the crawl, so an interrupted statification can be resumed
+CRAWLER_JOB_DIR = '/opt/cornetto/crawlerJob'
+# define the number of seconds between two registrations of the results of the crawl into the database while it runs
+CRAWLER_INGEST_INTERVAL = 2
 # define the path to the file that will store the status of background process
 STATUS_BACKGROUND = '/opt/cornetto/statusBackground.json'
+# define the maximum number of seconds the status of the api is served from the same snapshot
+STATUS_CACHE_TTL = 2
+# define the maximum number of seconds a stream of the events of the status stays open, the client reconnects then
+EVENTS_STREAM_DURATION = 300
+# enable the profiling of the crawler processes and of the requests of the api, the hotspots are given by the api
+PROFILING = False
+# define the routes of the api that are profiled when PROFILING is enabled, all the routes if it is empty
+PROFILING_ROUTES = []
 
 # DATABASE
 
@@ -47,6 +69,8 @@ SQLALCHEMY_TRACK_MODIFICATIONS = False
 
 # the uri of the database
 DATABASE_URI = 'sqlite:////opt/cornetto/cornetto.db'
+# enable the Write-Ahead Log and tune the connections when the database is SQLite
+DATABASE_SQLITE_WAL = True
 
 # GIT CONFIG
 
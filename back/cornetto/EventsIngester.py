@@ -0,0 +1,178 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import json
+import logging
+import threading
+
+from sqlalchemy.orm import Session
+from sqlalchemy.orm.exc import NoResultFound
+
+from cornetto.models.ErrorTypeMIME import ErrorTypeMIME
+from cornetto.models.EventsFileOffset import EventsFileOffset
+from cornetto.models.ExternalLink import ExternalLink
+from cornetto.models.HtmlError import HtmlError
+from cornetto.models.ScrapyError import ScrapyError
+from cornetto.models.Statification import Statification, BULK_INSERT_CHUNK_SIZE
+from cornetto.models import open_session_db, close_session_db
+
+
+class EventsIngester(threading.Thread):
+    """
+    Register the events written by the crawler into the database while the crawl runs, so the errors and the external
+    links of the current statification can be queried before the end of the crawl.
+    The events files are read from the position registered in the database with the objects created from the events,
+    so the ingestion can be stopped and restarted without registering an event twice.
+    """
+    def __init__(self, s_logger: str, s_database_uri: str, a_events_files: list, f_interval: float = 2):
+        """
+        :param s_logger: the id of the logger
+        :param s_database_uri: the uri of the database
+        :param a_events_files: the paths to the events files of the crawler processes
+        :param f_interval: the number of seconds between two readings of the events files
+        """
+        threading.Thread.__init__(self, name='EventsIngester', daemon=True)
+        self.logger = logging.getLogger(s_logger)
+        self.s_database_uri = s_database_uri
+        self.a_events_files = a_events_files
+        self.f_interval = f_interval
+        self.stop_event = threading.Event()
+
+        # the external links already registered, the same external link can be detected by several shards
+        self.i_statification_id = None
+        self.a_external_links = set()
+
+    def run(self):
+        """
+        Register the new events periodically until the ingester is stopped
+        """
+        session = open_session_db(self.s_database_uri)
+        try:
+            while not self.stop_event.wait(self.f_interval):
+                try:
+                    self.ingest(session)
+                except (NoResultFound, IndexError):
+                    session.rollback()
+                except Exception as e:
+                    # the database can be locked by the application, the events will be registered the next time
+                    session.rollback()
+                    self.logger.warning('The events of the crawl could not be registered : ' + str(e))
+        finally:
+            close_session_db(self.s_database_uri)
+
+    def stop(self):
+        """
+        Stop the ingester and wait for it, the events not registered yet are left in the events files
+        """
+        self.stop_event.set()
+        if self.is_alive():
+            self.join()
+
+    def ingest(self, session: Session):
+        """
+        Register the events written into the events files since the previous call
+        :param session: the database session
+        :raise NoResultFound if there is no statification with empty commit sha
+        """
+        statification = Statification.get_statification(session, '')
+
+        if statification.id != self.i_statification_id:
+            self.i_statification_id = statification.id
+            self.a_external_links = set(s_url for s_url, in session.query(ExternalLink.url).filter(
+                ExternalLink.statification_id == statification.id))
+
+        for s_events_file in self.a_events_files:
+            self.ingest_file(session, statification, s_events_file)
+
+    def ingest_file(self, session: Session, statification: Statification, s_events_file: str):
+        """
+        Register the events written into an events file since the registered position, by chunks
+        :param session: the database session
+        :param statification: the current statification
+        :param s_events_file: the path to the events file
+        """
+        i_offset = EventsFileOffset.get_offset(session, statification, s_events_file)
+
+        try:
+            f_events_file = open(s_events_file, 'rb')
+        except FileNotFoundError:
+            return
+
+        with f_events_file:
+            f_events_file.seek(i_offset)
+            a_lines = []
+            for line in f_events_file:
+                # the last line can be written by the crawler at the same time
+                if not line.endswith(b'\n'):
+                    break
+                a_lines.append(line)
+                i_offset += len(line)
+
+                if len(a_lines) >= BULK_INSERT_CHUNK_SIZE:
+                    self.register_events(session, statification, s_events_file, a_lines, i_offset)
+                    a_lines = []
+
+            if a_lines:
+                self.register_events(session, statification, s_events_file, a_lines, i_offset)
+
+    def register_events(self, session: Session, statification: Statification, s_events_file: str, a_lines: list,
+                        i_offset: int):
+        """
+        Create the database objects associated to the statification from events, the objects and the new position in
+        the events file are committed in one transaction
+        :param session: the database session
+        :param statification: the current statification
+        :param s_events_file: the path to the events file
+        :param a_lines: the lines of the events
+        :param i_offset: the position in the events file after the last event
+        """
+        a_new_external_links = set()
+        # the rows of the objects to create, by class
+        rows = {ExternalLink: [], HtmlError: [], ErrorTypeMIME: [], ScrapyError: []}
+        # the events files of a sharded or resumed statification contain the stats of every crawl
+        i_nb_item = 0
+
+        for line in a_lines:
+            event = json.loads(line.decode('utf-8'))
+
+            if event['type'] == 'external_link':
+                if event['url'] not in self.a_external_links and event['url'] not in a_new_external_links:
+                    a_new_external_links.add(event['url'])
+                    rows[ExternalLink].append((event['source'], event['url']))
+            elif event['type'] == 'http_error':
+                rows[HtmlError].append((str(event['code']), event['url'], event['source']))
+            elif event['type'] == 'forbidden_content':
+                rows[ErrorTypeMIME].append((event['mime'], event['url']))
+            elif event['type'] == 'error':
+                rows[ScrapyError].append((event['message'],))
+            elif event['type'] == 'stats':
+                i_nb_item += event['response_received_count']
+
+        for c_class, a_rows in rows.items():
+            i_nb_added = statification.add_objects_to_statification(c_class, session, a_rows, b_commit=False)
+            if i_nb_added < len(a_rows):
+                self.logger.info(str(len(a_rows) - i_nb_added) + ' ' + c_class.__name__ +
+                                 ' ignored because of a missing value')
+
+        if i_nb_item:
+            # set the number of crawled item into the statification object
+            statification.nb_item = (statification.nb_item or 0) + i_nb_item
+
+        EventsFileOffset.upd_offset(session, statification, s_events_file, i_offset)
+        session.commit()
+
+        self.a_external_links.update(a_new_external_links)
@@ -0,0 +1,131 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import heapq
+import logging
+import os
+import re
+from concurrent.futures import ThreadPoolExecutor, FIRST_COMPLETED, wait
+
+# the extension of a file, the files without an extension made of letters and digits are not counted
+EXTENSION_REGEX = re.compile(r'\.([a-zA-Z0-9]+)$')
+
+
+class FileCensus(object):
+    """
+    Count the files of the static repository by extension, with their total size and the largest files.
+    The directories are scanned with os.scandir by a pool of threads, the results of each directory are aggregated as
+    they come so the memory used doesn't depend on the number of files.
+    The entries of the root directory whose name starts with a dot (the .git directory) are ignored, the sub directories
+    that can't be read are skipped.
+    """
+    def __init__(self, s_root: str, i_threads: int = 8, i_largest_files: int = 20, s_logger: str = 'cornetto'):
+        """
+        :param s_root: the path to the directory to scan
+        :param i_threads: the number of threads that scan the directories
+        :param i_largest_files: the number of largest files to keep
+        :param s_logger: the id of the logger
+        """
+        self.logger = logging.getLogger(s_logger)
+        self.s_root = s_root
+        self.i_threads = i_threads
+        self.i_largest_files = i_largest_files
+        # the number of files and their total size, by extension
+        self.counts = {}
+        self.sizes = {}
+        # a heap of the (size, path) of the largest files, the smallest one first
+        self.a_largest_files = []
+
+    @staticmethod
+    def scan_directory(s_directory: str, b_root: bool) -> tuple:
+        """
+        Scan a directory, this method is executed by the threads of the pool
+        :param s_directory: the path to the directory
+        :param b_root: True if the directory is the root of the census
+        :return: a tuple of the list of the sub directories and the list of the (name, size) of the regular files
+        """
+        a_directories = []
+        a_files = []
+        with os.scandir(s_directory) as entries:
+            for entry in entries:
+                if b_root and entry.name.startswith('.'):
+                    continue
+                if entry.is_dir(follow_symlinks=False):
+                    a_directories.append(entry.path)
+                elif entry.is_file(follow_symlinks=False):
+                    try:
+                        a_files.append((entry.name, entry.stat(follow_symlinks=False).st_size))
+                    except FileNotFoundError:
+                        # the file has been deleted since the directory has been listed
+                        continue
+        return a_directories, a_files
+
+    def add_files(self, s_directory: str, a_files: list):
+        """
+        Add the files of a directory to the census
+        :param s_directory: the path to the directory
+        :param a_files: the list of the (name, size) of the files
+        """
+        for s_name, i_size in a_files:
+            match = EXTENSION_REGEX.search(s_name)
+            if match:
+                s_extension = match.group(1)
+                self.counts[s_extension] = self.counts.get(s_extension, 0) + 1
+                self.sizes[s_extension] = self.sizes.get(s_extension, 0) + i_size
+
+            if len(self.a_largest_files) < self.i_largest_files:
+                heapq.heappush(self.a_largest_files, (i_size, os.path.join(s_directory, s_name)))
+            elif i_size > self.a_largest_files[0][0]:
+                heapq.heapreplace(self.a_largest_files, (i_size, os.path.join(s_directory, s_name)))
+
+    def scan(self) -> 'FileCensus':
+        """
+        Scan the whole directory
+        :return: the census
+        :raise OSError if the root directory can't be read, FileNotFoundError if it doesn't exist
+        """
+        with ThreadPoolExecutor(self.i_threads) as executor:
+            pending = {executor.submit(self.scan_directory, self.s_root, True): self.s_root}
+            while pending:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    s_directory = pending.pop(future)
+                    try:
+                        a_directories, a_files = future.result()
+                    except OSError as e:
+                        if s_directory == self.s_root:
+                            raise
+                        # a directory that can't be read or that has been deleted during the scan
+                        self.logger.warning('The directory ' + s_directory + ' has not been counted : ' + str(e))
+                        continue
+                    self.add_files(s_directory, a_files)
+                    for s_sub_directory in a_directories:
+                        pending[executor.submit(self.scan_directory, s_sub_directory, False)] = s_sub_directory
+        return self
+
+    def get_scanned_files(self) -> list:
+        """
+        :return: the list of the (extension, number of files, total size) of the files, by extension
+        """
+        return [(s_extension, i_nb, self.sizes[s_extension]) for s_extension, i_nb in sorted(self.counts.items())]
+
+    def get_largest_files(self) -> list:
+        """
+        :return: the list of the (path relative to the root, size) of the largest files, the largest one first
+        """
+        return [(os.path.relpath(s_path, self.s_root), i_size)
+                for i_size, s_path in sorted(self.a_largest_files, reverse=True)]
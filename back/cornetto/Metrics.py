@@ -0,0 +1,201 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import bisect
+import contextlib
+import math
+import threading
+import time
+
+from collections import OrderedDict
+from typing import Any, Dict, List, Tuple
+
+# the upper bounds in seconds of the buckets of the histograms of durations by default
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60, 300, 900)
+
+
+def format_value(f_value: float) -> str:
+    """
+    :param f_value: a value of a metric
+    :return: the value as written in the Prometheus text format
+    """
+    if f_value == math.inf:
+        return '+Inf'
+    if isinstance(f_value, float) and f_value.is_integer():
+        return str(int(f_value))
+    return str(f_value)
+
+
+def format_labels(labels: Dict[str, Any]) -> str:
+    """
+    :param labels: the labels of a sample, by name
+    :return: the labels as written in the Prometheus text format, empty if there is no label
+    """
+    if not labels:
+        return ''
+    return '{' + ','.join(s_name + '="' + str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n') +
+                          '"' for s_name, value in labels.items()) + '}'
+
+
+def format_family(s_name: str, s_type: str, s_help: str, a_samples: List[Tuple[str, Dict[str, Any], float]]) -> str:
+    """
+    Format a metric and its samples in the Prometheus text format
+    :param s_name: the name of the metric
+    :param s_type: the type of the metric : counter, gauge or histogram
+    :param s_help: the description of the metric
+    :param a_samples: the samples, a tuple (suffix of the name, labels, value) for each one
+    :return: the metric as written in the Prometheus text format
+    """
+    a_lines = ['# HELP ' + s_name + ' ' + s_help, '# TYPE ' + s_name + ' ' + s_type]
+    for s_suffix, labels, f_value in a_samples:
+        a_lines.append(s_name + s_suffix + format_labels(labels) + ' ' + format_value(f_value))
+    return '\n'.join(a_lines) + '\n'
+
+
+class Metrics(object):
+    """
+    The metrics of the process of the API, shared by the requests and the background operations, exposed in the
+    Prometheus text format by the route /metrics.
+    A metric is declared once with its type, then the value of each set of labels is updated :
+    - counter   :   a value that only increases, by inc
+    - gauge     :   a value that is set, by set
+    - histogram :   the distribution of the observed values in buckets, with their sum and their count, by observe or
+                    by time for a duration
+    """
+    def __init__(self):
+        self.lock = threading.Lock()
+        # the type, the description and the buckets of each metric, by name, in the order of declaration
+        self.definitions = OrderedDict()
+        # the value of each set of labels, by name of metric. The value of a histogram is the list of the counts of
+        # each bucket, the sum and the count of the observed values
+        self.values = {}
+
+    def declare(self, s_name: str, s_type: str, s_help: str, a_buckets: Tuple[float, ...] = DEFAULT_BUCKETS):
+        """
+        Declare a metric
+        :param s_name: the name of the metric
+        :param s_type: the type of the metric : counter, gauge or histogram
+        :param s_help: the description of the metric
+        :param a_buckets: the upper bounds of the buckets of a histogram, sorted
+        """
+        with self.lock:
+            self.definitions[s_name] = (s_type, s_help, tuple(a_buckets))
+            self.values.setdefault(s_name, OrderedDict())
+
+    @staticmethod
+    def get_key(labels: Dict[str, Any]) -> Tuple[Tuple[str, str], ...]:
+        """
+        :param labels: the labels of a sample, by name
+        :return: the labels as a hashable key
+        """
+        return tuple(sorted((s_name, str(value)) for s_name, value in labels.items()))
+
+    def inc(self, s_name: str, f_value: float = 1, **labels):
+        """
+        Increase a counter
+        :param s_name: the name of the counter
+        :param f_value: the value added to the counter
+        :param labels: the labels of the sample
+        """
+        key = self.get_key(labels)
+        with self.lock:
+            self.values[s_name][key] = self.values[s_name].get(key, 0) + f_value
+
+    def set(self, s_name: str, f_value: float, **labels):
+        """
+        Set a gauge
+        :param s_name: the name of the gauge
+        :param f_value: the value of the gauge
+        :param labels: the labels of the sample
+        """
+        with self.lock:
+            self.values[s_name][self.get_key(labels)] = f_value
+
+    def observe(self, s_name: str, f_value: float, **labels):
+        """
+        Add a value to a histogram
+        :param s_name: the name of the histogram
+        :param f_value: the observed value
+        :param labels: the labels of the sample
+        """
+        a_buckets = self.definitions[s_name][2]
+        key = self.get_key(labels)
+        with self.lock:
+            histogram = self.values[s_name].get(key)
+            if histogram is None:
+                histogram = self.values[s_name][key] = [[0] * len(a_buckets), 0.0, 0]
+            i_bucket = bisect.bisect_left(a_buckets, f_value)
+            if i_bucket < len(a_buckets):
+                histogram[0][i_bucket] += 1
+            histogram[1] += f_value
+            histogram[2] += 1
+
+    @contextlib.contextmanager
+    def time(self, s_name: str, **labels):
+        """
+        Add the duration of the block to a histogram, in seconds, even if the block raises an exception
+        :param s_name: the name of the histogram
+        :param labels: the labels of the sample
+        """
+        f_start = time.monotonic()
+        try:
+            yield
+        finally:
+            self.observe(s_name, time.monotonic() - f_start, **labels)
+
+    def get_samples(self, s_name: str) -> List[Tuple[str, Dict[str, Any], float]]:
+        """
+        :param s_name: the name of a metric
+        :return: the samples of the metric, a tuple (suffix of the name, labels, value) for each one
+        """
+        s_type, s_help, a_buckets = self.definitions[s_name]
+        a_samples = []
+        for key, value in self.values[s_name].items():
+            labels = OrderedDict(key)
+            if s_type != 'histogram':
+                a_samples.append(('', labels, value))
+                continue
+            a_counts, f_sum, i_count = value
+            i_cumulative_count = 0
+            for f_bucket, i_bucket_count in zip(a_buckets, a_counts):
+                i_cumulative_count += i_bucket_count
+                a_samples.append(('_bucket', OrderedDict(labels, le=format_value(float(f_bucket))),
+                                  i_cumulative_count))
+            a_samples.append(('_bucket', OrderedDict(labels, le='+Inf'), i_count))
+            a_samples.append(('_sum', labels, f_sum))
+            a_samples.append(('_count', labels, i_count))
+        return a_samples
+
+    def render(self) -> str:
+        """
+        :return: all the metrics in the Prometheus text format
+        """
+        with self.lock:
+            return ''.join(format_family(s_name, s_type, s_help, self.get_samples(s_name))
+                           for s_name, (s_type, s_help, a_buckets) in self.definitions.items())
+
+
+# the metrics of the process of the API
+metrics = Metrics()
+metrics.declare('cornetto_http_request_duration_seconds', 'histogram',
+                'Duration of the requests of the API by route, method and status code.')
+metrics.declare('cornetto_postprocessing_duration_seconds', 'histogram',
+                'Duration of the phases of the finalization of a statification after the crawl.')
+metrics.declare('cornetto_git_duration_seconds', 'histogram',
+                'Duration of the git commands run by the API by command.')
+metrics.declare('cornetto_operation_duration_seconds', 'histogram',
+                'Duration of the background operations (commit, pushtoprod, visualize) by operation.')
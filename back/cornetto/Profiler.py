@@ -0,0 +1,134 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import cProfile
+import os
+import pstats
+import threading
+
+from typing import Any, Dict, List, Optional
+
+# the index of the value of a function in pstats.Stats.stats by which the hotspots can be sorted
+SORT_KEYS = {
+    'calls': 1,
+    'time': 2,
+    'cumulative': 3
+}
+
+
+def get_hotspots(stats: pstats.Stats, s_sort: str = 'cumulative', i_limit: int = 20) -> List[Dict[str, Any]]:
+    """
+    :param stats: the statistics of a profile
+    :param s_sort: calls, time (the time spent in the function itself) or cumulative (the time spent in the function
+                   and the functions it calls)
+    :param i_limit: the maximum number of functions
+    :return: the functions where the most time is spent, with their number of calls, their own time and their
+             cumulative time in seconds
+    """
+    i_sort_key = SORT_KEYS.get(s_sort, SORT_KEYS['cumulative'])
+    a_functions = sorted(stats.stats.items(), key=lambda item: item[1][i_sort_key], reverse=True)[:i_limit]
+    return [{
+        'function': s_function,
+        'file': s_file,
+        'line': i_line,
+        'calls': i_calls,
+        'total_time': round(f_total_time, 6),
+        'cumulative_time': round(f_cumulative_time, 6)
+    } for (s_file, i_line, s_function), (_, i_calls, f_total_time, f_cumulative_time, _) in a_functions]
+
+
+class Profiler(object):
+    """
+    The profile of the requests of the API by route, accumulated by a process since it started.
+    Each request of a profiled route is profiled with cProfile in its thread. Since Python 3.12 only one profiler
+    can be active in the process, the requests that arrive while another one is profiled are not profiled.
+    """
+    def __init__(self, a_routes: List[str] = None):
+        """
+        :param a_routes: the rules of the profiled routes (for example /api/statification/status), all the routes
+                         are profiled if it is empty
+        """
+        self.a_routes = a_routes or []
+        self.lock = threading.Lock()
+        self.stats = {}
+        self.requests = {}
+
+    def is_profiled(self, s_route: str) -> bool:
+        """
+        :param s_route: the rule of a route
+        :return: True if the requests of the route are profiled
+        """
+        return not self.a_routes or s_route in self.a_routes
+
+    @staticmethod
+    def start() -> Optional[cProfile.Profile]:
+        """
+        Start to profile the current thread
+        :return: the profile, or None if another profiler is active
+        """
+        profile = cProfile.Profile()
+        try:
+            profile.enable()
+        except ValueError:
+            return None
+        return profile
+
+    def stop(self, profile: cProfile.Profile, s_route: str):
+        """
+        Stop to profile the current thread and add the profile to the profile of the route
+        :param profile: the profile returned by start
+        :param s_route: the rule of the route of the request
+        """
+        profile.disable()
+        with self.lock:
+            if s_route in self.stats:
+                self.stats[s_route].add(profile)
+            else:
+                self.stats[s_route] = pstats.Stats(profile)
+            self.requests[s_route] = self.requests.get(s_route, 0) + 1
+
+    def get_routes(self, s_route: str = '', s_sort: str = 'cumulative', i_limit: int = 20) -> List[Dict[str, Any]]:
+        """
+        :param s_route: the rule of a route, empty for all the profiled routes
+        :param s_sort: the order of the hotspots, see get_hotspots
+        :param i_limit: the maximum number of hotspots by route
+        :return: the number of profiled requests, the total time and the hotspots of each route
+        """
+        with self.lock:
+            return [{
+                'route': s_profiled_route,
+                'requests': self.requests[s_profiled_route],
+                'total_time': round(stats.total_tt, 6),
+                'hotspots': get_hotspots(stats, s_sort, i_limit)
+            } for s_profiled_route, stats in sorted(self.stats.items()) if s_route in ('', s_profiled_route)]
+
+
+def get_file_hotspots(s_profile_file: str, s_sort: str = 'cumulative',
+                      i_limit: int = 20) -> Optional[Dict[str, Any]]:
+    """
+    :param s_profile_file: the path to a profile written by pstats, as the profile of a crawl
+    :param s_sort: the order of the hotspots, see get_hotspots
+    :param i_limit: the maximum number of hotspots
+    :return: the total time and the hotspots of the profile, or None if the file doesn't exist
+    """
+    if not os.path.isfile(s_profile_file):
+        return None
+    stats = pstats.Stats(s_profile_file)
+    return {
+        'total_time': round(stats.total_tt, 6),
+        'hotspots': get_hotspots(stats, s_sort, i_limit)
+    }
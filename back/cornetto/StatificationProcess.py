@@ -16,31 +16,41 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 """
 import fcntl
+import json
 import logging
 import os
+import pstats
 import re
+import shutil
 import signal
+import threading
 from datetime import datetime
 
 import sh
 from sqlalchemy.orm import Session
 from sqlalchemy.orm.exc import NoResultFound
 
-from cornetto.models.ErrorTypeMIME import ErrorTypeMIME
-from cornetto.models.ExternalLink import ExternalLink
-from cornetto.models.HtmlError import HtmlError
+from cornetto.EventsIngester import EventsIngester
+from cornetto.FileCensus import FileCensus
+from cornetto.Metrics import metrics
+from cornetto.models.LargestFile import LargestFile
 from cornetto.models.ScannedFile import ScannedFile
-from cornetto.models.ScrapyError import ScrapyError
 from cornetto.models.StatificationHistoric import StatificationHistoric, Actions
 from cornetto.models.Statification import Statification, Status
-from cornetto.models import open_session_db
+from cornetto.models import open_session_db, close_session_db
+
+# the name of the temporary files where the crawler streams the large files, in the output directory
+PARTIAL_FILE_REGEX = re.compile(r'^\.[0-9a-f]{32}\.part$')
 
 
 class StatificationProcess:
     def __init__(self, s_logger: str, s_repository_path: str, s_python_path: str, s_urls: str, s_domains: str, s_log_file: str,
                  s_project_directory: str, s_database_uri: str, s_pid_file: str, s_lock_file: str,
                  s_crawler_progress_counter_file: str, s_delete_files: str = '', s_delete_directories: str = '',
-                 s_url_regex: str = '', s_url_replacement: str = ''):
+                 s_url_regex: str = '', s_url_replacement: str = '', b_incremental: bool = False,
+                 s_validators_file: str = '', i_parse_processes: int = 0, i_shards: int = 1,
+                 s_frontier_file: str = '', s_job_dir: str = '', f_ingest_interval: float = 2,
+                 b_profile: bool = False):
         """
         Initialize a StatificationProcess thread with the specified settings
         :param s_logger: the id of the logger
@@ -53,11 +63,24 @@ class StatificationProcess:
         :param s_database_uri: the uri of the database
         :param s_pid_file: the path to the file that will store the subprocess id
         :param s_lock_file: the path to the lockfile
-        :param s_crawler_progress_counter_file: the path to the file that will store the count of crawled files
+        :param s_crawler_progress_counter_file: the path to the file where the crawler writes the snapshot of its stats
         :param s_delete_files: the list of files to be deleted at the end of the statification process
         :param s_delete_directories: the list of directories to be deleted at the end of the statification process
         :param s_url_regex: the regex to identify url to be replaced by s_url_replacement
         :param s_url_replacement: the new url to set to replace the match made by s_url_regex
+        :param b_incremental: if True only the content modified since the previous statification is downloaded
+        :param s_validators_file: the path to the file that store the validators (ETag, Last-Modified, hash) of
+                                  the previous statification, used in incremental mode
+        :param i_parse_processes: the number of processes used by the crawler to parse the HTML, CSS and XML files,
+                                  0 to parse them in the crawler process
+        :param i_shards: the number of crawler processes, each one crawls a partition of the urls
+        :param s_frontier_file: the path to the database used by the crawler processes to hand off the urls to each
+                                other, the crawl is sharded only if it is set
+        :param s_job_dir: the path to the directory where the crawler writes the state of the crawl, if it is set a
+                          statification that has been paused or has failed can be resumed
+        :param f_ingest_interval: the number of seconds between two registrations of the events of the crawl into the
+                                  database while the crawl runs, 0 to register them only when the crawl is over
+        :param b_profile: if True the crawler processes are profiled, the profile is written next to the log file
         """
         self.logger = logging.getLogger(s_logger)
         self.s_repository_path = s_repository_path
@@ -67,6 +90,11 @@ class StatificationProcess:
         self.s_delete_files = s_delete_files
         self.s_delete_directories = s_delete_directories
         self.s_log_file = s_log_file
+        # the events written by the crawler, next to the log file
+        self.s_events_file = s_log_file + '.events.jsonl'
+        # the profile of the crawler, next to the log file
+        self.s_profile_file = s_log_file + '.prof'
+        self.b_profile = b_profile
         self.s_url_regex = s_url_regex
         self.s_url_replacement = s_url_replacement
 
@@ -75,6 +103,22 @@ class StatificationProcess:
         self.s_pid_file = s_pid_file
         self.s_lockfile = s_lock_file
         self.s_crawler_progress_counter_file = s_crawler_progress_counter_file
+        self.b_incremental = b_incremental and bool(s_validators_file)
+        self.s_validators_file = s_validators_file
+        self.i_parse_processes = i_parse_processes
+        self.i_shards = max(i_shards, 1) if s_frontier_file else 1
+        self.s_frontier_file = s_frontier_file
+        self.s_job_dir = s_job_dir
+        self.f_ingest_interval = f_ingest_interval
+
+        # the thread that registers the events of the crawl into the database while the crawl runs
+        self.ingester = None
+
+        # the crawler processes of a sharded statification that are still running and their exit codes,
+        # the statification is finalized when the last one is done
+        self.shards_lock = threading.Lock()
+        self.a_running_shards = []
+        self.a_shards_exit_codes = []
 
     def is_running(self) -> bool:
         """
@@ -102,6 +146,8 @@ class StatificationProcess:
         :param success : a boolean to know if the process has been finish successfully or not,
                          by default it's unsuccessful
         """
+        # the ingester must not register events of a statification that is being deleted
+        self.stop_ingester()
 
         # if success is True and there is an object Statification linked to the process
         if not success:
@@ -121,9 +167,10 @@ class StatificationProcess:
             # read the pid
             s_pid = f_pid_file.read()
             f_pid_file.close()
-            if not s_pid == "":
+            # there is one pid per line, a sharded statification runs several crawler processes
+            for s_pid_line in s_pid.split():
                 # get an Integer
-                i_pid = int(s_pid)
+                i_pid = int(s_pid_line)
                 try:
                     # kill the process with the pid
                     os.kill(i_pid, signal.SIGTERM)
@@ -163,16 +210,32 @@ class StatificationProcess:
         # create a session for this specific code , because it's executed after the flask instance has been killed
         session = open_session_db(self.s_database_uri)
 
-        # if the process finished with exit code 0 (success)
-        if exit_code == 0:
+        # the end of the events files is registered by the finalization
+        self.stop_ingester()
+
+        if self.is_interrupted(exit_code):
+            # keep the statification and the state of the crawl so the statification can be resumed
+            self.logger.info('The statification has been interrupted, it can be resumed')
             try:
-                # fill the database with the log
-                self.register_error_in_database(session)
+                # the events of the interrupted crawl stay queryable
+                self.create_ingester().ingest(session)
             except (NoResultFound, IndexError):
-                self.logger.info('There is no current statification, no error will be registered in the database')
+                self.logger.info('There is no current statification, no event will be registered in the database')
+            self.stop(session, True)
+        else:
+            # if the process finished with exit code 0 (success)
+            if exit_code == 0:
+                try:
+                    # fill the database with the log
+                    self.register_error_in_database(session)
+                except (NoResultFound, IndexError):
+                    self.logger.info('There is no current statification, no error will be registered in the database')
+
+            # delete the pid in the file and clear the statification if not a success
+            self.stop(session, success)
 
-        # delete the pid in the file and clear the statification if not a success
-        self.stop(session, success)
+            # the crawl is over, it can't be resumed
+            self.clear_job_dir()
 
         # open the file if it exist, create it if it doesn't exist
         f_lock_file = open(self.s_lockfile, "w+")
@@ -181,10 +244,115 @@ class StatificationProcess:
         f_lock_file.close()
 
         # terminate the session
-        session.close()
+        close_session_db(self.s_database_uri)
+
+        for s_crawler_progress_counter_file in self.get_crawler_progress_counter_files():
+            file_progress_counter = open(s_crawler_progress_counter_file, 'w')
+            file_progress_counter.close()
+
+    def shard_done(self, cmd: str, success: bool, exit_code: int):
+        """
+        That method is called after a crawler process of a sharded statification has finish, the files of the shards
+        are merged and the statification is finalized when the last process is done
+        :param cmd: the string containing the command that launched scrapy
+        :param success: a boolean , true if successful, false otherwise
+        :param exit_code: the exit code that was return by the command
+        """
+        with self.shards_lock:
+            self.a_running_shards = [process for process in self.a_running_shards if process.pid != cmd.pid]
+            self.a_shards_exit_codes.append(exit_code)
+            a_running_shards = list(self.a_running_shards)
+
+        self.logger.info("a crawler process has finished with exit code : " + str(exit_code))
+
+        if a_running_shards:
+            if exit_code != 0:
+                # the other shards would wait forever for the urls of the failed one, stop them
+                for process in a_running_shards:
+                    try:
+                        os.kill(process.pid, signal.SIGTERM)
+                    except ProcessLookupError:
+                        pass
+            return
+
+        # the statification is successful only if every shard is
+        i_exit_code = next((i_code for i_code in self.a_shards_exit_codes if i_code != 0), 0)
+
+        # the files of the shards of an interrupted statification are kept to resume it
+        if not self.is_interrupted(i_exit_code):
+            with metrics.time('cornetto_postprocessing_duration_seconds', phase='merge_shards_files'):
+                self.merge_shards_files()
 
-        file_progress_counter = open(self.s_crawler_progress_counter_file, 'w')
-        file_progress_counter.close()
+        self.done(cmd, i_exit_code == 0, i_exit_code)
+
+    def merge_shards_files(self):
+        """
+        Merge the log files and the validators files of the shards of a sharded statification into the files of the
+        statification, then remove the files of the shards and the shared frontier
+        """
+        # the log files are only read by the users, the results of the crawl are registered from the events files
+        with open(self.s_log_file, 'ab') as f_log_file:
+            for i_shard in range(self.i_shards):
+                s_shard_log_file = self.s_log_file + '.' + str(i_shard)
+                try:
+                    with open(s_shard_log_file, 'rb') as f_shard_log_file:
+                        shutil.copyfileobj(f_shard_log_file, f_log_file)
+                    os.remove(s_shard_log_file)
+                except FileNotFoundError:
+                    self.logger.info('No log file for the shard ' + str(i_shard))
+
+        if self.b_incremental:
+            with open(self.s_validators_file + '.new', 'w') as f_validators_file:
+                for i_shard in range(self.i_shards):
+                    s_shard_validators_file = self.s_validators_file + '.new.' + str(i_shard)
+                    if os.path.isfile(s_shard_validators_file):
+                        with open(s_shard_validators_file) as f_shard_validators_file:
+                            f_validators_file.write(f_shard_validators_file.read())
+                        os.remove(s_shard_validators_file)
+
+        # the profiles of the shards are merged into one profile of the statification
+        a_profile_files = [s_file for s_file in self.get_profile_files() if os.path.isfile(s_file)]
+        if a_profile_files:
+            pstats.Stats(*a_profile_files).dump_stats(self.s_profile_file)
+            for s_profile_file in a_profile_files:
+                os.remove(s_profile_file)
+
+        self.remove_frontier()
+
+    def remove_frontier(self):
+        """
+        Remove the database of the shared frontier of a sharded statification
+        """
+        for s_suffix in ['', '-wal', '-shm']:
+            if os.path.isfile(self.s_frontier_file + s_suffix):
+                os.remove(self.s_frontier_file + s_suffix)
+
+    def get_crawler_progress_counter_files(self) -> list:
+        """
+        :return: the list of the files that store the count of crawled files, there is one file per shard in a
+                 sharded statification
+        """
+        if self.i_shards > 1:
+            return [self.s_crawler_progress_counter_file + '.' + str(i_shard) for i_shard in range(self.i_shards)]
+        return [self.s_crawler_progress_counter_file]
+
+    def get_profile_files(self) -> list:
+        """
+        :return: the list of the files where the crawler processes write their profile, there is one file per shard in
+                 a sharded statification, next to the log file of the shard
+        """
+        if self.i_shards > 1:
+            return [self.s_log_file + '.' + str(i_shard) + '.prof' for i_shard in range(self.i_shards)]
+        return [self.s_profile_file]
+
+    def get_events_files(self) -> list:
+        """
+        :return: the list of the files where the crawler writes its events, there is one file per shard in a sharded
+                 statification
+        """
+        if self.i_shards > 1:
+            return [self.s_events_file + '.' + str(i_shard) for i_shard in range(self.i_shards)]
+        return [self.s_events_file]
 
     def start(self, session: Session, s_designation: str, s_description: str, s_user: str):
         """
@@ -224,36 +392,228 @@ class StatificationProcess:
             f_log_file = open(self.s_log_file, "w")
             f_log_file.close()
 
-            try:
-                # create a new environnement to call subprocess
-                new_env = os.environ.copy()
-                new_env["PYTHONPATH"] = self.s_python_path
+            # erase the events and the profile of the precedent statification
+            for s_events_file in self.get_events_files() + self.get_profile_files() + [self.s_profile_file]:
+                if os.path.isfile(s_events_file):
+                    os.remove(s_events_file)
 
-                # create a subprocess that will run scrapy in background
-                process = sh.python3('scrapy_cmd.py', 'crawl', '--loglevel=INFO',
-                                     '--logfile=' + self.s_log_file,
-                                     '-a', 'output=' + self.s_repository_path,
-                                     '-a', 'urls="' + self.s_urls + '"',
-                                     '-a', 'domains="' + self.s_domains + '"',
-                                     '-a', 'url_regex="' + self.s_url_regex + '"',
-                                     '-a', 'url_replacement="' + self.s_url_replacement + '"',
-                                     '-a', 'crawler_count_file=' + self.s_crawler_progress_counter_file,
-                                     'mirroring',
-                                     _cwd=self.s_project_directory, _env=new_env, _bg=True,
-                                     _tty_out=False, _done=self.done)
-
-                # create the pid file if it doesn't exist, erase the file if it exist
-                f_pid_file = open(self.s_pid_file, "w")
-                # write the new process pid in the file
-                f_pid_file.write(str(process.pid))
-                f_pid_file.close()
-
-            except sh.ErrorReturnCode_1 as e:
-                self.logger.info(str(e))
+            if self.b_incremental:
+                # remove the validators of a crawl that has not been committed
+                for s_suffix in ['.new'] + ['.new.' + str(i_shard) for i_shard in range(self.i_shards)]:
+                    if os.path.isfile(self.s_validators_file + s_suffix):
+                        os.remove(self.s_validators_file + s_suffix)
+
+            # the state of an interrupted crawl must not be reused
+            self.clear_job_dir()
+            if self.i_shards > 1:
+                self.remove_frontier()
+
+            self.launch_crawl()
 
         else:
             raise ValueError("Verify your parameter it seems that one is empty or that one file doesn't exist")
 
+    def launch_crawl(self):
+        """
+        Launch the crawler processes of the statification
+        """
+        # the arguments of the spider
+        a_spider_args = ['-a', 'output=' + self.s_repository_path,
+                         '-a', 'urls="' + self.s_urls + '"',
+                         '-a', 'domains="' + self.s_domains + '"',
+                         '-a', 'url_regex="' + self.s_url_regex + '"',
+                         '-a', 'url_replacement="' + self.s_url_replacement + '"']
+
+        if self.b_incremental:
+            # give the validators of the previous statification to the spider
+            a_spider_args += ['-a', 'validators_file=' + self.s_validators_file]
+
+        if self.i_parse_processes > 0:
+            # parse the documents with a pool of processes
+            a_spider_args += ['-a', 'parse_processes=' + str(self.i_parse_processes)]
+
+        # the profile of each process is written next to its log file
+        a_profile_files = self.get_profile_files() if self.b_profile else [''] * self.i_shards
+
+        try:
+            # create a new environnement to call subprocess
+            new_env = os.environ.copy()
+            new_env["PYTHONPATH"] = self.s_python_path
+
+            if self.i_shards > 1:
+                a_processes = self.start_shards(a_spider_args, new_env, a_profile_files)
+            else:
+                # create a subprocess that will run scrapy in background
+                a_processes = [sh.python3('scrapy_cmd.py', 'crawl', '--loglevel=INFO',
+                                          '--logfile=' + self.s_log_file,
+                                          *a_spider_args,
+                                          '-s', 'STATS_EXPORTER_FILE=' + self.s_crawler_progress_counter_file,
+                                          '-a', 'events_file=' + self.s_events_file,
+                                          '-s', 'CRAWLER_JOB_DIR=' + self.get_job_dir(),
+                                          '-s', 'PROFILER_FILE=' + a_profile_files[0],
+                                          'mirroring',
+                                          _cwd=self.s_project_directory, _env=new_env, _bg=True,
+                                          _tty_out=False, _done=self.done)]
+
+            # create the pid file if it doesn't exist, erase the file if it exist
+            f_pid_file = open(self.s_pid_file, "w")
+            # write the new processes pid in the file, one per line
+            f_pid_file.write('\n'.join(str(process.pid) for process in a_processes))
+            f_pid_file.close()
+
+            if self.f_ingest_interval > 0:
+                self.start_ingester()
+
+        except sh.ErrorReturnCode_1 as e:
+            self.logger.info(str(e))
+
+    def create_ingester(self) -> EventsIngester:
+        """
+        :return: an ingester of the events files of the statification
+        """
+        return EventsIngester(self.logger.name, self.s_database_uri, self.get_events_files(), self.f_ingest_interval)
+
+    def start_ingester(self):
+        """
+        Start to register the events of the crawl into the database while the crawl runs
+        """
+        self.stop_ingester()
+        self.ingester = self.create_ingester()
+        self.ingester.start()
+
+    def stop_ingester(self):
+        """
+        Stop the registration of the events of the crawl while it runs
+        """
+        if self.ingester is not None:
+            self.ingester.stop()
+            self.ingester = None
+
+    def pause(self):
+        """
+        Stop the crawler processes but keep the statification and the state of the crawl, so the statification can
+        be resumed. The processes are stopped gracefully, the method doesn't wait for them.
+        """
+        if not self.s_job_dir:
+            raise ValueError("The statification can't be paused without a job directory")
+
+        # the flag is read when the processes are done, they can finish after a restart of the application
+        os.makedirs(self.s_job_dir, exist_ok=True)
+        f_paused_file = open(os.path.join(self.s_job_dir, 'paused'), 'w')
+        f_paused_file.close()
+
+        try:
+            f_pid_file = open(self.s_pid_file)
+            s_pid = f_pid_file.read()
+            f_pid_file.close()
+        except FileNotFoundError:
+            s_pid = ''
+
+        for s_pid_line in s_pid.split():
+            try:
+                # a single SIGTERM lets scrapy close the spider and write the state of the crawl
+                os.kill(int(s_pid_line), signal.SIGTERM)
+            except ProcessLookupError as e:
+                self.logger.debug('The process was already stopped' + str(e))
+
+    def is_paused(self) -> bool:
+        """
+        :return: True if the statification has been paused
+        """
+        return bool(self.s_job_dir) and os.path.isfile(os.path.join(self.s_job_dir, 'paused'))
+
+    def is_interrupted(self, exit_code: int) -> bool:
+        """
+        Check if the crawl has been paused or has failed, with a job directory it can then be resumed
+        :param exit_code: the exit code of the crawler process
+        :return: True if the statification has been interrupted
+        """
+        return bool(self.s_job_dir) and (self.is_paused() or exit_code != 0)
+
+    def is_resumable(self, session: Session) -> bool:
+        """
+        Check if there is an interrupted statification that can be resumed
+        :param session: the database session
+        :return: True if the statification can be resumed
+        """
+        if not self.s_job_dir or not os.path.isdir(self.s_job_dir) or self.is_running():
+            return False
+        try:
+            # the statification is deleted if the crawl has been stopped
+            statification = Statification.get_statification(session, '')
+        except (NoResultFound, IndexError):
+            return False
+        return statification.status == Status.CREATED
+
+    def resume(self, session: Session, s_user: str):
+        """
+        Resume an interrupted statification, the crawl continues where it has been stopped : the urls already crawled
+        aren't downloaded again and the log of the statification is completed.
+        :param session: the database session
+        :param s_user: the name of the user which resumed the operation
+        :raise ValueError if there is no statification to resume
+        """
+        if not self.is_resumable(session):
+            raise ValueError("There is no statification to resume")
+
+        self.logger.info("Resume Statification")
+
+        statification = Statification.get_statification(session, '')
+        statification.add_object_to_statification(StatificationHistoric, session, datetime.utcnow(), s_user,
+                                                  Actions.UPDATE_STATIFICATION)
+
+        if self.is_paused():
+            os.remove(os.path.join(self.s_job_dir, 'paused'))
+
+        self.launch_crawl()
+
+    def get_job_dir(self, i_shard: int = None) -> str:
+        """
+        :param i_shard: the number of the shard in a sharded statification
+        :return: the directory where a crawler process writes the state of the crawl, empty if it isn't set
+        """
+        if not self.s_job_dir or i_shard is None:
+            return self.s_job_dir
+        return os.path.join(self.s_job_dir, 'shard' + str(i_shard))
+
+    def clear_job_dir(self):
+        """
+        Remove the state of the crawl
+        """
+        if self.s_job_dir and os.path.isdir(self.s_job_dir):
+            shutil.rmtree(self.s_job_dir)
+
+    def start_shards(self, a_spider_args: list, new_env: dict, a_profile_files: list) -> list:
+        """
+        Start the crawler processes of a sharded statification, each one has its own log file and counter file that
+        are aggregated by the application
+        :param a_spider_args: the arguments of the spider shared by all the shards
+        :param new_env: the environment of the processes
+        :param a_profile_files: the file of the profile of each shard, empty if the shard isn't profiled
+        :return: the list of the processes
+        """
+        with self.shards_lock:
+            self.a_running_shards = []
+            self.a_shards_exit_codes = []
+
+            for i_shard in range(self.i_shards):
+                self.a_running_shards.append(
+                    sh.python3('scrapy_cmd.py', 'crawl', '--loglevel=INFO',
+                               '--logfile=' + self.s_log_file + '.' + str(i_shard),
+                               *a_spider_args,
+                               '-s', 'STATS_EXPORTER_FILE=' + self.s_crawler_progress_counter_file + '.' + str(i_shard),
+                               '-a', 'events_file=' + self.s_events_file + '.' + str(i_shard),
+                               '-a', 'shards=' + str(self.i_shards),
+                               '-a', 'shard=' + str(i_shard),
+                               '-a', 'frontier_file=' + self.s_frontier_file,
+                               '-s', 'CRAWLER_JOB_DIR=' + self.get_job_dir(i_shard),
+                               '-s', 'PROFILER_FILE=' + a_profile_files[i_shard],
+                               'mirroring',
+                               _cwd=self.s_project_directory, _env=new_env, _bg=True,
+                               _tty_out=False, _done=self.shard_done))
+
+            return list(self.a_running_shards)
+
     def delete_files(self):
         """
         Delete the list of files passed in parameter
@@ -279,6 +639,48 @@ class StatificationProcess:
             if os.path.isdir(directory):
                 os.removedirs(directory)
 
+    def delete_stale_files(self):
+        """
+        In incremental mode the repository isn't emptied before the crawl, so delete all the files that haven't been
+        crawled (the files deleted in the CMS since the previous statification)
+        """
+        self.logger.log(logging.INFO, "> Suppression des fichiers qui n'ont pas été parcourus...")
+
+        # get the list of the files crawled, they are listed in the validators of the current crawl
+        a_crawled_files = set()
+        try:
+            with open(self.s_validators_file + '.new') as f_validators_file:
+                for line in f_validators_file:
+                    if line.strip():
+                        a_crawled_files.add(os.path.normpath(self.s_repository_path + json.loads(line)['filename']))
+        except FileNotFoundError:
+            self.logger.info('No validators for the current crawl, no file will be deleted')
+            return
+
+        for s_directory, a_directories, a_files in os.walk(self.s_repository_path):
+            # never look into the git directory
+            if '.git' in a_directories:
+                a_directories.remove('.git')
+            for s_file in a_files:
+                s_path = os.path.normpath(os.path.join(s_directory, s_file))
+                if s_path not in a_crawled_files:
+                    os.remove(s_path)
+
+    def delete_partial_files(self):
+        """
+        Delete the temporary files where the crawler streams the large files and that have not been moved to their
+        place, because the crawl has been interrupted
+        """
+        self.logger.log(logging.INFO, "> Suppression des fichiers partiellement téléchargés...")
+
+        for s_directory, a_directories, a_files in os.walk(self.s_repository_path):
+            # never look into the git directory
+            if '.git' in a_directories:
+                a_directories.remove('.git')
+            for s_file in a_files:
+                if PARTIAL_FILE_REGEX.match(s_file):
+                    os.remove(os.path.join(s_directory, s_file))
+
     def delete_empty_directories(self):
         """
         Delete all the empty directories inside one
@@ -299,161 +701,47 @@ class StatificationProcess:
 
     def register_error_in_database(self, session: Session):
         """
-        This methode create database object associated to the statification with the result of the log
+        This methode create database object associated to the statification with the events
         that scrapy has generated.
         :param session
         :raise NoResultFound if there is no statification with empty commit sha
         """
 
-        # finalization of the statification by removing unwanted files and directories and empty directories
-        self.delete_files()
-        self.delete_directories()
-        self.delete_empty_directories()
+        # finalization of the statification by removing unwanted files and directories and empty directories,
+        # the duration of each phase is measured
+        if self.b_incremental:
+            with metrics.time('cornetto_postprocessing_duration_seconds', phase='delete_stale_files'):
+                self.delete_stale_files()
+        else:
+            # the stale files deleted in incremental mode include the partial files
+            with metrics.time('cornetto_postprocessing_duration_seconds', phase='delete_partial_files'):
+                self.delete_partial_files()
+        with metrics.time('cornetto_postprocessing_duration_seconds', phase='delete_files'):
+            self.delete_files()
+        with metrics.time('cornetto_postprocessing_duration_seconds', phase='delete_directories'):
+            self.delete_directories()
+        with metrics.time('cornetto_postprocessing_duration_seconds', phase='delete_empty_directories'):
+            self.delete_empty_directories()
 
         # get the statification with empty commit
         statification = Statification.get_statification(session, '')
 
-        # open the log file that contain scrapy errors
-        f_file = open(self.s_log_file)
-
-        expecting_other_line_for_error_message = False
-        s_error_message = ''
-
-        # for each line will look for information that will be used to fill object of the database
-        for line in f_file:
-
-            # check if the line contain a warning or a info
-            if re.match('(.*)WARNING(.*)', line) or re.match('(.*)INFO(.*)', line) or re.match('(.*) ERROR:(.*)', line):
-                expecting_other_line_for_error_message = False
+        # register the events of the crawl that have not been registered while the crawl was running
+        with metrics.time('cornetto_postprocessing_duration_seconds', phase='ingest_events'):
+            self.create_ingester().ingest(session)
 
-            if expecting_other_line_for_error_message:
-                s_error_message += line
-
-            if (not expecting_other_line_for_error_message) and s_error_message != '':
-                statification.add_object_to_statification(ScrapyError, session, s_error_message)
-                s_error_message = ''
-
-            # in the case the line match an External link
-            if re.match('(.*) INFO: External link detected(.*)', line):
-                # we get the second part of the line there are also [] in the first part
-                s_trunked_line = line[line.index('INFO: External link detected'):len(line)]
-
-                # we get the position of begining of the URL
-                i_start_url = s_trunked_line.index('[')
-                # we ge the position of the end of the URL
-                i_end_url = s_trunked_line.index(']')
-                # we get the position of the begining of the source url
-                i_start_source = s_trunked_line.index(' in ') + 4
-
-                try:
-                    # we create and add a new ExtenalLink to our statification
-                    statification.add_object_to_statification(
-                        ExternalLink,
-                        session,
-                        s_trunked_line[i_start_source: len(s_trunked_line)],
-                        s_trunked_line[i_start_url + 1:i_end_url]
-                    )
-                except ValueError as e:
-                    self.logger.info(e)
-            # in the case the line match a Scrapy Error
-            elif re.match('(.*) ERROR:(.*)', line):
-                expecting_other_line_for_error_message = True
-                # retrieve the Scrapy Error
-                s_trunked_line = line[line.index('ERROR: ') + 7: len(line)]
-                s_error_message += s_trunked_line
-
-            # in the case the line match an error for type MIME
-            elif re.match('(.*) WARNING: Forbidden content (.*)', line):
-
-                # we get the second part of the line where begin the information that interest us
-                s_trunked_line = line[line.index('WARNING: Forbidden content '):len(line)]
-
-                # get the starting position of the Error type MIME
-                i_start_error_mime = s_trunked_line.index('[')
-                # get the end position of the error type MIME
-                i_end_error_mime = s_trunked_line.index(']')
-                # get the error type MIME
-                s_error_mime = s_trunked_line[i_start_error_mime + 1: i_end_error_mime]
-                # get the source of the error
-                s_source_link = s_trunked_line[s_trunked_line.index('detected in') + 12: len(s_trunked_line)]
-
-                try:
-                    # create an ErrorTypeMIME associated to the statification
-                    statification.add_object_to_statification(ErrorTypeMIME, session, s_error_mime, s_source_link)
-                except ValueError as e:
-                    self.logger.info(e)
-            # in the case the line match an HTTP error
-            elif re.match('(.*) WARNING: HTTP error (.*)', line):
-
-                # we get the second part of the line where begin the information that interest us
-                s_trunked_line = line[line.index('WARNING: HTTP error '):len(line)]
-
-                # we get the starting position of the Error Code
-                i_start_error_code = s_trunked_line.index('[')
-                # we get the end position of the Error Code
-                i_end_error_code = s_trunked_line.index(']')
-                # we get the start position of the url source of the error
-                i_start_url = s_trunked_line.index(' for ')
-                # we get the end position of the url source of the error
-                i_end_url = s_trunked_line.index(' from ')
-
-                # we retrieve the error code
-                s_error_code = s_trunked_line[i_start_error_code + 1: i_end_error_code]
-
-                # we retrieve the url that cause the error
-                s_url = s_trunked_line[i_start_url + 5: i_end_url]
-
-                # we retrieve the url of the source where was found the url that caused the error
-                s_url_source = s_trunked_line[i_end_url + 6: len(s_trunked_line) - 1]
-
-                try:
-                    # we create a new HtmlError associated to the statification
-                    statification.add_object_to_statification(HtmlError, session, s_error_code, s_url, s_url_source)
-                except ValueError as e:
-                    self.logger.info(e)
-            elif re.match('(.*)response_received_count(.*)', line):
-
-                # we get the second part of the line where begin the information that interest us
-                s_value_item_scraped_count = line[line.index(': ') + 2:line.index(',')]
-
-                try:
-                    # set the number of crawled item into the statification object
-                    statification.upd_nb_item(session, statification.commit, int(s_value_item_scraped_count))
-                except ValueError as e:
-                    self.logger.info(e)
         try:
-            # retrieve the list of type file with number of file for each type
-            s_result_type_files = sh.uniq(
-                sh.sort(
-                    sh.grep(sh.find(sh.glob(self.s_repository_path + '/*'), '-type', 'f'), '-o', '-E',
-                            '\.[a-zA-Z0-9]+$')),
-                '-c')
-            # the result is a string so we need to get a table,
-            # here we get a table made of each line returned, we remove all space
-            a_table_result_type_files = s_result_type_files.replace(' ', '').split('\n')
-
-            # browse the line of result
-            for row in a_table_result_type_files:
-                if row:
-                    # a line is composed of a number followed by a type like "42.png",
-                    # we separate the number and the type
-                    s_type_file = row.split('.')
+            # count the files of the static repository by type, with their size, and find the largest ones
+            with metrics.time('cornetto_postprocessing_duration_seconds', phase='file_census'):
+                census = FileCensus(self.s_repository_path, s_logger=self.logger.name).scan()
 
-                    try:
-                        # create a new ScannedFile associated to the statificaiton
-                        statification.add_object_to_statification(
-                            ScannedFile,
-                            session,
-                            s_type_file[1],
-                            int(s_type_file[0])
-                        )
-                    except ValueError as e:
-                        self.logger.info(e)
-        except sh.ErrorReturnCode_1:
+            # create the ScannedFile and the LargestFile associated to the statificaiton
+            statification.add_objects_to_statification(ScannedFile, session, census.get_scanned_files())
+            statification.add_objects_to_statification(LargestFile, session, census.get_largest_files())
+        except FileNotFoundError:
             self.logger.info('There is no folder in the static repository')
-        finally:
-            # in all case we need to close the file
-            f_file.close()
+        except OSError as e:
+            self.logger.warning('The files of the static repository could not be counted : ' + str(e))
 
         # change the status of the statification (NEED TO BE DONE AT THE END !!)
         statification.upd_status(session, '', Status.STATIFIED)
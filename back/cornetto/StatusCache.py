@@ -0,0 +1,81 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import os
+import threading
+import time
+
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+
+class StatusCache(object):
+    """
+    The snapshot of the status of the API, shared by the requests of a process.
+    The status is built from files written by the crawler, the background operations and the lock of the routes, and
+    from the database. The snapshot is kept while none of these files has been modified and for a few seconds at most,
+    so the changes of the database made without modifying a file are also seen.
+    The requests that arrive while the snapshot is built wait for it instead of building it again.
+    """
+    def __init__(self, f_ttl: float = 2):
+        """
+        :param f_ttl: the maximum number of seconds the snapshot is kept, 0 to disable the cache
+        """
+        self.f_ttl = f_ttl
+        self.lock = threading.Lock()
+        self.status = None
+        self.stamp = None
+        self.f_time = 0.0
+
+    @staticmethod
+    def get_stamp(a_files: List[str]) -> Tuple[Optional[Tuple[int, int]], ...]:
+        """
+        :param a_files: the paths to the files the status is built from
+        :return: the date of modification and the size of each file, None for the files that don't exist
+        """
+        stamp = []
+        for s_file in a_files:
+            try:
+                stat = os.stat(s_file)
+                stamp.append((stat.st_mtime_ns, stat.st_size))
+            except OSError:
+                stamp.append(None)
+        return tuple(stamp)
+
+    def get(self, a_files: List[str], build_status: Callable[[], Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Get the status, from the snapshot if it is still valid
+        :param a_files: the paths to the files the status is built from
+        :param build_status: the function that builds the status
+        :return: a copy of the status
+        """
+        if self.f_ttl <= 0:
+            return build_status()
+
+        with self.lock:
+            stamp = self.get_stamp(a_files)
+            if self.status is None or stamp != self.stamp or time.monotonic() - self.f_time >= self.f_ttl:
+                self.status = build_status()
+                self.stamp = stamp
+                self.f_time = time.monotonic()
+            return dict(self.status)
+
+    def invalidate(self):
+        """
+        Remove the snapshot, the next request builds the status again
+        """
+        with self.lock:
+            self.status = None
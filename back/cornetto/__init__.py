@@ -26,8 +26,10 @@ from flask import Flask
 from typing import Dict, Any
 
 from cornetto import StatificationProcess
+from cornetto.Profiler import Profiler
+from cornetto.StatusCache import StatusCache
 from cornetto.views import bp as cornetto
-from cornetto.models import db
+from cornetto.models import db, upgrade_database, enable_sqlite_wal
 
 __version__ = '1.0'
 
@@ -100,6 +102,10 @@ def create_app(config_file_path: str = None, config_dict: Dict[str, Any] = None)
     # Connecting to the database with the settings of the app
     db.init_app(app)
 
+    # tune the connections to SQLite, for the application and the background threads
+    if app.config.get('DATABASE_SQLITE_WAL', False):
+        enable_sqlite_wal(app.config['DATABASE_URI'], db.get_engine(app))
+
     app.session = db.session
 
     # create a statificationProcess object with the configuration
@@ -118,10 +124,26 @@ def create_app(config_file_path: str = None, config_dict: Dict[str, Any] = None)
         s_delete_directories=app.config['DELETE_DIRECTORIES'],
         s_url_regex=app.config['URL_REGEX'],
         s_url_replacement=app.config['URL_REPLACEMENT'],
-        s_database_uri=app.config['DATABASE_URI']
+        s_database_uri=app.config['DATABASE_URI'],
+        b_incremental=app.config.get('CRAWLER_INCREMENTAL', False),
+        s_validators_file=app.config.get('CRAWLER_VALIDATORS_FILE', ''),
+        i_parse_processes=app.config.get('CRAWLER_PARSE_PROCESSES', 0),
+        i_shards=app.config.get('CRAWLER_SHARDS', 1),
+        s_frontier_file=app.config.get('CRAWLER_FRONTIER_FILE', ''),
+        s_job_dir=app.config.get('CRAWLER_JOB_DIR', ''),
+        f_ingest_interval=app.config.get('CRAWLER_INGEST_INTERVAL', 2),
+        b_profile=app.config.get('PROFILING', False)
     )
 
+    # the snapshot of the status of the api shared by the requests of the process
+    app.statusCache = StatusCache(app.config.get('STATUS_CACHE_TTL', 2))
+
+    # the profile of the requests of the api, only when the profiling is enabled
+    app.profiler = Profiler(app.config.get('PROFILING_ROUTES', [])) if app.config.get('PROFILING', False) else None
+
     app.register_blueprint(cornetto)
     db.create_all(app=app)
+    # add the columns and the indexes missing in a database created by a previous version
+    upgrade_database(db.get_engine(app))
 
     return app
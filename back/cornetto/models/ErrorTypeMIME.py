@@ -18,7 +18,7 @@ You should have received a copy of the GNU General Public License
 
 from typing import Dict, Any
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
@@ -32,9 +32,19 @@ class ErrorTypeMIME(Base, StatificationLinkedObject):
     id = Column(Integer, primary_key=True, nullable=False)
     type_mime = Column(String, nullable=False)
     url = Column(String, nullable=False)
-    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False, index=True)
     statification = relationship("Statification", backref=backref("error_type_mimes", cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        Index('ix_error_type_mimes_statification_id_type_mime', 'statification_id', 'type_mime'),
+    )
+
+    # the columns that can be used to filter, to sort and to group the MIME type errors of a statification
+    EQUAL_FILTERS = ('type_mime',)
+    SUBSTRING_FILTERS = ('url',)
+    SORT_COLUMNS = ('id', 'type_mime')
+    GROUP_COLUMNS = ('type_mime',)
+
     def __init__(self, statification, s_type_mime: str, s_url: str) -> None:
         """
 
@@ -61,6 +71,19 @@ class ErrorTypeMIME(Base, StatificationLinkedObject):
         else:
             raise ValueError("Passing value is None")
 
+    @staticmethod
+    def get_mapping(i_statification_id: int, s_type_mime: str, s_url: str) -> Dict[str, Any]:
+        """
+        Create the values of the columns of a new ErrorTypeMIME of the statification, used to insert them in bulk
+        :param i_statification_id: the id of the statification that contain that object
+        :param s_type_mime: the MIME type that causes the error
+        :param s_url: the url that causes the error
+        :return: a dict of the values by column
+        """
+        if i_statification_id and s_type_mime and s_url:
+            return {'statification_id': i_statification_id, 'type_mime': s_type_mime, 'url': s_url}
+        raise ValueError("Passing value is None")
+
     def get_dict(self) -> Dict[str, Any]:
         """
         Create a python dict from the source object
@@ -0,0 +1,93 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+
+from typing import Dict, Any
+
+from sqlalchemy import Column, Integer, String, ForeignKey, UniqueConstraint
+from sqlalchemy.orm import relationship, backref
+from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.orm.session import Session
+
+from cornetto.models.CornettoObject import CornettoObject
+from cornetto.models import Base
+
+
+class EventsFileOffset(Base, CornettoObject):
+    """
+    The position up to which an events file of the crawler has been registered into the database,
+    so the ingestion of the events can be restarted without registering an event twice
+    """
+    __tablename__ = 'events_file_offsets'
+    id = Column(Integer, primary_key=True, nullable=False)
+    file = Column(String, nullable=False)
+    offset = Column(Integer, nullable=False)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False)
+    statification = relationship("Statification",
+                                 backref=backref("events_file_offsets", cascade="all, delete-orphan"))
+
+    __table_args__ = (UniqueConstraint('statification_id', 'file'),)
+
+    def __init__(self, statification, s_file: str, i_offset: int) -> None:
+        """
+        The constructor of the object EventsFileOffset.
+        :param statification: the statification whose events are written into the file
+        :param s_file: the path to the events file
+        :param i_offset: the position in bytes up to which the file has been registered
+        """
+        self.file = s_file
+        self.offset = i_offset
+        self.statification = statification
+
+    @staticmethod
+    def get_offset(session: Session, statification, s_file: str) -> int:
+        """
+        Get the position up to which an events file has been registered
+        :param session: the database session
+        :param statification: the statification whose events are written into the file
+        :param s_file: the path to the events file
+        :return: the position in bytes, 0 if nothing has been registered yet
+        """
+        try:
+            return session.query(EventsFileOffset).filter(EventsFileOffset.statification_id == statification.id,
+                                                          EventsFileOffset.file == s_file).one().offset
+        except NoResultFound:
+            return 0
+
+    @staticmethod
+    def upd_offset(session: Session, statification, s_file: str, i_offset: int) -> None:
+        """
+        Set the position up to which an events file has been registered, the change is committed by the caller
+        with the objects created from the events
+        :param session: the database session
+        :param statification: the statification whose events are written into the file
+        :param s_file: the path to the events file
+        :param i_offset: the position in bytes
+        """
+        try:
+            session.query(EventsFileOffset).filter(EventsFileOffset.statification_id == statification.id,
+                                                   EventsFileOffset.file == s_file).one().offset = i_offset
+        except NoResultFound:
+            session.add(EventsFileOffset(statification, s_file, i_offset))
+
+    def get_dict(self) -> Dict[str, Any]:
+        """
+        Create a python dict from the source object
+        :implement
+        :return: A python dict
+        """
+        return {'id': self.id, 'file': self.file, 'offset': self.offset}
@@ -17,8 +17,10 @@ You should have received a copy of the GNU General Public License
 """
 
 from typing import Dict, Any
+from urllib.parse import urlsplit
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index, bindparam, select
+from sqlalchemy.engine import Engine
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
@@ -32,9 +34,21 @@ class ExternalLink(Base, StatificationLinkedObject):
     id = Column(Integer, primary_key=True, nullable=False)
     source = Column(String, nullable=False)
     url = Column(String, nullable=False)
-    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False)
+    # the host of the url, used to filter and to group the external links
+    host = Column(String, nullable=True)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False, index=True)
     statification = relationship("Statification", backref=backref("external_links", cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        Index('ix_external_links_statification_id_host', 'statification_id', 'host'),
+    )
+
+    # the columns that can be used to filter, to sort and to group the external links of a statification
+    EQUAL_FILTERS = ('host',)
+    SUBSTRING_FILTERS = ('url', 'source')
+    SORT_COLUMNS = ('id', 'host')
+    GROUP_COLUMNS = ('host', 'source')
+
     def __init__(self, statification, s_source: str, s_url: str) -> None:
         """
         The constructor of the object ExternalLink.
@@ -46,8 +60,21 @@ class ExternalLink(Base, StatificationLinkedObject):
         """
         self.source = s_source
         self.url = s_url
+        self.host = ExternalLink.get_host(s_url)
         self.statification = statification
 
+    @staticmethod
+    def get_host(s_url: str) -> str:
+        """
+        Get the host of an url, in lowercase and without the port
+        :param s_url: the url
+        :return: the host, empty if the url has no host
+        """
+        try:
+            return urlsplit(s_url).hostname or ''
+        except ValueError:
+            return ''
+
     @staticmethod
     def add_to_statification(session: Session, statification, s_source: str, s_url: str) -> None:
         """
@@ -63,13 +90,41 @@ class ExternalLink(Base, StatificationLinkedObject):
         else:
             raise ValueError("Passing value is None")
 
+    @staticmethod
+    def get_mapping(i_statification_id: int, s_source: str, s_url: str) -> Dict[str, Any]:
+        """
+        Create the values of the columns of a new ExternalLink of the statification, used to insert them in bulk
+        :param i_statification_id: the id of the statification that contain that object
+        :param s_source: the url of the source that contain the external url
+        :param s_url: the url that point to an external website
+        :return: a dict of the values by column
+        """
+        if i_statification_id and s_source and s_url:
+            return {'statification_id': i_statification_id, 'source': s_source, 'url': s_url,
+                    'host': ExternalLink.get_host(s_url)}
+        raise ValueError("Passing value is None")
+
+    @staticmethod
+    def fill_hosts(engine: Engine) -> None:
+        """
+        Set the host of the external links registered before the column host was added
+        :param engine: the engine of the database
+        """
+        table = ExternalLink.__table__
+        with engine.begin() as connection:
+            a_rows = connection.execute(select([table.c.id, table.c.url]).where(table.c.host.is_(None))).fetchall()
+            if a_rows:
+                update = table.update().where(table.c.id == bindparam('b_id')).values(host=bindparam('b_host'))
+                connection.execute(update, [{'b_id': i_id, 'b_host': ExternalLink.get_host(s_url)}
+                                            for i_id, s_url in a_rows])
+
     def get_dict(self) -> Dict[str, Any]:
         """
         Create a python dict from the source object
         :implement
         :return: A python dict
         """
-        return {'id': self.id, 'source': self.source, 'url': self.url}
+        return {'id': self.id, 'source': self.source, 'url': self.url, 'host': self.host}
 
     @staticmethod
     def get_from_statification_id(session: Session, i_statification_id: Column) -> Any:
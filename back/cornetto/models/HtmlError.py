@@ -18,7 +18,7 @@ You should have received a copy of the GNU General Public License
 
 from typing import Dict, Any
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
@@ -33,9 +33,19 @@ class HtmlError(Base, StatificationLinkedObject):
     error_code = Column(String, nullable=False)
     url = Column(String, nullable=False)
     source = Column(String, nullable=False)
-    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False, index=True)
     statification = relationship("Statification", backref=backref("html_errors", cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        Index('ix_html_errors_statification_id_error_code', 'statification_id', 'error_code'),
+    )
+
+    # the columns that can be used to filter, to sort and to group the HTML errors of a statification
+    EQUAL_FILTERS = ('error_code',)
+    SUBSTRING_FILTERS = ('url', 'source')
+    SORT_COLUMNS = ('id', 'error_code')
+    GROUP_COLUMNS = ('error_code', 'source')
+
     def __init__(self, statification, s_error_code: str, s_url: str, s_source: str) -> None:
         """
         The constructor of the object HtmlError.
@@ -69,6 +79,21 @@ class HtmlError(Base, StatificationLinkedObject):
         else:
             raise ValueError("Passing value is None")
 
+    @staticmethod
+    def get_mapping(i_statification_id: int, s_code_error: str, s_url: str, s_source: str) -> Dict[str, Any]:
+        """
+        Create the values of the columns of a new HtmlError of the statification, used to insert them in bulk
+        :param i_statification_id: the id of the statification that contain that object
+        :param s_code_error: the HTTP error code
+        :param s_url: The url that caused the error
+        :param s_source: the source url that contained the faulty url
+        :return: a dict of the values by column
+        """
+        if i_statification_id and s_code_error and s_url and s_source:
+            return {'statification_id': i_statification_id, 'error_code': s_code_error, 'url': s_url,
+                    'source': s_source}
+        raise ValueError("Passing value is None")
+
     def get_dict(self) -> Dict[str, Any]:
         """
         Create a python dict from the source object
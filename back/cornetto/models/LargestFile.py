@@ -0,0 +1,101 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+
+from typing import Dict, Any
+
+from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy.orm import relationship, backref
+from sqlalchemy.orm.exc import NoResultFound
+from sqlalchemy.orm.session import Session
+
+from cornetto.models.StatificationLinkedObject import StatificationLinkedObject
+from cornetto.models import Base
+
+
+class LargestFile(Base, StatificationLinkedObject):
+    __tablename__ = 'largest_files'
+    id = Column(Integer, primary_key=True, nullable=False)
+    path = Column(String, nullable=False)
+    size = Column(Integer, nullable=False)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False, index=True)
+    statification = relationship("Statification", backref=backref("largest_files", cascade="all, delete-orphan"))
+
+    def __init__(self, statification, s_path: str, i_size: int) -> None:
+        """
+        The constructor of the object LargestFile.
+        Create a LargestFile by setting the attribute with the given parameters
+
+        :param statification: The statification that contains the file
+        :param s_path: the path to the file, relative to the static repository
+        :param i_size: the size of the file in bytes
+        """
+        self.path = s_path
+        self.size = i_size
+        self.statification = statification
+
+    @staticmethod
+    def add_to_statification(session: Session, statification, s_path: str, i_size: int) -> None:
+        """
+        Create and add a new largest file to the statification filled with the given parameters
+        :param session: The database session
+        :param statification: The statification that contains the file
+        :param s_path: the path to the file, relative to the static repository
+        :param i_size: the size of the file in bytes
+        """
+        if session and statification and s_path and i_size is not None:
+            session.add(LargestFile(statification, s_path, i_size))
+            session.commit()
+        else:
+            raise ValueError("Passing value is None")
+
+    @staticmethod
+    def get_mapping(i_statification_id: int, s_path: str, i_size: int) -> Dict[str, Any]:
+        """
+        Create the values of the columns of a new LargestFile of the statification, used to insert them in bulk
+        :param i_statification_id: the id of the statification that contain that object
+        :param s_path: the path to the file, relative to the static repository
+        :param i_size: the size of the file in bytes
+        :return: a dict of the values by column
+        """
+        if i_statification_id and s_path and i_size is not None:
+            return {'statification_id': i_statification_id, 'path': s_path, 'size': i_size}
+        raise ValueError("Passing value is None")
+
+    def get_dict(self) -> Dict[str, Any]:
+        """
+        Create a python dict from the source object
+        :implement
+        :return: A python dict
+        """
+        return {'id': self.id, 'path': self.path, 'size': self.size}
+
+    @staticmethod
+    def get_from_statification_id(session: Session, i_statification_id: Column) -> Any:
+        """
+        Get the object linked to the statification id passed in parameter, the largest file first
+        :implement
+        :param session: The database session
+        :param i_statification_id: the id of the statification
+        :return: the corresponding object(s) linked to the statification id
+        """
+        try:
+            results = session.query(LargestFile).filter(LargestFile.statification_id == i_statification_id) \
+                .order_by(LargestFile.size.desc())
+            return results
+        except NoResultFound:
+            raise NoResultFound("Statification wasn't found for the given id : " + str(i_statification_id))
@@ -32,10 +32,11 @@ class ScannedFile(Base, StatificationLinkedObject):
     id = Column(Integer, primary_key=True, nullable=False)
     type_file = Column(String, nullable=False)
     nb = Column(Integer, nullable=False)
-    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False)
+    size = Column(Integer, nullable=True)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False, index=True)
     statification = relationship("Statification", backref=backref("scanned_files", cascade="all, delete-orphan"))
 
-    def __init__(self, statification, s_type_file: str, i_nb: int) -> None:
+    def __init__(self, statification, s_type_file: str, i_nb: int, i_size: int = None) -> None:
         """
         The constructor of the object ScannedFile.
         Create a ScannedFile by setting the attribute with the given parameters
@@ -43,33 +44,51 @@ class ScannedFile(Base, StatificationLinkedObject):
         :param statification: The statification that contains those files
         :param s_type_file: type MIME of the file
         :param i_nb: the number of file for the given type
+        :param i_size: the total size in bytes of the files of the given type
         """
         self.type_file = s_type_file
         self.nb = i_nb
+        self.size = i_size
         self.statification = statification
 
     @staticmethod
-    def add_to_statification(session: Session, statification, s_type_file: str, i_nb: int) -> None:
+    def add_to_statification(session: Session, statification, s_type_file: str, i_nb: int,
+                             i_size: int = None) -> None:
         """
         Create and add a new scanned file to the statification filled with the given parameters
         :param session: The database session
         :param statification: The statification that contains those files
         :param s_type_file: type MIME of the file
         :param i_nb: the number of file for the given type
+        :param i_size: the total size in bytes of the files of the given type
         """
         if session and statification and s_type_file and i_nb:
-            session.add(ScannedFile(statification, s_type_file, i_nb))
+            session.add(ScannedFile(statification, s_type_file, i_nb, i_size))
             session.commit()
         else:
             raise ValueError("Passing value is None")
 
+    @staticmethod
+    def get_mapping(i_statification_id: int, s_type_file: str, i_nb: int, i_size: int = None) -> Dict[str, Any]:
+        """
+        Create the values of the columns of a new ScannedFile of the statification, used to insert them in bulk
+        :param i_statification_id: the id of the statification that contain that object
+        :param s_type_file: type MIME of the file
+        :param i_nb: the number of file for the given type
+        :param i_size: the total size in bytes of the files of the given type
+        :return: a dict of the values by column
+        """
+        if i_statification_id and s_type_file and i_nb:
+            return {'statification_id': i_statification_id, 'type_file': s_type_file, 'nb': i_nb, 'size': i_size}
+        raise ValueError("Passing value is None")
+
     def get_dict(self) -> Dict[str, Any]:
         """
         Create a python dict from the source object
         :implement
         :return: A python dict
         """
-        return {'id': self.id, 'type_file': self.type_file, 'nb': self.nb}
+        return {'id': self.id, 'type_file': self.type_file, 'nb': self.nb, 'size': self.size}
 
     @staticmethod
     def get_from_statification_id(session: Session, i_statification_id: Column) -> Any:
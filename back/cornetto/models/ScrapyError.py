@@ -18,7 +18,7 @@ You should have received a copy of the GNU General Public License
 
 from typing import Dict, Any
 
-from sqlalchemy import Column, Integer, String, ForeignKey
+from sqlalchemy import Column, Integer, String, ForeignKey, Index
 from sqlalchemy.orm import relationship, backref
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
@@ -31,9 +31,18 @@ class ScrapyError(Base, StatificationLinkedObject):
     __tablename__ = 'scrapy_errors'
     id = Column(Integer, primary_key=True, nullable=False)
     error_code = Column(String, nullable=False)
-    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False, index=True)
     statification = relationship("Statification", backref=backref("scrapy_errors", cascade="all, delete-orphan"))
 
+    __table_args__ = (
+        Index('ix_scrapy_errors_statification_id_error_code', 'statification_id', 'error_code'),
+    )
+
+    # the columns that can be used to filter, to sort and to group the errors of the crawler of a statification
+    EQUAL_FILTERS = ('error_code',)
+    SORT_COLUMNS = ('id', 'error_code')
+    GROUP_COLUMNS = ('error_code',)
+
     def __init__(self, statification, s_error_code: str) -> None:
         """
         The constructor of the object ScrapyError.
@@ -60,6 +69,18 @@ class ScrapyError(Base, StatificationLinkedObject):
         else:
             raise ValueError("Passing value is None")
 
+    @staticmethod
+    def get_mapping(i_statification_id: int, s_scrapy_error: str) -> Dict[str, Any]:
+        """
+        Create the values of the columns of a new ScrapyError of the statification, used to insert them in bulk
+        :param i_statification_id: the id of the statification that contain that object
+        :param s_scrapy_error: The error code correspond to the error message returned by scrapy.
+        :return: a dict of the values by column
+        """
+        if i_statification_id and s_scrapy_error:
+            return {'statification_id': i_statification_id, 'error_code': s_scrapy_error}
+        raise ValueError("Passing value is None")
+
     def get_dict(self) -> Dict[str, Any]:
         """
         Create a python dict from the source object
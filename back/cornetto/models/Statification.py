@@ -17,9 +17,10 @@ You should have received a copy of the GNU General Public License
 """
 
 from datetime import datetime
-from typing import Dict, Any, List, Type
+from typing import Dict, Any, Iterable, List, Optional, Tuple, Type
 
-from sqlalchemy import Column, Integer, String, DateTime, Enum
+from sqlalchemy import Column, Integer, String, DateTime, Enum, LargeBinary
+from sqlalchemy.orm import deferred
 from sqlalchemy.orm.exc import NoResultFound
 from sqlalchemy.orm.session import Session
 from sqlalchemy.sql.expression import desc
@@ -29,6 +30,9 @@ from cornetto.models.StatificationLinkedObject import StatificationLinkedObject
 
 from cornetto.models import Base, Status
 
+# the number of objects inserted by each transaction of add_objects_to_statification
+BULK_INSERT_CHUNK_SIZE = 5000
+
 
 class Statification(Base, CornettoObject):
     """
@@ -41,8 +45,12 @@ class Statification(Base, CornettoObject):
     description = Column(String, nullable=True)
     cre_date = Column(DateTime, nullable=False)
     upd_date = Column(DateTime, nullable=False)
-    status = Column(Enum(Status), nullable=False)
+    status = Column(Enum(Status), nullable=False, index=True)
     nb_item = Column(Integer, nullable=True)
+    # the compressed JSON of the detail of a committed statification and its ETag, the report is only loaded by
+    # get_report
+    report = deferred(Column(LargeBinary, nullable=True))
+    report_etag = Column(String, nullable=True)
 
     __mapper_args__ = {
         'confirm_deleted_rows': False
@@ -79,6 +87,7 @@ class Statification(Base, CornettoObject):
         try:
             statification = session.query(Statification).filter(Statification.commit == s_commit).one()
             statification.designation = s_designation
+            statification.clear_report()
             session.add(statification)
             session.commit()
         except NoResultFound:
@@ -95,6 +104,7 @@ class Statification(Base, CornettoObject):
         try:
             statification = session.query(Statification).filter(Statification.commit == s_commit).one()
             statification.description = s_description
+            statification.clear_report()
             session.add(statification)
             session.commit()
         except NoResultFound:
@@ -111,6 +121,7 @@ class Statification(Base, CornettoObject):
         try:
             statification = session.query(Statification).filter(Statification.commit == s_commit).one()
             statification.upd_date = d_upd_date
+            statification.clear_report()
             session.add(statification)
             session.commit()
         except NoResultFound:
@@ -129,6 +140,7 @@ class Statification(Base, CornettoObject):
             try:
                 statification = session.query(Statification).filter(Statification.commit == s_commit).one()
                 statification.status = e_status
+                statification.clear_report()
                 session.add(statification)
                 session.commit()
             except NoResultFound:
@@ -150,6 +162,7 @@ class Statification(Base, CornettoObject):
             try:
                 statification = session.query(Statification).filter(Statification.commit == s_commit).one()
                 statification.nb_item = i_nb_item
+                statification.clear_report()
                 session.add(statification)
                 session.commit()
             except NoResultFound:
@@ -171,6 +184,7 @@ class Statification(Base, CornettoObject):
             try:
                 statification = session.query(Statification).filter(Statification.status == e_status_old).one()
                 statification.status = e_status_new
+                statification.clear_report()
                 session.add(statification)
                 session.commit()
             except NoResultFound:
@@ -195,6 +209,47 @@ class Statification(Base, CornettoObject):
         except NoResultFound:
             raise NoResultFound("Statification wasn't found for the given commit : " + s_commit_old)
 
+    def clear_report(self) -> None:
+        """
+        Remove the report of the statification, it must be called when the data included in the report are modified
+        """
+        self.report = None
+        self.report_etag = None
+
+    @staticmethod
+    def upd_report(session: Session, s_commit: str, b_report: bytes, s_report_etag: str) -> None:
+        """
+        Update the report of the statification
+        :param session: the database session
+        :param s_commit: the commit sha of the statification we want to update
+        :param b_report: the compressed JSON of the detail of the statification
+        :param s_report_etag: the ETag of the report
+        """
+        try:
+            statification = session.query(Statification).filter(Statification.commit == s_commit).one()
+            statification.report = b_report
+            statification.report_etag = s_report_etag
+            session.add(statification)
+            session.commit()
+        except NoResultFound:
+            raise NoResultFound("Statification wasn't found for the given commit : " + s_commit)
+
+    @staticmethod
+    def get_report(session: Session, s_commit: str) -> Tuple[Optional[bytes], Optional[str]]:
+        """
+        Get the report of the statification without loading the statification
+        :param session: the database session
+        :param s_commit: the commit sha of the statification
+        :return: a tuple of the compressed JSON of the detail of the statification and its ETag, (None, None) if the
+                 report hasn't been generated
+        :raise NoResultFound if there is no statification for the commit
+        """
+        try:
+            return tuple(session.query(Statification.report, Statification.report_etag)
+                         .filter(Statification.commit == s_commit).one())
+        except NoResultFound:
+            raise NoResultFound("Statification wasn't found for the given commit : " + s_commit)
+
     def add_object_to_statification(self, c_class: Type[StatificationLinkedObject], session: Session, *args) -> None:
         """
         Add an object to the statification
@@ -204,6 +259,42 @@ class Statification(Base, CornettoObject):
         """
         c_class.add_to_statification(session, self, *args)
 
+    def add_objects_to_statification(self, c_class: Type[StatificationLinkedObject], session: Session,
+                                     rows: Iterable[tuple], i_chunk_size: int = BULK_INSERT_CHUNK_SIZE,
+                                     b_commit: bool = True) -> int:
+        """
+        Add objects of the same class to the statification in bulk, the objects are inserted by chunks and each chunk
+        is committed in one transaction
+        :param c_class: the class of the objects to create and add
+        :param session: the database session
+        :param rows: an iterable of the tuples of parameters that set each new object, as given to
+                     add_object_to_statification, the rows with a missing value are ignored
+        :param i_chunk_size: the number of objects inserted by transaction
+        :param b_commit: if False the objects are inserted in the current transaction, which is committed by the caller
+        :return: the number of objects added
+        """
+        i_nb_added = 0
+        a_chunk = []
+        for row in rows:
+            try:
+                a_chunk.append(c_class.get_mapping(self.id, *row))
+            except ValueError:
+                continue
+
+            if len(a_chunk) >= i_chunk_size:
+                session.bulk_insert_mappings(c_class, a_chunk)
+                if b_commit:
+                    session.commit()
+                i_nb_added += len(a_chunk)
+                a_chunk = []
+
+        if a_chunk:
+            session.bulk_insert_mappings(c_class, a_chunk)
+            if b_commit:
+                session.commit()
+            i_nb_added += len(a_chunk)
+        return i_nb_added
+
     @staticmethod
     def static_add_object_to_statification(c_class: Type[StatificationLinkedObject],
                                            session: Session, s_commit: str, *args) -> None:
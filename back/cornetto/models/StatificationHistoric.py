@@ -33,7 +33,7 @@ class StatificationHistoric(Base, StatificationLinkedObject):
     date = Column(DateTime, nullable=False)
     user = Column(String, nullable=False)
     action = Column(Enum(Actions), nullable=False)
-    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False)
+    statification_id = Column(Integer, ForeignKey('statifications.id'), nullable=False, index=True)
     statification = relationship("Statification",
                                  backref=backref("statification_historiques", cascade="all, delete-orphan"))
 
@@ -80,6 +80,17 @@ class StatificationHistoric(Base, StatificationLinkedObject):
         return {'id': self.id, 'date': self.date.strftime("%Y-%m-%d %H:%M"),
                 'user': self.user, 'action': self.action.value}
 
+    @staticmethod
+    def format_dict(values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Format the values of the columns of an object like get_dict does
+        :implement
+        :param values: the values of the columns, by column
+        :return: the python dict of the object
+        """
+        return {'id': values['id'], 'date': values['date'].strftime("%Y-%m-%d %H:%M"),
+                'user': values['user'], 'action': values['action'].value}
+
     @staticmethod
     def get_from_statification_id(session: Session, i_statification_id: Column) -> Any:
         """
@@ -17,10 +17,11 @@ You should have received a copy of the GNU General Public License
 """
 
 import abc
-from typing import Any
+from typing import Any, Dict, List, Optional, Tuple
 
-from sqlalchemy import Column
+from sqlalchemy import Column, and_, func, or_
 from sqlalchemy.orm.session import Session
+from sqlalchemy.sql.expression import desc
 
 from cornetto.models.CornettoObject import CornettoObject
 
@@ -32,6 +33,14 @@ class StatificationLinkedObject(CornettoObject):
 
     __metaclass__ = abc.ABCMeta
 
+    # the columns that can be used to filter the objects of a statification, by value and by substring,
+    # and to sort them
+    EQUAL_FILTERS = ()  # type: Tuple[str, ...]
+    SUBSTRING_FILTERS = ()  # type: Tuple[str, ...]
+    SORT_COLUMNS = ('id',)  # type: Tuple[str, ...]
+    # the columns used to count the objects of a statification by group
+    GROUP_COLUMNS = ()  # type: Tuple[str, ...]
+
     @staticmethod
     @abc.abstractmethod
     def get_from_statification_id(session: Session, i_statification_id: Column) -> Any:
@@ -43,6 +52,132 @@ class StatificationLinkedObject(CornettoObject):
         """
         raise NotImplementedError()
 
+    @classmethod
+    def get_dicts_from_statification_id(cls, session: Session, i_statification_id: int) -> List[Dict[str, Any]]:
+        """
+        Get the python dicts of the objects linked to the statification id passed in parameter, as created by get_dict.
+        The columns are read by one query without loading the objects, so it is fast for a lot of objects
+        :param session: The database session
+        :param i_statification_id: the id of the statification
+        :return: the list of the dicts, in the order of creation of the objects
+        """
+        a_columns = [column for column in cls.__table__.columns if column.name != 'statification_id']
+        a_names = [column.name for column in a_columns]
+        query = session.query(*a_columns).filter(cls.__table__.c.statification_id == i_statification_id) \
+            .order_by(cls.__table__.c.id)
+        return [cls.format_dict(dict(zip(a_names, row))) for row in query]
+
+    @classmethod
+    def get_page_from_statification_id(cls, session: Session, i_statification_id: int, filters: Dict[str, str],
+                                       s_sort: str = 'id', b_desc: bool = False,
+                                       after: Optional[Tuple[Any, int]] = None,
+                                       i_limit: int = 100) -> Tuple[List[Dict[str, Any]], Optional[Tuple[Any, int]]]:
+        """
+        Get a page of the dicts of the objects linked to the statification id passed in parameter, as created by
+        get_dict. The pages are read by keyset : a page starts after the last object of the previous page, given by its
+        value of the sort column and its id, so each page is read from the indexes whatever its position
+        :param session: The database session
+        :param i_statification_id: the id of the statification
+        :param filters: the values that filter the objects, by column : the columns of EQUAL_FILTERS must be equal to
+                        the value, the columns of SUBSTRING_FILTERS must contain it
+        :param s_sort: the column of SORT_COLUMNS used to sort the objects, the objects are then sorted by id
+        :param b_desc: True to sort the objects in descending order
+        :param after: the value of the sort column and the id of the last object of the previous page, None to get
+                      the first page
+        :param i_limit: the maximum number of objects of the page
+        :return: a tuple of the list of the dicts and the position of the last object to give to get the next page,
+                 None if it is the last page
+        :raise ValueError if a filter or the sort column can't be used
+        """
+        if s_sort not in cls.SORT_COLUMNS:
+            raise ValueError("The objects can't be sorted by the column : " + s_sort)
+
+        table = cls.__table__
+        a_columns = [column for column in table.columns if column.name != 'statification_id']
+        a_names = [column.name for column in a_columns]
+        query = session.query(*a_columns).filter(table.c.statification_id == i_statification_id)
+
+        for s_column, s_value in filters.items():
+            if s_column in cls.EQUAL_FILTERS:
+                query = query.filter(table.c[s_column] == s_value)
+            elif s_column in cls.SUBSTRING_FILTERS:
+                query = query.filter(table.c[s_column].contains(s_value, autoescape=True))
+            else:
+                raise ValueError("The objects can't be filtered by the column : " + s_column)
+
+        sort_column = table.c[s_sort]
+        if after is not None:
+            sort_value, i_id = after
+            if s_sort == 'id':
+                query = query.filter(table.c.id < i_id if b_desc else table.c.id > i_id)
+            elif b_desc:
+                query = query.filter(or_(sort_column < sort_value, and_(sort_column == sort_value, table.c.id < i_id)))
+            else:
+                query = query.filter(or_(sort_column > sort_value, and_(sort_column == sort_value, table.c.id > i_id)))
+
+        a_order = [table.c.id] if s_sort == 'id' else [sort_column, table.c.id]
+        # one more object is read to know if there is a next page
+        a_rows = query.order_by(*[desc(column) if b_desc else column for column in a_order]).limit(i_limit + 1).all()
+
+        a_dicts = [cls.format_dict(dict(zip(a_names, row))) for row in a_rows[:i_limit]]
+        if len(a_rows) <= i_limit:
+            return a_dicts, None
+        last = dict(zip(a_names, a_rows[i_limit - 1]))
+        return a_dicts, (last[s_sort], last['id'])
+
+    @classmethod
+    def get_count_from_statification_id(cls, session: Session, i_statification_id: int) -> int:
+        """
+        Count the objects linked to the statification id passed in parameter
+        :param session: The database session
+        :param i_statification_id: the id of the statification
+        :return: the number of objects
+        """
+        table = cls.__table__
+        return session.query(func.count(table.c.id)).filter(table.c.statification_id == i_statification_id).scalar()
+
+    @classmethod
+    def get_counts_from_statification_id(cls, session: Session, i_statification_id: int, filters: Dict[str, str],
+                                         i_limit: int = 50) -> Dict[str, Any]:
+        """
+        Count the objects linked to the statification id passed in parameter, in total and by value of each column of
+        GROUP_COLUMNS. The counts are computed by the database, the objects are not read.
+        :param session: The database session
+        :param i_statification_id: the id of the statification
+        :param filters: the values of columns of GROUP_COLUMNS that the counted objects must have, to count the
+                        objects of one group by the other columns
+        :param i_limit: the maximum number of groups returned for each column, the biggest groups are returned
+        :return: a python dict containing the total under 'total' and, for each column of GROUP_COLUMNS that is not
+                 filtered, the list of the groups as python dicts {column: value, 'count': number of objects}
+        :raise ValueError if a filter can't be used
+        """
+        table = cls.__table__
+        a_conditions = [table.c.statification_id == i_statification_id]
+        for s_column, s_value in filters.items():
+            if s_column not in cls.GROUP_COLUMNS:
+                raise ValueError("The objects can't be grouped by the column : " + s_column)
+            a_conditions.append(table.c[s_column] == s_value)
+
+        counts = {'total': session.query(func.count(table.c.id)).filter(*a_conditions).scalar()}
+        for s_column in cls.GROUP_COLUMNS:
+            if s_column in filters:
+                continue
+            column = table.c[s_column]
+            count = func.count(table.c.id)
+            query = session.query(column, count).filter(*a_conditions).group_by(column) \
+                .order_by(desc(count), column).limit(i_limit)
+            counts[s_column] = [{s_column: value, 'count': i_count} for value, i_count in query]
+        return counts
+
+    @staticmethod
+    def format_dict(values: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Format the values of the columns of an object like get_dict does, by default the values are not changed
+        :param values: the values of the columns, by column
+        :return: the python dict of the object
+        """
+        return values
+
     @staticmethod
     @abc.abstractmethod
     def add_to_statification(*args, **kargs) -> None:
@@ -50,3 +185,12 @@ class StatificationLinkedObject(CornettoObject):
         Create and add a new object to the statification filled with the given parameters
         """
         raise NotImplementedError()
+
+    @staticmethod
+    @abc.abstractmethod
+    def get_mapping(*args, **kargs) -> Dict[str, Any]:
+        """
+        Create the values of the columns of a new object of the statification, used to insert them in bulk
+        :raise ValueError if a value is missing
+        """
+        raise NotImplementedError()
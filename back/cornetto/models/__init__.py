@@ -16,12 +16,18 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 """
 
+import atexit
 import enum
+import sqlite3
+import threading
 
 from flask_sqlalchemy import SQLAlchemy
-from sqlalchemy.engine import create_engine
-from sqlalchemy.orm import Session
+from sqlalchemy import event, inspect
+from sqlalchemy.engine import create_engine, Engine
+from sqlalchemy.engine.url import make_url
+from sqlalchemy.orm import Session, scoped_session
 from sqlalchemy.orm.session import sessionmaker
+from sqlalchemy.pool import QueuePool
 
 # create a db from the SQLAlchemy plugin for flask
 db = SQLAlchemy()
@@ -29,22 +35,155 @@ db = SQLAlchemy()
 # get the Model declarative base class
 Base = db.Model
 
+# the engines used outside of the Flask requests and the registries of the sessions of each thread, by database uri
+engines = {}
+session_registries = {}
+engines_lock = threading.Lock()
+# the uris of the SQLite databases whose connections are tuned by set_sqlite_pragmas
+sqlite_wal_uris = set()
+
+
+def is_sqlite_file(database_uri: str) -> bool:
+    """
+    :param database_uri: the uri of a database
+    :return: True if the database is a SQLite file database, False if it is another database or an in-memory database
+    """
+    url = make_url(database_uri)
+    return url.get_backend_name() == 'sqlite' and url.database not in (None, '', ':memory:')
+
+
+def get_engine(database_uri: str) -> Engine:
+    """
+    Get the engine of a database, the engine and its pool of connections are created once per process and shared
+    by all the threads
+    :param database_uri: the uri of the database
+    :return: the engine
+    """
+    with engines_lock:
+        if database_uri not in engines:
+            if is_sqlite_file(database_uri):
+                # pysqlite doesn't pool the connections to a file database, a connection is used by one thread at a
+                # time but can be used by several threads one after another
+                engine = create_engine(database_uri, poolclass=QueuePool,
+                                       connect_args={'check_same_thread': False})
+            else:
+                engine = create_engine(database_uri)
+            if database_uri in sqlite_wal_uris:
+                event.listen(engine, 'connect', set_sqlite_pragmas)
+            engines[database_uri] = engine
+            session_registries[database_uri] = scoped_session(sessionmaker(bind=engine))
+        return engines[database_uri]
+
 
 def open_session_db(database_uri: str) -> Session:
     """
-    This method will create a new Session to access the database
+    This method will get the Session of the current thread to access the database
     It used when subprocess need to access the database but the Flask session isn't available.
     :param database_uri: the uri of the database
-    :return: a new session
+    :return: the session of the current thread
     """
-    # create engine for asynchronous connection to the database
-    engine = create_engine(database_uri)
+    get_engine(database_uri)
+    return session_registries[database_uri]()
+
 
-    # create a configured "SessionMaker" class
-    session = sessionmaker(bind=engine)
+def close_session_db(database_uri: str) -> None:
+    """
+    Close the Session of the current thread, its connection is given back to the pool of the engine
+    :param database_uri: the uri of the database
+    """
+    if database_uri in session_registries:
+        session_registries[database_uri].remove()
+
+
+@atexit.register
+def dispose_engines() -> None:
+    """
+    Close the connections of all the engines, called when the process exits
+    """
+    with engines_lock:
+        for engine in engines.values():
+            engine.dispose()
+        engines.clear()
+        session_registries.clear()
+
+
+# the columns added to the tables since their creation, by table, with their definition
+ADDED_COLUMNS = {
+    'scanned_files': {'size': 'INTEGER'},
+    'statifications': {'report': 'BLOB', 'report_etag': 'VARCHAR'},
+    'external_links': {'host': 'VARCHAR'}
+}
+
+
+def upgrade_database(engine: Engine) -> None:
+    """
+    Add the columns and the indexes that are missing in the tables of a database created by a previous version,
+    the missing tables are created by create_all
+    :param engine: the engine of the database
+    """
+    inspector = inspect(engine)
+    a_tables = inspector.get_table_names()
+    a_added_columns = []
+    for s_table, columns in ADDED_COLUMNS.items():
+        if s_table not in a_tables:
+            continue
+        a_existing_columns = [column['name'] for column in inspector.get_columns(s_table)]
+        for s_column, s_definition in columns.items():
+            if s_column not in a_existing_columns:
+                engine.execute('ALTER TABLE ' + s_table + ' ADD COLUMN ' + s_column + ' ' + s_definition)
+                a_added_columns.append((s_table, s_column))
+
+    if ('external_links', 'host') in a_added_columns:
+        # the models import this module, the class is loaded when the tables are created
+        from cornetto.models.ExternalLink import ExternalLink
+        ExternalLink.fill_hosts(engine)
+
+    # the indexes are created from the models, Index.create of SQLAlchemy 1.3 doesn't check if they exist
+    for table in Base.metadata.sorted_tables:
+        if table.name not in a_tables:
+            continue
+        a_existing_indexes = [index['name'] for index in inspector.get_indexes(table.name)]
+        for index in table.indexes:
+            if index.name not in a_existing_indexes:
+                index.create(bind=engine)
+
+
+def set_sqlite_pragmas(dbapi_connection, connection_record) -> None:
+    """
+    Tune a new connection to a SQLite database : the Write-Ahead Log lets the crawl results be written while the
+    API reads the database, and with it the database is only synced at the checkpoints
+    :param dbapi_connection: the connection of the DBAPI
+    :param connection_record: the record of the connection in the pool
+    """
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        cursor = dbapi_connection.cursor()
+        cursor.execute('PRAGMA journal_mode=WAL')
+        cursor.execute('PRAGMA synchronous=NORMAL')
+        # wait for the lock of another connection instead of failing immediately
+        cursor.execute('PRAGMA busy_timeout=30000')
+        # 16 MB of page cache and the temporary tables in memory
+        cursor.execute('PRAGMA cache_size=-16000')
+        cursor.execute('PRAGMA temp_store=MEMORY')
+        cursor.close()
+
+
+def enable_sqlite_wal(database_uri: str, engine: Engine = None) -> None:
+    """
+    Tune the connections to a SQLite file database with set_sqlite_pragmas : the connections of the engine shared by
+    the background threads, created by get_engine, and of the given engine (the engine of the Flask application).
+    The other engines of the process are not tuned, nor the engines of the other databases and of the in-memory ones
+    :param database_uri: the uri of the database
+    :param engine: another engine of the database to tune
+    """
+    if not is_sqlite_file(database_uri):
+        return
 
-    # create a new session
-    return session()
+    with engines_lock:
+        sqlite_wal_uris.add(database_uri)
+        a_engines = [engines.get(database_uri), engine]
+    for tuned_engine in a_engines:
+        if tuned_engine is not None and not event.contains(tuned_engine, 'connect', set_sqlite_pragmas):
+            event.listen(tuned_engine, 'connect', set_sqlite_pragmas)
 
 
 class Status(enum.Enum):
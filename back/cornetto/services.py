@@ -17,8 +17,11 @@ You should have received a copy of the GNU General Public License
 """
 
 import logging
+import base64
 import errno
 import fcntl
+import gzip
+import hashlib
 import os
 import sh
 import time
@@ -29,13 +32,16 @@ from datetime import datetime
 from flask import current_app
 from flask.json import dumps, loads
 from sqlalchemy.orm.exc import NoResultFound
-from typing import Dict, Any
+from typing import Dict, Any, List, Optional, Tuple
 
 from cornetto import verification_utilities
-from cornetto.models import StatificationHistoric, Actions, open_session_db
+from cornetto.Metrics import metrics, format_family
+from cornetto.Profiler import get_file_hotspots
+from cornetto.models import StatificationHistoric, Actions, open_session_db, close_session_db
 from cornetto.models.ErrorTypeMIME import ErrorTypeMIME
 from cornetto.models.ExternalLink import ExternalLink
 from cornetto.models.HtmlError import HtmlError
+from cornetto.models.LargestFile import LargestFile
 from cornetto.models.ScannedFile import ScannedFile
 from cornetto.models.ScrapyError import ScrapyError
 from cornetto.models.Statification import Statification, Status
@@ -43,12 +49,40 @@ from cornetto.models.StatificationHistoric import StatificationHistoric
 
 logger = logging.getLogger('cornetto')
 
+# the classes of the objects associated to a statification returned with it, by key of the response
+STATIF_DETAIL_CLASSES = [
+    ('errors_type_mime', ErrorTypeMIME),
+    ('external_links', ExternalLink),
+    ('html_errors', HtmlError),
+    ('scanned_files', ScannedFile),
+    ('largest_files', LargestFile),
+    ('scrapy_errors', ScrapyError),
+    ('statification_historics', StatificationHistoric)
+]
+
+# the collections of objects associated to a statification that can be read by pages, by name
+STATIF_COLLECTION_CLASSES = {
+    'errors_type_mime': ErrorTypeMIME,
+    'external_links': ExternalLink,
+    'html_errors': HtmlError,
+    'scrapy_errors': ScrapyError
+}
+
 
 # =========
 # Utilities
 # =========
 
 
+def time_git(s_command: str):
+    """
+    Measure the duration of a git command into the metric cornetto_git_duration_seconds
+    :param s_command: the git command
+    :return: a context manager timing the block running the command
+    """
+    return metrics.time('cornetto_git_duration_seconds', command=s_command)
+
+
 def validate_commit(s_repo: str, s_commit: str):
     """
     Verify that the given commit sha exist in the git repository
@@ -60,7 +94,8 @@ def validate_commit(s_repo: str, s_commit: str):
         # Select the git repository
         git = sh.git.bake(_cwd=s_repo, _tty_out=False)
         # get the list of all commit
-        a_list_commit = git.log("--pretty='%H'", "origin/master").replace('\'', '').split('\n')
+        with time_git('log'):
+            a_list_commit = git.log("--pretty='%H'", "origin/master").replace('\'', '').split('\n')
         # verify that the commit id is valide
         verification_utilities.valid_commit(s_commit, a_list_commit)
     except SyntaxError as e:
@@ -161,22 +196,160 @@ def clear_status_background():
     f_status_background.close()
 
 
-def get_nb_page_crawled() -> int:
+# the stats of the crawl written by the StatsExporter extension of the crawler that are summed over the shards
+CRAWL_STATS_FIELDS = ('pages', 'bytes', 'items', 'errors', 'http_errors', 'queue', 'in_progress', 'rate')
+
+
+def get_crawl_snapshots() -> List[Dict[str, Any]]:
+    """
+    Get the snapshots of the stats of the crawl written by the crawler processes of the statificationProcess, there is
+    one per shard in a sharded statification
+    :return: the list of the snapshots that can be read, empty if nothing is crawled or the files don't exist
+    """
+    a_snapshots = []
+    for s_crawler_progress_counter_file in current_app.statifProcess.get_crawler_progress_counter_files():
+        try:
+            # the snapshot is replaced atomically by the crawler, it is always complete
+            with open(s_crawler_progress_counter_file) as f_stats_file:
+                snapshot = loads(f_stats_file.read())
+            if not isinstance(snapshot, dict):
+                raise ValueError('the snapshot is not a JSON object')
+            a_snapshots.append(snapshot)
+        except (FileNotFoundError, ValueError) as e:
+            current_app.logger.info('The stats of the crawler can\'t be read ' + str(e))
+
+    return a_snapshots
+
+
+def get_crawl_stats() -> Dict[str, Any]:
+    """
+    Get the stats of the crawl from the snapshots written by the crawler processes of the statificationProcess, in a
+    sharded statification the stats of the shards are summed
+    :return: a python dict containing the stats of CRAWL_STATS_FIELDS, 0 if nothing is crawled or the files don't exist
+    """
+    crawl_stats = {s_field: 0 for s_field in CRAWL_STATS_FIELDS}
+    for snapshot in get_crawl_snapshots():
+        for s_field in CRAWL_STATS_FIELDS:
+            crawl_stats[s_field] += snapshot.get(s_field, 0)
+
+    return crawl_stats
+
+
+# the metrics of the crawl read from the snapshots of the crawler : the field of the snapshot, the name and the type
+# of the metric and its description
+CRAWL_METRICS = [
+    ('pages', 'cornetto_crawl_responses_total', 'counter', 'Number of responses processed by the crawler.'),
+    ('rate', 'cornetto_crawl_responses_per_second', 'gauge', 'Number of responses processed per second.'),
+    ('bytes', 'cornetto_crawl_bytes_total', 'counter', 'Number of bytes downloaded by the crawler.'),
+    ('items', 'cornetto_crawl_items_total', 'counter', 'Number of files sent to the pipeline of the crawler.'),
+    ('errors', 'cornetto_crawl_errors_total', 'counter', 'Number of errors logged by the crawler.'),
+    ('http_errors', 'cornetto_crawl_http_errors_total', 'counter', 'Number of responses with an HTTP error status.'),
+    ('queue', 'cornetto_crawl_queue_size', 'gauge', 'Number of requests waiting in the scheduler of the crawler.'),
+    ('in_progress', 'cornetto_crawl_requests_in_progress', 'gauge', 'Number of requests downloaded or processed.')
+]
+
+
+def service_get_crawl_metrics() -> str:
+    """
+    Get the metrics of the running crawl in the Prometheus text format, they are read from the snapshots of the stats
+    written every second by the crawler processes, in a sharded statification the values of the shards are summed
+    :return: the metrics of the crawl, only cornetto_crawl_running if no crawl is running
+    """
+    b_is_running = current_app.statifProcess.is_running()
+    s_metrics = format_family('cornetto_crawl_running', 'gauge', 'Whether a crawl is running.',
+                              [('', {}, int(b_is_running))])
+    a_snapshots = get_crawl_snapshots() if b_is_running else []
+    if not a_snapshots:
+        return s_metrics
+
+    for s_field, s_name, s_type, s_help in CRAWL_METRICS:
+        s_metrics += format_family(s_name, s_type, s_help,
+                                   [('', {}, sum(snapshot.get(s_field, 0) for snapshot in a_snapshots))])
+
+    mime_types = {}
+    latency_buckets = {}
+    f_latency_sum = 0
+    i_latency_count = 0
+    for snapshot in a_snapshots:
+        for s_mime, i_count in snapshot.get('mime_types', {}).items():
+            mime_types[s_mime] = mime_types.get(s_mime, 0) + i_count
+        latency = snapshot.get('latency', {})
+        for s_bucket, i_count in latency.get('buckets', {}).items():
+            latency_buckets[s_bucket] = latency_buckets.get(s_bucket, 0) + i_count
+        f_latency_sum += latency.get('sum', 0)
+        i_latency_count += latency.get('count', 0)
+
+    s_metrics += format_family('cornetto_crawl_responses_by_mime_type_total', 'counter',
+                               'Number of responses received by the crawler by MIME type.',
+                               [('', {'mime_type': s_mime}, i_count) for s_mime, i_count in sorted(mime_types.items())])
+    a_latency_samples = [('_bucket', {'le': s_bucket}, i_count)
+                         for s_bucket, i_count in sorted(latency_buckets.items(), key=lambda bucket: float(bucket[0]))]
+    a_latency_samples += [('_bucket', {'le': '+Inf'}, i_latency_count), ('_sum', {}, f_latency_sum),
+                          ('_count', {}, i_latency_count)]
+    s_metrics += format_family('cornetto_crawl_download_latency_seconds', 'histogram',
+                               'Download latency of the responses received by the crawler.', a_latency_samples)
+    return s_metrics
+
+
+def service_get_routes_profile(s_route: str, s_sort: str, i_limit: int) -> Dict[str, Any]:
+    """
+    Get the hotspots of the requests of the api profiled by this process since it started
+    :param s_route: the rule of a route, empty for all the profiled routes
+    :param s_sort: the order of the hotspots : cumulative, time or calls
+    :param i_limit: the maximum number of hotspots by route
+    :return: a python dict containing the profile of each route, or an error if the profiling is disabled
     """
-    Get the number of page crawled by the statificationProcess
-    :return: the number of page crawled, 0 if nothing is crawled or the file crawlerProgressCount.txt doesn't exist
+    if current_app.profiler is None:
+        return {
+            'success': False,
+            'error': 'profiling_disabled'
+        }
+    return {
+        'success': True,
+        'routes': current_app.profiler.get_routes(s_route, s_sort, i_limit)
+    }
+
+
+def service_get_crawl_profile(s_commit: str, s_sort: str, i_limit: int) -> Dict[str, Any]:
+    """
+    Get the hotspots of the crawl of a statification, the profile is written next to the log file of the
+    statification when the crawl is over and it follows the log file when the statification is committed
+    :param s_commit: the commit sha of the statification, empty for the current statification
+    :param s_sort: the order of the hotspots : cumulative, time or calls
+    :param i_limit: the maximum number of hotspots
+    :return: a python dict containing the total time and the hotspots of the crawl, or an error
     """
-    i_current_nb_item_crawled = 0
     try:
-        # open the crawler page counter file in read mode
-        count_file = open(current_app.config['CRAWLER_PROGRESS_COUNTER_FILE'])
-        i_current_nb_item_crawled = int(count_file.read())
-        count_file.close()
+        if s_commit != '':
+            verification_utilities.valid_commit_id(s_commit)
+    except SyntaxError as e:
+        current_app.logger.error(e)
+        return {
+            'success': False,
+            'error': 'commit_unvalid'
+        }
+
+    if s_commit == '':
+        s_profile_file = current_app.config['LOGFILE'] + '.prof'
+    else:
+        s_profile_file = os.path.join(current_app.config['LOGDIR'], s_commit + '.prof')
+
+    profile = get_file_hotspots(s_profile_file, s_sort, i_limit)
+    if profile is None:
+        return {
+            'success': False,
+            'error': 'profile_not_found'
+        }
+    return dict(profile, success=True, commit=s_commit)
 
-    except (FileNotFoundError, ValueError)as e:
-        current_app.logger.info('The file crawlerProgressCount.txt doesn\'t exist' + str(e))
 
-    return i_current_nb_item_crawled
+def get_nb_page_crawled() -> int:
+    """
+    Get the number of page crawled by the statificationProcess, in a sharded statification it's the sum of the pages
+    crawled by each shard
+    :return: the number of page crawled, 0 if nothing is crawled or the stats of the crawler don't exist
+    """
+    return get_crawl_stats()['pages']
 
 
 def get_background_status_file_content() -> Dict[str, Any]:
@@ -312,6 +485,61 @@ def service_get_satif_list(i_limit: int, i_skip: int, s_order: str) -> Dict[str,
     }
 
 
+def get_statif_detail(session, s_commit: str) -> Dict[str, Any]:
+    """
+    Load the statification for the given commit sha and the data of all its associated objects, the objects of each
+    class are read by one query that doesn't load the ORM objects
+    :param session: the database session
+    :param s_commit: the commit sha of the statification, empty for the current statification
+    :return: a python dict containing the statification and the lists of its associated objects
+    :raise NoResultFound if there is no statification for the commit
+    """
+    statification = Statification.get_statification(session, s_commit)
+
+    detail = {'statification': statification.get_dict()}
+    for s_key, c_class in STATIF_DETAIL_CLASSES:
+        detail[s_key] = c_class.get_dicts_from_statification_id(session, statification.id)
+    return detail
+
+
+def create_statif_report(session, s_commit: str) -> Tuple[bytes, str]:
+    """
+    Create the report of a committed statification and store it with the statification : the JSON of its detail as
+    returned by the API, compressed with gzip. The associated objects of a committed statification don't change, so
+    the report can be served until the statification is modified
+    :param session: the database session
+    :param s_commit: the commit sha of the statification
+    :return: a tuple of the report and its ETag, the sha256 of the JSON
+    :raise NoResultFound if there is no statification for the commit
+    """
+    detail = get_statif_detail(session, s_commit)
+    detail['status_code'] = 200
+    b_json = dumps(detail, sort_keys=True).encode('utf-8')
+    s_report_etag = hashlib.sha256(b_json).hexdigest()
+    b_report = gzip.compress(b_json)
+    Statification.upd_report(session, s_commit, b_report, s_report_etag)
+    return b_report, s_report_etag
+
+
+def service_get_statif_report(s_commit: str) -> Optional[Tuple[bytes, str]]:
+    """
+    Get the report of a committed statification, it is created if the statification has been modified since the
+    last one
+    :param s_commit: the commit sha of the statification
+    :return: a tuple of the compressed JSON of the detail of the statification and its ETag, or None if the commit is
+             not valid or if there is no statification for the commit
+    """
+    try:
+        verification_utilities.valid_commit_id(s_commit)
+        b_report, s_report_etag = Statification.get_report(current_app.session, s_commit)
+        if b_report is None:
+            b_report, s_report_etag = create_statif_report(current_app.session, s_commit)
+        return b_report, s_report_etag
+    except (SyntaxError, NoResultFound):
+        # service_get_statif_info will build the response
+        return None
+
+
 def service_get_statif_info(s_commit: str) -> Dict[str, Any]:
     """
     Get the statification information for the given commit sha, with all the data included in associated objects.
@@ -321,82 +549,190 @@ def service_get_statif_info(s_commit: str) -> Dict[str, Any]:
       -  external_links : the list of external links
       -  html_errors : the list of html errors
       -  scanned_files : the list of scanned files
+      -  largest_files : the list of the largest files
       -  scrapy_errors : the list of scrapy errors
       -  statification_historics : the list of statification historics.
 
     :return a python dict containing all the information of the current statification
     """
-    # initialize empty variable
-    s_statification = None
-    a_errors_type_mime = None
-    a_external_links = None
-    a_html_errors = None
-    a_scanned_files = None
-    a_scrapy_errors = None
-    a_statification_historic = None
-
     try:
-        # verify that the commit is valid if not , if it is empty then
+        # verify that the commit is valid, only the statifications that have been committed have a commit sha in the
+        # database so it doesn't need to be searched in the git repository
         if s_commit != '':
-            validate_commit(current_app.config['STATIC_REPOSITORY'], s_commit)
+            verification_utilities.valid_commit_id(s_commit)
+    except SyntaxError as e:
+        current_app.logger.error(e)
+        # return an error code if the commit is not valid
+        return {
+            'success': False,
+            'error': 'commit_unvalid'
+        }
 
-        try:
-            # get the statification corresponding to the commit and the associated objects
-            statification = Statification.get_statification(current_app.session, s_commit)
-            # get the JSON from this statification
-            s_statification = statification.get_dict()
+    try:
+        return get_statif_detail(current_app.session, s_commit)
+    except NoResultFound as e:
+        current_app.logger.info(e)
+        # Return a python dict without information
+        detail = {'statification': None}
+        for s_key, c_class in STATIF_DETAIL_CLASSES:
+            detail[s_key] = None
+        return detail
 
-            # get other objects associated to the statification and their JSON
-            try:
-                a_errors_type_mime = statification.get_list_from_class(ErrorTypeMIME, current_app.session)
-            except NoResultFound as e:
-                current_app.logger.info(e)
-            try:
-                a_external_links = statification.get_list_from_class(ExternalLink, current_app.session)
-            except NoResultFound as e:
-                current_app.logger.info(e)
-            try:
-                a_html_errors = statification.get_list_from_class(HtmlError, current_app.session)
-            except NoResultFound as e:
-                current_app.logger.info(e)
-            try:
-                a_scanned_files = statification.get_list_from_class(ScannedFile, current_app.session)
-            except NoResultFound as e:
-                current_app.logger.info(e)
-            try:
-                a_scrapy_errors = statification.get_list_from_class(ScrapyError, current_app.session)
-            except NoResultFound as e:
-                current_app.logger.info(e)
-            try:
-                a_statification_historic = statification.get_list_from_class(StatificationHistoric, current_app.session)
-            except NoResultFound as e:
-                current_app.logger.info(e)
-        except NoResultFound as e:
-            current_app.logger.info(e)
 
-        # Return a python dict with all information
+def encode_cursor(position: Tuple[Any, int]) -> str:
+    """
+    Encode the position of the last object of a page into the cursor given to the client to get the next page
+    :param position: the value of the sort column and the id of the object
+    :return: the cursor, a string that can be used in an url
+    """
+    # the padding is removed, it would have to be escaped in the url
+    return base64.urlsafe_b64encode(dumps(position).encode('utf-8')).decode('ascii').rstrip('=')
+
+
+def decode_cursor(s_cursor: str) -> Tuple[Any, int]:
+    """
+    Decode a cursor created by encode_cursor
+    :param s_cursor: the cursor
+    :return: the value of the sort column and the id of the last object of the previous page
+    :raise ValueError if the cursor is not valid
+    """
+    try:
+        position = loads(base64.urlsafe_b64decode(s_cursor + '=' * (-len(s_cursor) % 4)).decode('utf-8'))
+    except (ValueError, UnicodeError):
+        raise ValueError("The cursor is not valid : " + s_cursor)
+    if not (isinstance(position, list) and len(position) == 2 and isinstance(position[1], int)):
+        raise ValueError("The cursor is not valid : " + s_cursor)
+    return position[0], position[1]
+
+
+def get_current_statif_counts() -> Dict[str, int]:
+    """
+    Count the objects of each collection of the current statification, they are registered while the crawl runs
+    :return: a python dict containing the number of objects by collection, empty if there is no current statification
+    """
+    try:
+        statification = Statification.get_statification(current_app.session, '')
+    except NoResultFound:
+        return {}
+    return {s_name: c_class.get_count_from_statification_id(current_app.session, statification.id)
+            for s_name, c_class in STATIF_COLLECTION_CLASSES.items()}
+
+
+def service_get_statif_collection(s_collection: str, s_commit: str, parameters: Dict[str, str], s_order: str,
+                                  s_sort: str, s_after: str, i_limit: int) -> Dict[str, Any]:
+    """
+    Get a page of a collection of objects associated to the statification for the given commit sha. The pages
+    are read by keyset, the response contains the cursor to give to get the next page :
+      -  the name of the collection : the list of the objects of the page
+      -  next : the cursor of the next page, None if it is the last page
+
+    :param s_collection: the name of the collection, a key of STATIF_COLLECTION_CLASSES
+    :param s_commit: the commit sha of the statification, empty for the current statification
+    :param parameters: the parameters of the request, the ones named like a column that can filter the collection
+                       are used as filters
+    :param s_order: the name of the column to sort the objects by
+    :param s_sort: 'desc' to sort in descending order, otherwise ascending
+    :param s_after: the cursor of the page returned by the previous call, empty to get the first page
+    :param i_limit: the maximum number of objects of the page
+    :return: a python dict containing the page
+    """
+    c_class = STATIF_COLLECTION_CLASSES[s_collection]
+
+    try:
+        if s_commit != '':
+            verification_utilities.valid_commit_id(s_commit)
+    except SyntaxError as e:
+        current_app.logger.error(e)
+        return {
+            'success': False,
+            'error': 'commit_unvalid'
+        }
+
+    # the empty parameters don't filter the collection
+    filters = {s_column: s_value for s_column, s_value in parameters.items()
+               if s_value != '' and (s_column in c_class.EQUAL_FILTERS or s_column in c_class.SUBSTRING_FILTERS)}
+
+    try:
+        after = decode_cursor(s_after) if s_after else None
+        statification = Statification.get_statification(current_app.session, s_commit)
+        a_objects, next_position = c_class.get_page_from_statification_id(current_app.session, statification.id,
+                                                                          filters, s_order or 'id', s_sort == 'desc',
+                                                                          after, i_limit)
+    except ValueError as e:
+        current_app.logger.error(e)
         return {
-            'statification': s_statification,
-            'errors_type_mime': a_errors_type_mime,
-            'external_links': a_external_links,
-            'html_errors': a_html_errors,
-            'scanned_files': a_scanned_files,
-            'scrapy_errors': a_scrapy_errors,
-            'statification_historics': a_statification_historic
+            'success': False,
+            'error': 'parameter_unvalid'
+        }
+    except NoResultFound as e:
+        current_app.logger.info(e)
+        return {
+            s_collection: None,
+            'next': None
         }
+
+    return {
+        s_collection: a_objects,
+        'next': encode_cursor(next_position) if next_position is not None else None
+    }
+
+
+def service_get_statif_summary(s_commit: str, s_collection: str, parameters: Dict[str, str],
+                               i_limit: int) -> Dict[str, Any]:
+    """
+    Get the summary of the collections of objects associated to the statification for the given commit sha : for each
+    collection the number of objects and the biggest groups of objects, counted by the database. The groups are :
+      -  errors_type_mime : by type_mime
+      -  external_links : by host and by source
+      -  html_errors : by error_code and by source
+      -  scrapy_errors : by error_code
+    With a collection and the value of a group (for example html_errors and error_code=404), only the objects of the
+    group are counted, by the other columns
+
+    :param s_commit: the commit sha of the statification, empty for the current statification
+    :param s_collection: the name of a collection to drill down into, empty to summarize all the collections
+    :param parameters: the parameters of the request, the ones named like a group column of the collection select the
+                       group to drill down into
+    :param i_limit: the maximum number of groups by column
+    :return: a python dict containing the summary of each collection
+    """
+    try:
+        if s_commit != '':
+            verification_utilities.valid_commit_id(s_commit)
     except SyntaxError as e:
         current_app.logger.error(e)
-        # return an error code if the commit is not valid
         return {
             'success': False,
             'error': 'commit_unvalid'
         }
-    except sh.ErrorReturnCode:
-        # if an error has occurred during a subprocess
+
+    if s_collection:
+        if s_collection not in STATIF_COLLECTION_CLASSES:
+            current_app.logger.error("The collection doesn't exist : " + s_collection)
+            return {
+                'success': False,
+                'error': 'parameter_unvalid'
+            }
+        c_class = STATIF_COLLECTION_CLASSES[s_collection]
+        collections = {s_collection: (c_class, {s_column: s_value for s_column, s_value in parameters.items()
+                                                if s_value != '' and s_column in c_class.GROUP_COLUMNS})}
+    else:
+        collections = {s_name: (c_class, {}) for s_name, c_class in STATIF_COLLECTION_CLASSES.items()}
+
+    try:
+        statification = Statification.get_statification(current_app.session, s_commit)
+    except NoResultFound as e:
+        current_app.logger.info(e)
         return {
-            'success': False,
-            'error': 'system_fail'
+            'summary': None
+        }
+
+    return {
+        'summary': {
+            s_name: c_class.get_counts_from_statification_id(current_app.session, statification.id, filters, i_limit)
+            for s_name, (c_class, filters) in collections.items()
         }
+    }
 
 
 def service_do_init_statif(s_repository: str, s_url_git: str):
@@ -418,19 +754,25 @@ def service_do_init_statif(s_repository: str, s_url_git: str):
     # if the STATIC_REPOSITORY doesn't exist
     if not os.path.isdir(s_repository + '/.git'):
         # clone into the STATIC_REPOSITORY folder
-        logger.info(git.clone('-b master ' + s_url_git))
-        logger.info(git('ls-remote'))
+        with time_git('clone'):
+            logger.info(git.clone('-b master ' + s_url_git))
+        with time_git('ls-remote'):
+            logger.info(git('ls-remote'))
     # in case there is already a directory we don't need to clone again
 
     # Reset static workspace, every result are logged in INFO level
-    for log in git.clean('-qxdf'):
-        logger.info(log)
-    for log in git.reset('--hard', 'HEAD'):
-        logger.info(log)
-    for log in git.checkout('master'):
-        logger.info(log)
-    for log in git.fetch('origin'):
-        logger.info(log)
+    with time_git('clean'):
+        for log in git.clean('-qxdf'):
+            logger.info(log)
+    with time_git('reset'):
+        for log in git.reset('--hard', 'HEAD'):
+            logger.info(log)
+    with time_git('checkout'):
+        for log in git.checkout('master'):
+            logger.info(log)
+    with time_git('fetch'):
+        for log in git.fetch('origin'):
+            logger.info(log)
 
     logger.info('> Static repository initialization terminated')
 
@@ -462,13 +804,17 @@ def service_do_start_statif(s_user: str, s_designation: str, s_description: str)
             # reinitialize the repository
             service_do_init_statif(current_app.config['STATIC_REPOSITORY'], current_app.config['URL_GIT'])
 
-            # Select the git repository
-            git = sh.git.bake(_cwd=current_app.config['STATIC_REPOSITORY'], _tty_out=False, _iter='out')
+            # in incremental mode the content of the previous statification is kept to be reused by the crawler,
+            # the files that haven't been crawled are deleted at the end of the process
+            if not current_app.statifProcess.b_incremental:
+                # Select the git repository
+                git = sh.git.bake(_cwd=current_app.config['STATIC_REPOSITORY'], _tty_out=False, _iter='out')
 
-            # Delete everything. Content will be added again at the end of the process
-            # (this allows deleted files (in the CMS) to be deleted from the repository)
-            for log in git.rm('-rfq', '--ignore-unmatch', '.'):
-                current_app.logger.info(log)
+                # Delete everything. Content will be added again at the end of the process
+                # (this allows deleted files (in the CMS) to be deleted from the repository)
+                with time_git('rm'):
+                    for log in git.rm('-rfq', '--ignore-unmatch', '.'):
+                        current_app.logger.info(log)
 
             try:
                 # try to create the folder LOGDIR
@@ -512,6 +858,60 @@ def service_do_start_statif(s_user: str, s_designation: str, s_description: str)
         raise RuntimeError('process_running')
 
 
+def service_do_pause_statif() -> Dict[str, Any]:
+    """
+    Pause the running statification process : the crawler is stopped but the statification and the state of the
+    crawl are kept, so the statification can be resumed later.
+    :return  if everything goes smoothly the following python dict will be returned :
+                {
+                    'success': True,
+                }
+    :raise RuntimeError
+    """
+    if not current_app.statifProcess.is_running():
+        current_app.logger.error("No process is running")
+        raise RuntimeError('process_not_running')
+
+    try:
+        current_app.statifProcess.pause()
+    except ValueError as e:
+        current_app.logger.error(str(e))
+        raise RuntimeError('resume_disabled')
+
+    return {
+        'success': True
+    }
+
+
+def service_do_resume_statif(s_user: str) -> Dict[str, Any]:
+    """
+    Resume a statification that has been paused or whose crawler has failed, the crawler continues where it has been
+    stopped instead of crawling again the whole website.
+    :return  if everything goes smoothly the following python dict will be returned :
+                {
+                    'success': True,
+                }
+    :raise RuntimeError
+    """
+    if not s_user:
+        current_app.logger.error("Parameter X-Forwarded-User empty")
+        raise RuntimeError('forwarded_user_empty')
+
+    try:
+        current_app.statifProcess.resume(current_app.session, s_user)
+    except ValueError as e:
+        current_app.logger.error(str(e))
+        raise RuntimeError('no_statification_to_resume')
+    except sh.ErrorReturnCode as e:
+        current_app.logger.error(str(e))
+        # if an error has happened when executing a subprocess command
+        raise RuntimeError('subprocess')
+
+    return {
+        'success': True
+    }
+
+
 def service_do_commit(s_user: str) -> Dict[str, Any]:
     """
     Commit and push the last statification on the git repository and rename the statif.log logfile by the commit sha.
@@ -527,6 +927,9 @@ def service_do_commit(s_user: str) -> Dict[str, Any]:
     :raise RuntimeError if an error happen during the process it will be caught and transferred as a RuntimeError to the
                         parent method with a specific error code.
     """
+    # the start of the operation, its duration is measured when the background process is done
+    f_start = time.monotonic()
+
     clear_status_background()
 
     try:
@@ -540,17 +943,19 @@ def service_do_commit(s_user: str) -> Dict[str, Any]:
         current_app.logger.info('> Add all modifications')
 
         # add all the modification to the next commit
-        for line in git.add('-A', _iter=True):
-            current_app.logger.info(line)
+        with time_git('add'):
+            for line in git.add('-A', _iter=True):
+                current_app.logger.info(line)
 
         current_app.logger.info('> Create a new commit')
 
         # commit the new statification
         try:
-            for line in git.commit(
-                    "-qm'Statification validee le " + time.strftime('%Y%m%d.%H%M%S') + " par " + s_user + "'",
-                    _iter=True):
-                current_app.logger.info(line)
+            with time_git('commit'):
+                for line in git.commit(
+                        "-qm'Statification validee le " + time.strftime('%Y%m%d.%H%M%S') + " par " + s_user + "'",
+                        _iter=True):
+                    current_app.logger.info(line)
         except sh.ErrorReturnCode_1 as e:
             # this exception can be raised if the commit hasn't been done because there is nothing to commit,
             # in this case stderr will be empty. If an error has occured stderr will be filled with the message
@@ -566,7 +971,8 @@ def service_do_commit(s_user: str) -> Dict[str, Any]:
                 raise RuntimeError('commit_nothing')
 
         # get the last commit SHA of local branch master
-        s_commit_sha = git.log("--pretty='%H'", "master").replace('\'', '').split('\n', 1)[0]
+        with time_git('log'):
+            s_commit_sha = git.log("--pretty='%H'", "master").replace('\'', '').split('\n', 1)[0]
 
         # push the commit to 'origin master' branch
         git.push(
@@ -581,7 +987,9 @@ def service_do_commit(s_user: str) -> Dict[str, Any]:
                 current_app.config['LOGDIR'],
                 current_app.config['LOCKFILE'],
                 current_app.config['STATUS_BACKGROUND'],
-                current_app.config['DATABASE_URI']
+                current_app.config['DATABASE_URI'],
+                current_app.statifProcess.s_validators_file,
+                f_start=f_start
             )
         )
 
@@ -618,6 +1026,9 @@ def service_do_apply_prod(s_user: str, s_commit: str) -> Dict[str, Any]:
     :raise RuntimeError if an error happen during the process it will be caught and transferred as a RuntimeError to the
                         parent method with a specific error code.
     """
+    # the start of the operation, its duration is measured when the background process is done
+    f_start = time.monotonic()
+
     # this try except is there to check if commit or user are valid
     try:
         if not s_user:
@@ -637,21 +1048,24 @@ def service_do_apply_prod(s_user: str, s_commit: str) -> Dict[str, Any]:
         current_app.logger.info('> Load the statification commit')
 
         # loading the statification
-        for line in git.checkout('-q', s_commit, _iter=True):
-            current_app.logger.info(line)
+        with time_git('checkout'):
+            for line in git.checkout('-q', s_commit, _iter=True):
+                current_app.logger.info(line)
 
         current_app.logger.info('> Add a tag on the production commit')
 
         # add a tag on the commit ''
-        for line in git.tag("-am", "Mise en production le " + formatdate(time.time()) + " par " + s_user,
-                            time.strftime('%Y%m%d.%H%M%S'), s_commit):
-            current_app.logger.info(line)
+        with time_git('tag'):
+            for line in git.tag("-am", "Mise en production le " + formatdate(time.time()) + " par " + s_user,
+                                time.strftime('%Y%m%d.%H%M%S'), s_commit):
+                current_app.logger.info(line)
 
         current_app.logger.info('> Push the tag')
 
         # push the commit to branch 'origin master'
-        for line in git.push('--tags', 'origin', 'master', _iter=True):
-            current_app.logger.info(line)
+        with time_git('push'):
+            for line in git.push('--tags', 'origin', 'master', _iter=True):
+                current_app.logger.info(line)
 
         current_app.logger.info('> Rebase local production branch with the production commit')
 
@@ -663,7 +1077,8 @@ def service_do_apply_prod(s_user: str, s_commit: str) -> Dict[str, Any]:
                                                        current_app.config['URL_GIT_PROD'],
                                                        current_app.config['STATUS_BACKGROUND'],
                                                        current_app.config['LOCKFILE'],
-                                                       current_app.config['DATABASE_URI']
+                                                       current_app.config['DATABASE_URI'],
+                                                       f_start=f_start
                                                        ))
         # on success return a success code
         return {
@@ -696,6 +1111,9 @@ def service_do_visualize(s_user: str, s_commit: str) -> Dict[str, Any]:
     :raise RuntimeError if an error happen during the process it will be caught and transferred as a RuntimeError to the
                         parent method with a specific error code.
     """
+    # the start of the operation, its duration is measured when the background process is done
+    f_start = time.monotonic()
+
     try:
         if not s_user:
             current_app.logger.error("Parameter X-Forwarded-User empty")
@@ -723,7 +1141,8 @@ def service_do_visualize(s_user: str, s_commit: str) -> Dict[str, Any]:
                 current_app.config['URL_GIT'],
                 current_app.config['STATUS_BACKGROUND'],
                 current_app.config['LOCKFILE'],
-                current_app.config['DATABASE_URI']
+                current_app.config['DATABASE_URI'],
+                f_start=f_start
             )
         )
 
@@ -747,7 +1166,8 @@ def service_do_visualize(s_user: str, s_commit: str) -> Dict[str, Any]:
 
 
 def bg_commit_done_creator(s_user: str, s_commit: str, s_log_file: str, s_log_dir: str, s_lock_file: str,
-                           s_file_status_background: str, s_database_uri: str):
+                           s_file_status_background: str, s_database_uri: str, s_validators_file: str = '',
+                           f_start: float = None):
     """
     Wrapper for the method that will be called after the background operation of the visualize service is done.
     All the param are required
@@ -758,8 +1178,14 @@ def bg_commit_done_creator(s_user: str, s_commit: str, s_log_file: str, s_log_di
     :param s_file_status_background: the path to the file that register the background process status
     :param s_lock_file: the path to the lockfile
     :param s_database_uri: the uri of the database
+    :param s_validators_file: the path to the file that store the validators of the committed statification
+    :param f_start: the time (time.monotonic) when the operation started, by default when the background process starts
     :return: the method that will be called after the background process
     """
+    # the wrapper is called when the background process starts
+    f_launch = time.monotonic()
+    f_operation_start = f_launch if f_start is None else f_start
+
     def commit_done(cmd: str, success: bool, exit_code: int):
         """
         That method is called after the git.push process has finish
@@ -769,6 +1195,8 @@ def bg_commit_done_creator(s_user: str, s_commit: str, s_log_file: str, s_log_di
         :raise RuntimeError
         """
         # create a session for this specific code , because it's executed after the flask instance has been killed
+        metrics.observe('cornetto_git_duration_seconds', time.monotonic() - f_launch, command='push')
+
         session = open_session_db(s_database_uri)
 
         if not success:
@@ -780,6 +1208,15 @@ def bg_commit_done_creator(s_user: str, s_commit: str, s_log_file: str, s_log_di
             # rename the logfile of the statification by the commit SHA
             os.rename(s_log_file, s_log_dir + "/" + s_commit + ".log")
 
+            # the profile of the crawl, if it has been profiled, follows the log file
+            if os.path.isfile(s_log_file + '.prof'):
+                os.rename(s_log_file + '.prof', s_log_dir + "/" + s_commit + ".prof")
+
+            # the validators of the crawl now match the content of the git repository,
+            # they will be used by the next incremental statification
+            if s_validators_file and os.path.isfile(s_validators_file + '.new'):
+                os.replace(s_validators_file + '.new', s_validators_file)
+
             logger.info('> Register Commit into the database')
 
             # update the current statification with no commit with the new commit sha
@@ -798,6 +1235,9 @@ def bg_commit_done_creator(s_user: str, s_commit: str, s_log_file: str, s_log_di
                                                              datetime.utcnow(),
                                                              s_user,
                                                              Actions.COMMIT_STATIFICATION)
+
+            logger.info('> Create the report of the statification')
+            create_statif_report(session, s_commit)
             logger.info('> Commit operations terminated')
 
             # on success write a success code and the commit id
@@ -844,12 +1284,16 @@ def bg_commit_done_creator(s_user: str, s_commit: str, s_log_file: str, s_log_di
         finally:
             # always unlock the route
             unlock_access(s_lock_file)
+            close_session_db(s_database_uri)
+            metrics.observe('cornetto_operation_duration_seconds', time.monotonic() - f_operation_start,
+                            operation='commit')
 
     return commit_done
 
 
 def bg_do_apply_prod_done_creator(s_commit: str, s_user: str, s_static_repository: str, urls_git_prod: str,
-                                  s_file_status_background: str, s_lock_file: str, s_database_uri: str):
+                                  s_file_status_background: str, s_lock_file: str, s_database_uri: str,
+                                  f_start: float = None):
     """
     Wrapper for the method that will be called after the background operation of the visualize service is done.
     All the param are required
@@ -860,8 +1304,13 @@ def bg_do_apply_prod_done_creator(s_commit: str, s_user: str, s_static_repositor
     :param s_file_status_background: the path to the file that register the background process status
     :param s_lock_file: the path to the lockfile
     :param s_database_uri: the uri of the database
+    :param f_start: the time (time.monotonic) when the operation started, by default when the background process starts
     :return: the method that will be called after the background process
     """
+    # the wrapper is called when the background process starts
+    f_launch = time.monotonic()
+    f_operation_start = f_launch if f_start is None else f_start
+
     def do_apply_prod_done(cmd: str, success: bool, exit_code: int):
         """
         That method is called after the git.branch process has finish
@@ -871,6 +1320,8 @@ def bg_do_apply_prod_done_creator(s_commit: str, s_user: str, s_static_repositor
         :raise RuntimeError
         """
         # create a session for this specific code , because it's executed after the flask instance has been killed
+        metrics.observe('cornetto_git_duration_seconds', time.monotonic() - f_launch, command='branch')
+
         session = open_session_db(s_database_uri)
 
         if not success:
@@ -884,8 +1335,9 @@ def bg_do_apply_prod_done_creator(s_commit: str, s_user: str, s_static_repositor
         for url in urls_git_prod:
             logger.info('> Push statification to server : ' + url)
             # push the commit to production server
-            for log in git.push('-f', url, 'production', _iter='out'):
-                logger.info(log)
+            with time_git('push'):
+                for log in git.push('-f', url, 'production', _iter='out'):
+                    logger.info(log)
 
         logger.info('> Change status of the last statification push to prod to saved')
 
@@ -913,6 +1365,9 @@ def bg_do_apply_prod_done_creator(s_commit: str, s_user: str, s_static_repositor
                                                              s_user,
                                                              Actions.PUSHTOPROD_STATIFICATION)
 
+            # the report contains the status and the historic of the statification
+            create_statif_report(session, s_commit)
+
             logger.info('> Push to prod operations terminated')
             write_status_background(
                 {
@@ -946,12 +1401,16 @@ def bg_do_apply_prod_done_creator(s_commit: str, s_user: str, s_static_repositor
         finally:
             # always unlock the route
             unlock_access(s_lock_file)
+            close_session_db(s_database_uri)
+            metrics.observe('cornetto_operation_duration_seconds', time.monotonic() - f_operation_start,
+                            operation='pushtoprod')
 
     return do_apply_prod_done
 
 
 def bg_visualize_done_creator(s_commit: str, s_user: str, s_visualize_repository: str, s_url_git: str,
-                              s_file_status_background: str, s_lock_file: str, s_database_uri: str):
+                              s_file_status_background: str, s_lock_file: str, s_database_uri: str,
+                              f_start: float = None):
     """
     Wrapper for the method that will be called after the background operation of the visualize service is done.
     All the param are required
@@ -962,8 +1421,13 @@ def bg_visualize_done_creator(s_commit: str, s_user: str, s_visualize_repository
     :param s_file_status_background: the path to the file that register the background process status
     :param s_lock_file: the path to the lockfile
     :param s_database_uri: the uri of the database
+    :param f_start: the time (time.monotonic) when the operation started, by default when the background process starts
     :return: the method that will be called after the background process
     """
+    # the wrapper is called when the background process starts
+    f_launch = time.monotonic()
+    f_operation_start = f_launch if f_start is None else f_start
+
     def visualize_done(cmd: str, success: bool, exit_code: int):
         """
         That method is called after the git.pull process has finish
@@ -973,6 +1437,8 @@ def bg_visualize_done_creator(s_commit: str, s_user: str, s_visualize_repository
         :raise RuntimeError
         """
         # create a session for this specific code , because it's executed after the flask instance has been killed
+        metrics.observe('cornetto_git_duration_seconds', time.monotonic() - f_launch, command='pull')
+
         session = open_session_db(s_database_uri)
 
         if not success:
@@ -987,8 +1453,9 @@ def bg_visualize_done_creator(s_commit: str, s_user: str, s_visualize_repository
             git = sh.git.bake(_cwd=s_visualize_repository, _tty_out=False)
 
             # checkout the commit on the archive repository
-            for line in git.checkout('-q', s_commit, _iter=True):
-                logger.info(line)
+            with time_git('checkout'):
+                for line in git.checkout('-q', s_commit, _iter=True):
+                    logger.info(line)
 
             logger.info('> Change status for last visualized statification to saved')
 
@@ -1013,6 +1480,10 @@ def bg_visualize_done_creator(s_commit: str, s_user: str, s_visualize_repository
                                                              datetime.utcnow(),
                                                              s_user,
                                                              Actions.VISUALIZE_STATIFICATION)
+
+            # the report contains the status and the historic of the statification
+            create_statif_report(session, s_commit)
+
             # on success write a success code
             write_status_background(
                 {'success': True, 'operation': 'visualize', 'commit': s_commit},
@@ -1052,5 +1523,8 @@ def bg_visualize_done_creator(s_commit: str, s_user: str, s_visualize_repository
             )
         finally:
             unlock_access(s_lock_file)
+            close_session_db(s_database_uri)
+            metrics.observe('cornetto_operation_duration_seconds', time.monotonic() - f_operation_start,
+                            operation='visualize')
 
     return visualize_done
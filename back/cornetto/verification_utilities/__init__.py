@@ -20,6 +20,17 @@ import re
 from typing import List
 
 
+def valid_commit_id(s_commit: str) -> None:
+    """
+    Verify that the parameter has the format of a git commit ID
+    :param s_commit: a string that should contain the id of a git commit
+    :raise SyntaxError if the commit ID don't respect the policies
+    """
+    # verify if s_commit is not null, is 40 characters long and is only composed of alphanumerical character
+    if not (s_commit and len(s_commit) == 40 and re.match(r'[a-zA-Z0-9]{40}', s_commit)):
+        raise SyntaxError("The parameter does not respect the commit ID policies, value : " + s_commit)
+
+
 def valid_commit(s_commit: str, a_list_commit: List[str]) -> None:
     """
     Verify that the parameter is a valid git commit ID
@@ -17,16 +17,37 @@ You should have received a copy of the GNU General Public License
 """
 
 import functools
+import gzip
+import time
 
 from typing import Any, Dict
-from flask import jsonify, request, current_app
+from flask import Response, g, jsonify, request, current_app, stream_with_context
+from flask.json import dumps
 from flask.blueprints import Blueprint
-from cornetto.services import is_access_locked, lock_access, unlock_access, get_nb_page_crawled, \
-    service_get_last_statif_infos, get_background_status_file_content, service_get_satif_list, \
-    service_get_statif_info, service_do_apply_prod, service_do_commit, service_get_statif_count, service_do_start_statif
+from cornetto.Metrics import metrics
+from cornetto.services import is_access_locked, lock_access, unlock_access, get_crawl_stats, \
+    get_current_statif_counts, service_get_last_statif_infos, get_background_status_file_content, \
+    service_get_satif_list, \
+    service_get_statif_info, service_get_statif_report, service_get_statif_collection, service_get_statif_summary, \
+    service_do_apply_prod, service_do_commit, service_get_statif_count, service_do_start_statif, \
+    service_do_pause_statif, service_do_resume_statif, service_get_crawl_metrics, service_get_routes_profile, \
+    service_get_crawl_profile
 
 bp = Blueprint("cornetto", __name__)
 
+# the maximum number of objects of a page of a collection of a statification
+COLLECTION_PAGE_MAX_SIZE = 1000
+
+# the number of seconds between two checks of the status by an event stream, the number of seconds after which a
+# stream is closed (the browser reconnects) and the number of seconds without event after which a comment is sent to
+# keep the connection open
+EVENTS_INTERVAL = 1
+EVENTS_STREAM_DURATION = 300
+EVENTS_KEEPALIVE = 15
+
+# the fields of the status that give the progress of the crawl, they are sent by the progress events
+PROGRESS_FIELDS = ('currentNbItemCrawled', 'nbItemToCrawl', 'crawlStats', 'counts')
+
 # =========
 # Decorator
 # =========
@@ -147,11 +168,82 @@ def build_json(status_code=200):
         @functools.wraps(f)
         def build_json_wrapped(*args, **kwargs):
             data = f(*args, **kwargs)
+            # the endpoints that send an already built JSON return a Flask Response
+            if isinstance(data, Response):
+                return data
             data['status_code'] = status_code
             return jsonify(data)
         return build_json_wrapped
     return build_json_wrapper
 
+
+def build_report_response(b_report: bytes, s_report_etag: str) -> Response:
+    """
+    Build a Flask Response from the report of a statification. The report is sent as it is stored if the client
+    accepts gzip, otherwise it is decompressed.
+    The response has a strong ETag, if the client already has the report (If-None-Match) the response is a
+    304 Not Modified without content.
+    :param b_report: the JSON of the detail of the statification compressed with gzip
+    :param s_report_etag: the ETag of the report
+    :return: the Flask Response
+    """
+    if 'gzip' in request.accept_encodings:
+        response = Response(b_report, mimetype='application/json')
+        response.headers['Content-Encoding'] = 'gzip'
+        # the compressed and the decompressed reports are different representations, they need different ETags
+        response.set_etag(s_report_etag + '-gzip')
+    else:
+        response = Response(gzip.decompress(b_report), mimetype='application/json')
+        response.set_etag(s_report_etag)
+    response.vary.add('Accept-Encoding')
+    # the report changes when the status of the statification changes, the client must always revalidate it
+    response.cache_control.no_cache = True
+    return response.make_conditional(request)
+
+
+@bp.before_request
+def start_request_timer():
+    """
+    Store the start of the request, its duration is measured in cornetto_http_request_duration_seconds
+    """
+    g.f_request_start = time.monotonic()
+
+
+@bp.after_request
+def observe_request_duration(response: Response) -> Response:
+    """
+    Measure the duration of the request by route, method and status code. The duration of a streamed response
+    is the duration until the stream starts
+    :param response: the Flask Response
+    :return: the Flask Response unchanged
+    """
+    if 'f_request_start' in g:
+        metrics.observe('cornetto_http_request_duration_seconds', time.monotonic() - g.f_request_start,
+                        route=request.url_rule.rule if request.url_rule else '', method=request.method,
+                        status=response.status_code)
+    return response
+
+
+@bp.before_request
+def start_request_profile():
+    """
+    Profile the request if the profiling is enabled and its route is profiled
+    """
+    if current_app.profiler is not None and request.url_rule is not None and \
+            current_app.profiler.is_profiled(request.url_rule.rule):
+        g.profile = current_app.profiler.start()
+
+
+@bp.teardown_request
+def stop_request_profile(exception=None):
+    """
+    Add the profile of the request to the profile of its route, even if the request has failed
+    :param exception: the exception raised by the request, if any
+    """
+    if g.get('profile') is not None:
+        current_app.profiler.stop(g.profile, request.url_rule.rule)
+        g.profile = None
+
 # =========
 # Route
 # =========
@@ -178,6 +270,11 @@ def statification_status() -> Dict[str, Any]:
     - i_nb_item_to_crawl :  the number of item that have been crawled during the last statification, it will be used
                             as a reference of the number of items to crawl to the next statification. If there is no
                             statification in the database it will be set to 100 by default.
+    - crawlStats        :   the stats of the running crawl written by the crawler every second (pages, bytes, items,
+                            errors, http_errors, queue, in_progress, rate), null if no statification process is running
+    - counts            :   the number of objects of each collection of the current statification, registered while
+                            the crawl runs, null if no statification process is running
+    - isResumable       :   a boolean that indicate if the last statification has been interrupted and can be resumed
     :return a python dict containing all the above information :
             **Example**:
 
@@ -191,20 +288,48 @@ def statification_status() -> Dict[str, Any]:
                         'description': '',
                         'currentNbItemCrawled': 0,
                         'nbItemToCrawl': 100,
+                        'crawlStats': null,
+                        'counts': null,
                         'status': 3,
                         'isLocked': false,
+                        'isResumable': false,
                         'statusBackground': {}
                     }
+    The status is served from a snapshot shared by the requests, it is built again when the lock of the routes, the
+    status of the background operations, the pid file or the progress of the crawler change, and every
+    STATUS_CACHE_TTL seconds
+    """
+    return get_statification_status()
+
+
+def get_statification_status() -> Dict[str, Any]:
+    """
+    Get the status of the api returned by statification_status from the snapshot shared by the requests
+    :return a python dict containing the status
+    """
+    a_files = [current_app.config['LOCKFILE'], current_app.config['STATUS_BACKGROUND'],
+               current_app.config['PIDFILE']] + current_app.statifProcess.get_crawler_progress_counter_files()
+    return current_app.statusCache.get(a_files, build_statification_status)
+
+
+def build_statification_status() -> Dict[str, Any]:
+    """
+    Build the status of the api returned by statification_status
+    :return a python dict containing the status
     """
     # check if process is running
     b_is_running = current_app.statifProcess.is_running()
 
     # initialize the nb of item crawled and the number of item to crawl to 0
     i_current_nb_item_crawled = 0
+    crawl_stats = None
+    counts = None
 
-    # get the number of page crawled if a statificationProcess is running
+    # get the stats of the crawl and the number of page crawled if a statificationProcess is running
     if b_is_running:
-        i_current_nb_item_crawled = get_nb_page_crawled()
+        crawl_stats = get_crawl_stats()
+        i_current_nb_item_crawled = crawl_stats['pages']
+        counts = get_current_statif_counts()
 
     # get the last statification informations
     last_statif_infos = service_get_last_statif_infos()
@@ -230,12 +355,166 @@ def statification_status() -> Dict[str, Any]:
         'description': description,
         'currentNbItemCrawled': i_current_nb_item_crawled,
         'nbItemToCrawl': i_nb_item_to_crawl,
+        'crawlStats': crawl_stats,
+        'counts': counts,
         'status': status,
         'isLocked': is_access_locked(),
+        'isResumable': current_app.statifProcess.is_resumable(current_app.session),
         'statusBackground': json_status_background
     }
 
 
+def format_event(s_event: str, data: Dict[str, Any]) -> str:
+    """
+    Format a Server-Sent Event
+    :param s_event: the type of the event
+    :param data: the data of the event, sent as JSON
+    :return: the event as written in the stream
+    """
+    return 'event: ' + s_event + '\ndata: ' + dumps(data) + '\n\n'
+
+
+def generate_status_events(f_duration: float):
+    """
+    Generate the Server-Sent Events of the status of the api, the status is checked every EVENTS_INTERVAL seconds and
+    an event is generated for each change :
+    - status            :   the status returned by statification_status without the progress of the crawl, sent
+                            first then when it changes. A route is locked while a commit, a visualization or a push to
+                            production runs, and the status of the background operation is set when it ends
+    - progress          :   the progress of the running crawl : currentNbItemCrawled, nbItemToCrawl, crawlStats and
+                            counts, the number of objects of each collection of the current statification, sent when
+                            it changes
+    - crawl_done        :   the crawl has ended, with the status
+    - operation_done    :   a background operation has ended, with the status of the background operation
+    The status and the counts are read from the snapshot shared by the requests (see statification_status), so the
+    open streams don't query the database each time they check the status
+    :param f_duration: the number of seconds after which the stream ends
+    """
+    # the client reconnects 2 seconds after the end of the stream
+    yield 'retry: 2000\n\n'
+
+    f_end = time.monotonic() + f_duration
+    f_last_event = time.monotonic()
+    last_status = None
+    last_progress = None
+    while True:
+        status = get_statification_status()
+        progress = {s_field: status.pop(s_field) for s_field in PROGRESS_FIELDS}
+        # release the connection to the database between two checks
+        current_app.session.remove()
+
+        a_events = []
+        if status != last_status:
+            a_events.append(format_event('status', status))
+            if last_status is not None:
+                if last_status['isRunning'] and not status['isRunning']:
+                    a_events.append(format_event('crawl_done', status))
+                if status['statusBackground'] and status['statusBackground'] != last_status['statusBackground']:
+                    a_events.append(format_event('operation_done', status['statusBackground']))
+        if status['isRunning'] and progress != last_progress:
+            a_events.append(format_event('progress', progress))
+        last_status = status
+        last_progress = progress
+
+        if a_events:
+            f_last_event = time.monotonic()
+            yield ''.join(a_events)
+        elif time.monotonic() - f_last_event >= EVENTS_KEEPALIVE:
+            f_last_event = time.monotonic()
+            yield ': keepalive\n\n'
+
+        if time.monotonic() + EVENTS_INTERVAL > f_end:
+            return
+        time.sleep(EVENTS_INTERVAL)
+
+
+@bp.route('/api/statification/events', methods=["GET"])
+def statification_events() -> Response:
+    """
+    Stream the changes of the status of the api as Server-Sent Events (text/event-stream), so the frontend doesn't
+    need to poll statification_status, see generate_status_events for the events.
+    The stream ends after EVENTS_STREAM_DURATION seconds, the EventSource of the browser reconnects automatically. The
+    parameter duration sets a shorter duration in seconds.
+    A stream holds a worker (or a thread) of the WSGI server while it is open, the workers must be sized for the
+    number of open streams in addition to the other requests, or EVENTS_STREAM_DURATION lowered
+    :return the Response streaming the events
+    """
+    f_max_duration = current_app.config.get('EVENTS_STREAM_DURATION', EVENTS_STREAM_DURATION)
+    f_duration = f_max_duration
+    if 'duration' in request.values:
+        try:
+            f_duration = min(float(request.values.get('duration')), f_max_duration)
+        except ValueError:
+            f_duration = f_max_duration
+
+    response = Response(stream_with_context(generate_status_events(f_duration)), mimetype='text/event-stream')
+    response.cache_control.no_cache = True
+    # disable the buffering of the reverse proxies
+    response.headers['X-Accel-Buffering'] = 'no'
+    return response
+
+
+@bp.route('/metrics', methods=["GET"])
+def get_metrics() -> Response:
+    """
+    Expose the metrics in the Prometheus text format :
+    - the crawl, read from the snapshots of the stats written every second by the crawler : the number of responses,
+      the responses per second, the bytes downloaded, the responses by MIME type, the histogram of the download
+      latency, the size of the queue of the scheduler and the errors
+    - the duration of the phases of the finalization of a statification after the crawl
+    - the duration of the git commands and of the background operations (commit, pushtoprod, visualize)
+    - the duration of the requests of the API by route
+    The metrics of the API are measured by each process of the API
+    :return the Response with the metrics
+    """
+    return Response(metrics.render() + service_get_crawl_metrics(), mimetype='text/plain; version=0.0.4')
+
+
+def get_profile_parameters():
+    """
+    :return: the order and the maximum number of the hotspots given by the request, cumulative and 20 by default
+    """
+    i_limit = 20
+    if 'limit' in request.values:
+        try:
+            i_limit = min(max(int(request.values.get('limit')), 1), COLLECTION_PAGE_MAX_SIZE)
+        except ValueError:
+            i_limit = 20
+    return request.values.get('sort', 'cumulative'), i_limit
+
+
+@bp.route('/api/profiling/routes', methods=["POST", "GET"])
+@build_json()
+def get_routes_profile() -> Dict[str, Any]:
+    """
+    Get the hotspots of the requests of the api profiled by the process that answers, when PROFILING is enabled.
+    The parameters of the request are :
+    - route             :   the rule of a route (for example /api/statification/status), all the profiled routes by
+                            default
+    - sort              :   cumulative (default), time or calls
+    - limit             :   the maximum number of hotspots by route, 20 by default
+    :return a python dict containing the number of profiled requests, the total time and the hotspots of each route
+    """
+    s_sort, i_limit = get_profile_parameters()
+    return service_get_routes_profile(request.values.get('route', ''), s_sort, i_limit)
+
+
+@bp.route('/api/profiling/crawl', methods=["POST", "GET"])
+@build_json()
+@commit_required
+def get_crawl_profile() -> Dict[str, Any]:
+    """
+    Get the hotspots of the crawl of a statification crawled when PROFILING was enabled, the profile is available
+    when the crawl is over. The parameters of the request are :
+    - commit            :   the commit sha of the statification, empty for the current statification
+    - sort              :   cumulative (default), time or calls
+    - limit             :   the maximum number of hotspots, 20 by default
+    :return a python dict containing the total time and the hotspots of the crawl
+    """
+    s_sort, i_limit = get_profile_parameters()
+    return service_get_crawl_profile(request.values.get('commit'), s_sort, i_limit)
+
+
 @bp.route('/api/statification/count', methods=["POST", "GET"])
 @build_json()
 def get_statif_count() -> Dict[str, int]:
@@ -298,16 +577,82 @@ def get_current_statif_info() -> Dict[str, Any]:
 @commit_required
 def get_selected_statif_info() -> Dict[str, Any]:
     """
-    Get the chosen statification information, with all the data included in associated objects
-    :return a python dict containing all the information of the statification
+    Get the chosen statification information, with all the data included in associated objects.
+    A committed statification is sent from its report, with an ETag
+    :return a python dict containing all the information of the statification, or the Response of the report
     """
     # get the request parameter
     s_commit = request.values.get('commit')
 
+    # a committed statification is sent from its report
+    if s_commit != '':
+        report = service_get_statif_report(s_commit)
+        if report is not None:
+            return build_report_response(*report)
+
     # get the statification corresponding to the commit
     return service_get_statif_info(s_commit)
 
 
+@bp.route('/api/statification/summary', methods=["POST", "GET"])
+@build_json()
+@commit_required
+def get_statif_summary() -> Dict[str, Any]:
+    """
+    Get the summary of the collections of objects associated to the chosen statification : the number of objects and
+    the biggest groups (errors_type_mime by type_mime, external_links by host and by source, html_errors by error_code
+    and by source, scrapy_errors by error_code). The parameters of the request are :
+    - commit            :   the commit sha of the statification, empty for the current statification
+    - limit             :   the maximum number of groups by column, 50 by default
+    - collection        :   a collection to drill down into, with the value of one of its group columns as parameter
+                            (for example collection=html_errors&error_code=404 counts the 404 errors by source)
+    :return a python dict containing the summary of each collection
+    """
+    # try to get the limit given by the request, it is bounded so the summary is never too big
+    i_limit = 50
+    if 'limit' in request.values:
+        try:
+            i_limit = min(max(int(request.values.get('limit')), 1), COLLECTION_PAGE_MAX_SIZE)
+        except ValueError:
+            i_limit = 50
+
+    return service_get_statif_summary(request.values.get('commit'), request.values.get('collection', ''),
+                                      request.values.to_dict(), i_limit)
+
+
+@bp.route('/api/statification/<any(errors_type_mime, external_links, html_errors, scrapy_errors):s_collection>',
+          methods=["POST", "GET"])
+@build_json()
+@commit_required
+def get_statif_collection(s_collection: str) -> Dict[str, Any]:
+    """
+    Get a page of a collection of objects associated to the chosen statification, the collections are
+    errors_type_mime, external_links, html_errors and scrapy_errors. The parameters of the request are :
+    - commit            :   the commit sha of the statification, empty for the current statification
+    - limit             :   the maximum number of objects of the page, 100 by default
+    - after             :   the cursor returned with the previous page, to get the next one
+    - order             :   the column to sort the objects by : id (default), error_code for html_errors and
+                            scrapy_errors, type_mime for errors_type_mime and host for external_links
+    - sort              :   asc (default) or desc
+    - error_code        :   only the html_errors or the scrapy_errors with this code
+    - type_mime         :   only the errors_type_mime with this MIME type
+    - host              :   only the external_links to this host, in lowercase
+    - url, source       :   only the objects whose url or source contains the value
+    :return a python dict containing the objects of the page and the cursor of the next page
+    """
+    # try to get the limit given by the request, it is bounded so a page is never too big
+    i_limit = 100
+    if 'limit' in request.values:
+        try:
+            i_limit = min(max(int(request.values.get('limit')), 1), COLLECTION_PAGE_MAX_SIZE)
+        except ValueError:
+            i_limit = 100
+
+    return service_get_statif_collection(s_collection, request.values.get('commit'), request.values.to_dict(),
+                                         request.values.get('order', ''), request.values.get('sort', ''),
+                                         request.values.get('after', ''), i_limit)
+
+
 @bp.route('/api/statification/start', methods=["POST", "GET"])
 @build_json()
 @user_required
@@ -386,6 +731,79 @@ def do_stop_statif() -> Dict[str, bool]:
     }
 
 
+@bp.route('/api/statification/pause', methods=["POST", "GET"])
+@build_json()
+def do_pause_statif() -> Dict[str, Any]:
+    """
+    Pause the statification process, the statification is kept and can be resumed with /api/statification/resume
+
+      -- If no statification process is running the following dict will be returned :
+        {
+            'success': False,
+            'error': 'process_not_running'
+        }
+
+      -- If everything goes smoothly the following dict will be returned :
+        {
+            'success': True,
+        }
+    """
+    current_app.logger.info('> Pausing statification process')
+
+    try:
+        return service_do_pause_statif()
+    except RuntimeError as e:
+        # return an ajax error code
+        return {
+            'success': False,
+            'error': str(e)
+        }
+
+
+@bp.route('/api/statification/resume', methods=["POST", "GET"])
+@build_json()
+@user_required
+def do_resume_statif() -> Dict[str, Any]:
+    """
+    Resume a statification that has been paused or whose crawler has failed
+
+      -- If there is no statification to resume the following dict will be returned :
+        {
+            'success': False,
+            'error': 'no_statification_to_resume'
+        }
+
+      -- If everything goes smoothly the following dict will be returned :
+        {
+            'success': True,
+        }
+    """
+    s_user = request.headers.get('X-Forwarded-User')
+
+    try:
+        # test if the lock file is unlocked
+        if is_access_locked():
+            # the lock file was locked
+            raise RuntimeError('route_access')
+
+        # block the lock file for other users
+        lock_access()
+
+        current_app.logger.info('> Resuming statification process')
+
+        return service_do_resume_statif(s_user)
+
+    except RuntimeError as e:
+        # return an ajax error code
+        return {
+            'success': False,
+            'error': str(e)
+        }
+    finally:
+        # unlock the route before return
+        unlock_access(current_app.config['LOCKFILE'])
+
+
 @bp.route('/api/statification/visualize', methods=["POST", "GET"])
 @build_json()
 @commit_required
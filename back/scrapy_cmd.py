@@ -18,4 +18,6 @@ You should have received a copy of the GNU General Public License
 """
 from scrapy.cmdline import execute
 
-execute()
+# the processes of the parser pool import this module, they must not start a crawl
+if __name__ == '__main__':
+    execute()
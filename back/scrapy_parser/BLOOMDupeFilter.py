@@ -16,29 +16,136 @@ GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 """
 
-from pybloom_live import BloomFilter
+import logging
+import math
+import os
+import struct
+
+from pybloom_live import ScalableBloomFilter
 from scrapy.dupefilters import BaseDupeFilter
 from scrapy.utils.job import job_dir
 
+from scrapy_parser.CrawlJournal import SeenJournal
+from scrapy_parser.SimpleDupeFilter import get_canonical_url
+
+statif_logger = logging.getLogger('statification')
+
+# the snapshot of the filter in the job directory
+BLOOM_FILE = 'requests.bloom'
+# the header of the snapshot: the size of the journal of the seen urls when the snapshot was written
+BLOOM_FILE_HEADER = struct.Struct('<Q')
+
+# the number of new urls between two updates of the statistics of the filter
+STATS_INTERVAL = 10000
+
 
 class BLOOMDupeFilter(BaseDupeFilter):
     """
     BLOOM Duplicate Filter
     This filter is interesting to use if you crawl a lot of url, it will take less memory to filter the urls.
+    The filter grows with the crawl: a new bloom filter with a tighter error rate is added when the current one is
+    full, so the filter never saturates and its false positive rate grows slowly with the number of urls. The
+    estimated false positive rate is written into the stats of the crawl.
+    The urls are canonicalized like in SimpleDupeFilter, so http://mysite.mydomain/ and
+    http://mysite.mydomain/index.html are the same url.
+    If a job directory is set, the seen urls are written into it and a snapshot of the filter is saved when the crawl
+    stops, the crawl that resumes it reloads the snapshot and the urls seen after it was written
     """
-    def __init__(self, path=None):
+    def __init__(self, path=None, i_initial_capacity=100000, f_error_rate=0.00001, stats=None):
+        """
+        :param path: the path to the job directory or None
+        :param i_initial_capacity: the number of urls of the first bloom filter
+        :param f_error_rate: the maximum false positive rate of the filter
+        :param stats: the stats collector of the crawler or None
+        """
         self.file = None
-        self.fingerprints = BloomFilter(2000000, 0.00001)
+        self.stats = stats
+        self.journal = SeenJournal(path) if path else None
+        self.s_bloom_file = os.path.join(path, BLOOM_FILE) if path else None
+        self.fingerprints = None
+
+        i_offset = 0
+        if self.journal is not None:
+            self.fingerprints, i_offset = self.load_snapshot()
+        if self.fingerprints is None:
+            self.fingerprints = ScalableBloomFilter(initial_capacity=i_initial_capacity, error_rate=f_error_rate,
+                                                    mode=ScalableBloomFilter.LARGE_SET_GROWTH)
+
+        if self.journal is not None:
+            for url in self.journal.load_after(i_offset):
+                self.fingerprints.add(get_canonical_url(url))
 
     @classmethod
-    def from_settings(cls, settings):
-        return cls(job_dir(settings))
+    def from_settings(cls, settings, stats=None):
+        return cls(settings.get('CRAWLER_JOB_DIR') or job_dir(settings),
+                   settings.getint('DUPEFILTER_BLOOM_CAPACITY', 100000),
+                   settings.getfloat('DUPEFILTER_BLOOM_ERROR_RATE', 0.00001),
+                   stats)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls.from_settings(crawler.settings, crawler.stats)
+
+    def load_snapshot(self):
+        """
+        Load the snapshot of the filter saved in the job directory
+        :return: a tuple of the filter and the size of the journal when the snapshot was written,
+                 (None, 0) if there is no snapshot
+        """
+        try:
+            with open(self.s_bloom_file, 'rb') as f_bloom_file:
+                i_offset, = BLOOM_FILE_HEADER.unpack(f_bloom_file.read(BLOOM_FILE_HEADER.size))
+                return ScalableBloomFilter.fromfile(f_bloom_file), i_offset
+        except FileNotFoundError:
+            return None, 0
+
+    def save_snapshot(self):
+        """
+        Save a snapshot of the filter into the job directory, the file is replaced atomically so a crawl that is killed
+        meanwhile keeps the previous snapshot
+        """
+        s_temp_file = self.s_bloom_file + '.tmp'
+        with open(s_temp_file, 'wb') as f_bloom_file:
+            f_bloom_file.write(BLOOM_FILE_HEADER.pack(self.journal.get_size()))
+            self.fingerprints.tofile(f_bloom_file)
+        os.replace(s_temp_file, self.s_bloom_file)
+
+    def get_false_positive_rate(self):
+        """
+        Estimate the false positive rate of the filter from the number of urls in each of its bloom filters
+        :return: the probability that an url never seen is considered as seen
+        """
+        f_true_negative = 1.0
+        for bloom_filter in self.fingerprints.filters:
+            f_slice_fill = 1 - math.exp(-bloom_filter.count / bloom_filter.bits_per_slice)
+            f_true_negative *= 1 - f_slice_fill ** bloom_filter.num_slices
+        return 1 - f_true_negative
+
+    def update_stats(self):
+        """
+        Write the size and the estimated false positive rate of the filter into the stats of the crawl
+        """
+        if self.stats is not None:
+            self.stats.set_value('dupefilter/bloom_urls', self.fingerprints.count)
+            self.stats.set_value('dupefilter/bloom_filters', len(self.fingerprints.filters))
+            self.stats.set_value('dupefilter/bloom_false_positive_rate', self.get_false_positive_rate())
 
     def request_seen(self, request):
-        fp = request.url
-        if fp in self.fingerprints:
+        # add returns True if the url was already in the filter
+        if self.fingerprints.add(get_canonical_url(request.url)):
             return True
-        self.fingerprints.add(fp)
+
+        if self.journal is not None:
+            self.journal.add(request.url)
+
+        if self.fingerprints.count % STATS_INTERVAL == 0:
+            self.update_stats()
 
     def close(self, reason):
+        self.update_stats()
+        if self.journal is not None:
+            self.journal.close()
+            self.save_snapshot()
+            statif_logger.info('Bloom filter saved: {0} urls, estimated false positive rate {1:.2e}'.format(
+                self.fingerprints.count, self.get_false_positive_rate()))
         self.fingerprints = None
@@ -0,0 +1,83 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+from array import array
+
+# the value of the empty slots of the table
+EMPTY = 0
+
+
+class CompactHashSet(object):
+    """
+    A set of 64-bit hashes stored in an open addressing table backed by an array, it takes 8 bytes per slot instead of
+    the ~100 bytes per element of a python set of strings. The table is doubled when it is 3/4 full.
+    """
+    def __init__(self, i_capacity=1024):
+        """
+        :param i_capacity: the initial number of slots of the table, must be a power of 2
+        """
+        self.table = array('Q', bytes(8 * i_capacity))
+        self.i_mask = i_capacity - 1
+        self.i_count = 0
+
+    def __len__(self):
+        return self.i_count
+
+    def __contains__(self, i_hash):
+        return self.table[self.find_slot(i_hash or 1)] != EMPTY
+
+    def find_slot(self, i_hash):
+        """
+        Search the slot of a hash with linear probing
+        :param i_hash: the hash, must not be EMPTY
+        :return: the index of the slot that contains the hash or of the empty slot where it must be inserted
+        """
+        table = self.table
+        i_mask = self.i_mask
+        i_slot = i_hash & i_mask
+        while table[i_slot] != EMPTY and table[i_slot] != i_hash:
+            i_slot = (i_slot + 1) & i_mask
+        return i_slot
+
+    def add(self, i_hash):
+        """
+        Add a hash to the set
+        :param i_hash: the hash, an integer between 0 and 2^64 - 1
+        :return: True if the hash was already in the set, False otherwise
+        """
+        # the hash 0 marks the empty slots, it is merged with the hash 1
+        i_hash = i_hash or 1
+        i_slot = self.find_slot(i_hash)
+        if self.table[i_slot] == i_hash:
+            return True
+
+        self.table[i_slot] = i_hash
+        self.i_count += 1
+        if self.i_count * 4 > len(self.table) * 3:
+            self.grow()
+        return False
+
+    def grow(self):
+        """
+        Double the size of the table
+        """
+        old_table = self.table
+        self.table = array('Q', bytes(16 * len(old_table)))
+        self.i_mask = len(self.table) - 1
+        for i_hash in old_table:
+            if i_hash != EMPTY:
+                self.table[self.find_slot(i_hash)] = i_hash
@@ -0,0 +1,71 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import json
+import logging
+
+# the types of the events written by the spider
+EVENT_EXTERNAL_LINK = 'external_link'
+EVENT_HTTP_ERROR = 'http_error'
+EVENT_FORBIDDEN_CONTENT = 'forbidden_content'
+EVENT_ERROR = 'error'
+EVENT_STATS = 'stats'
+
+
+class CrawlEvents(object):
+    """
+    The events of a crawl (external links, HTTP errors, forbidden contents, errors and stats) written as one JSON object
+    per line, so the application can register the results of the crawl without parsing the log.
+    The file is line buffered, an event is in the file as soon as it has been emitted.
+    """
+    def __init__(self, s_events_file):
+        """
+        Open the events file, the events are appended to the events of the crawls that have been resumed
+        :param s_events_file: the path to the events file
+        """
+        self.f_events_file = open(s_events_file, 'a', buffering=1)
+
+    def emit(self, s_type, **fields):
+        """
+        Write an event into the file
+        :param s_type: the type of the event, one of the EVENT_* constants
+        :param fields: the attributes of the event
+        """
+        fields['type'] = s_type
+        self.f_events_file.write(json.dumps(fields) + '\n')
+
+    def close(self):
+        """
+        Close the events file
+        """
+        self.f_events_file.close()
+
+
+class EventsLogHandler(logging.Handler):
+    """
+    A logging handler that writes the errors logged during the crawl as events
+    """
+    def __init__(self, events):
+        """
+        :param events: the CrawlEvents the errors are written into
+        """
+        logging.Handler.__init__(self, logging.ERROR)
+        self.events = events
+        self.setFormatter(logging.Formatter('%(message)s'))
+
+    def emit(self, record):
+        self.events.emit(EVENT_ERROR, message=self.format(record))
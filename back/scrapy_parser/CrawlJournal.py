@@ -0,0 +1,176 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import logging
+import os
+
+statif_logger = logging.getLogger('statification')
+
+# the files of the job directory
+SEEN_FILE = 'requests.seen'
+DONE_FILE = 'requests.done'
+EXTERNAL_LINKS_FILE = 'external_links'
+
+
+def read_urls(s_file):
+    """
+    Read a journal file of the job directory
+    :param s_file: the path to the file
+    :return: the set of the urls of the file, empty if the file doesn't exist
+    """
+    try:
+        with open(s_file) as f_file:
+            # the last line can be truncated if the crawler has been killed
+            return set(line[:-1] for line in f_file if line.endswith('\n'))
+    except FileNotFoundError:
+        return set()
+
+
+class SeenJournal(object):
+    """
+    The journal of the urls seen by a dupe filter, it is written into the job directory so the urls seen by a crawl
+    that has been stopped can be reloaded by the crawl that resumes it.
+    The file is line buffered, a seen url is always written before the url of its document is marked as done.
+    """
+    def __init__(self, s_job_dir):
+        """
+        Open the journal of the seen urls
+        :param s_job_dir: the path to the job directory
+        """
+        os.makedirs(s_job_dir, exist_ok=True)
+        self.s_seen_file = os.path.join(s_job_dir, SEEN_FILE)
+        self.f_seen_file = None
+
+    def load(self):
+        """
+        :return: the set of the urls seen by the previous crawls of the job
+        """
+        return read_urls(self.s_seen_file)
+
+    def load_after(self, i_offset):
+        """
+        :param i_offset: a position in the journal returned by get_size
+        :return: the list of the urls written into the journal after the position
+        """
+        try:
+            with open(self.s_seen_file, 'rb') as f_seen_file:
+                f_seen_file.seek(i_offset)
+                # the last line can be truncated if the crawler has been killed
+                return [line[:-1].decode('utf-8') for line in f_seen_file if line.endswith(b'\n')]
+        except FileNotFoundError:
+            return []
+
+    def get_size(self):
+        """
+        :return: the size of the journal in bytes, 0 if it doesn't exist
+        """
+        try:
+            return os.path.getsize(self.s_seen_file)
+        except FileNotFoundError:
+            return 0
+
+    def add(self, s_url):
+        """
+        Write a seen url into the journal
+        :param s_url: the url
+        """
+        if self.f_seen_file is None:
+            self.f_seen_file = open(self.s_seen_file, 'a', buffering=1)
+        self.f_seen_file.write(s_url + '\n')
+
+    def close(self):
+        """
+        Close the journal
+        """
+        if self.f_seen_file is not None:
+            self.f_seen_file.close()
+            self.f_seen_file = None
+
+
+class CrawlJournal(object):
+    """
+    The journal of a crawl, it stores in the job directory the urls whose response has been processed and the
+    external links that have been detected. The urls seen by the dupe filter but not processed are the pending
+    requests of the crawl, they are scheduled again when a stopped crawl is resumed.
+    The journal is written periodically by the spider with the flush method, once the files of the urls marked as
+    done have been written.
+    """
+    def __init__(self, s_job_dir):
+        """
+        Load the journal of the previous crawls of the job
+        :param s_job_dir: the path to the job directory
+        """
+        os.makedirs(s_job_dir, exist_ok=True)
+        self.s_job_dir = s_job_dir
+        self.done = read_urls(os.path.join(s_job_dir, DONE_FILE))
+        self.external_links = read_urls(os.path.join(s_job_dir, EXTERNAL_LINKS_FILE))
+        self.a_unflushed_done = []
+        self.f_done_file = open(os.path.join(s_job_dir, DONE_FILE), 'a')
+        self.f_external_links_file = open(os.path.join(s_job_dir, EXTERNAL_LINKS_FILE), 'a')
+
+    def get_pending_urls(self):
+        """
+        :return: the list of the urls seen by the previous crawls of the job whose response hasn't been processed
+        """
+        return [s_url for s_url in read_urls(os.path.join(self.s_job_dir, SEEN_FILE)) if s_url not in self.done]
+
+    def mark_done(self, a_urls):
+        """
+        Register the urls whose response has been processed
+        :param a_urls: the list of the urls
+        """
+        for s_url in a_urls:
+            if s_url not in self.done:
+                self.done.add(s_url)
+                self.a_unflushed_done.append(s_url)
+
+    def take_unflushed_done(self):
+        """
+        :return: the list of the urls marked as done since the last call, they must be written with flush
+        """
+        a_urls = self.a_unflushed_done
+        self.a_unflushed_done = []
+        return a_urls
+
+    def add_external_link(self, s_url):
+        """
+        Register an external link
+        :param s_url: the external link
+        """
+        self.external_links.add(s_url)
+        self.f_external_links_file.write(s_url + '\n')
+
+    def flush(self, a_done=None):
+        """
+        Write the journal into the job directory
+        :param a_done: the urls marked as done to write, by default all the urls that haven't been written yet
+        """
+        if a_done is None:
+            a_done = self.take_unflushed_done()
+        for s_url in a_done:
+            self.f_done_file.write(s_url + '\n')
+
+        self.f_external_links_file.flush()
+        self.f_done_file.flush()
+
+    def close(self):
+        """
+        Write the journal and close its files
+        """
+        self.flush()
+        self.f_external_links_file.close()
+        self.f_done_file.close()
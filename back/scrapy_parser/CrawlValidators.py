@@ -0,0 +1,120 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import json
+import logging
+
+statif_logger = logging.getLogger('statification')
+
+
+class CrawlValidators(object):
+    """
+    Store the validators (ETag, Last-Modified, content hash) of every url crawled during a statification.
+    The validators of the previous statification are read from the validators file, the validators of the current
+    crawl are appended to the validators file suffixed by '.new'. The '.new' file replaces the validators file
+    only when the statification is committed, so the validators always match the content of the git repository.
+    The '.new' file is removed when a statification starts, if it exists the crawl is resumed and its validators
+    are reloaded.
+    """
+    def __init__(self, s_validators_file, s_new_validators_file=None):
+        """
+        Load the validators of the previous statification
+        :param s_validators_file: the path to the file that store the validators of the previous statification
+        :param s_new_validators_file: the path to the file where the validators of the current crawl will be written,
+                                      by default the validators file suffixed by '.new'
+        """
+        self.s_validators_file = s_validators_file
+        self.s_new_validators_file = s_new_validators_file or s_validators_file + '.new'
+        self.previous = self.load(s_validators_file)
+        self.current = self.load(self.s_new_validators_file)
+        self.a_unsaved = []
+
+        if not self.previous:
+            statif_logger.info('No validators from a previous statification, every url will be downloaded')
+
+    @staticmethod
+    def load(s_file):
+        """
+        Read a validators file
+        :param s_file: the path to the file
+        :return: a dict of the validators by url, empty if the file doesn't exist
+        """
+        validators = {}
+        try:
+            with open(s_file) as f_validators_file:
+                for line in f_validators_file:
+                    # the last line can be truncated if the crawler has been killed
+                    if line.endswith('\n') and line.strip():
+                        validator = json.loads(line)
+                        validators[validator['url']] = validator
+        except FileNotFoundError:
+            pass
+        return validators
+
+    def get_previous(self, s_url):
+        """
+        Get the validators recorded for an url during the previous statification
+        :param s_url: the url of the file
+        :return: a dict containing the validators or None if the url wasn't crawled by the previous statification
+        """
+        return self.previous.get(s_url)
+
+    def add(self, s_url, s_etag, s_last_modified, s_hash, s_mime, s_filename):
+        """
+        Register the validators of an url crawled during the current statification
+        :param s_url: the url of the file
+        :param s_etag: the value of the ETag header or None
+        :param s_last_modified: the value of the Last-Modified header or None
+        :param s_hash: the sha1 of the content of the response
+        :param s_mime: the MIME type of the file
+        :param s_filename: the path to the local file, relative to the output directory
+        """
+        self.current[s_url] = {
+            'url': s_url,
+            'etag': s_etag,
+            'last_modified': s_last_modified,
+            'hash': s_hash,
+            'mime': s_mime,
+            'filename': s_filename
+        }
+        self.a_unsaved.append(self.current[s_url])
+
+    def keep_previous(self, s_url, s_etag=None, s_last_modified=None):
+        """
+        Register the validators of the previous statification for an url that has not been modified
+        :param s_url: the url of the file
+        :param s_etag: the new value of the ETag header if the server sent one
+        :param s_last_modified: the new value of the Last-Modified header if the server sent one
+        """
+        validator = dict(self.previous[s_url])
+        if s_etag:
+            validator['etag'] = s_etag
+        if s_last_modified:
+            validator['last_modified'] = s_last_modified
+        self.current[s_url] = validator
+        self.a_unsaved.append(validator)
+
+    def save(self):
+        """
+        Append the validators registered since the last call into the '.new' validators file,
+        when an url appears several times the last line is the right one
+        """
+        if self.a_unsaved:
+            with open(self.s_new_validators_file, 'a') as f_validators_file:
+                for validator in self.a_unsaved:
+                    f_validators_file.write(json.dumps(validator) + '\n')
+            self.a_unsaved = []
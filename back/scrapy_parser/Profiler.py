@@ -0,0 +1,85 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import cProfile
+import os
+import pstats
+import sys
+import threading
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+
+
+class Profiler(object):
+    """
+    Scrapy extension that profiles the crawler process with cProfile and writes the profile into a file when the
+    spider is closed, the file can be read with pstats. The reactor thread (download, parsing, url rewriting) and the
+    threads started after the extension (the writers of the pipeline) are profiled, the processes that parse the
+    documents (parse_processes) are not. Since Python 3.12 only the reactor thread is profiled.
+    If the file already exists, the crawl has been resumed and the profile of the previous crawl is added.
+    """
+    def __init__(self, s_profile_file):
+        """
+        Start to profile the current thread and the threads started from now on
+        :param s_profile_file: the path to the file of the profile
+        """
+        self.s_profile_file = s_profile_file
+        self.lock = threading.Lock()
+        self.profiles = []
+        self.b_enabled = True
+
+        threading.setprofile(self.start_thread_profile)
+        self.main_profile = cProfile.Profile()
+        self.main_profile.enable()
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s_profile_file = crawler.settings.get('PROFILER_FILE')
+        if not s_profile_file:
+            raise NotConfigured
+        profiler = cls(s_profile_file)
+        crawler.signals.connect(profiler.spider_closed, signal=signals.spider_closed)
+        return profiler
+
+    def start_thread_profile(self, frame, event, arg):
+        """
+        Called once at the start of each new thread, replace itself by a profile of the thread
+        """
+        profile = cProfile.Profile()
+        with self.lock:
+            try:
+                if not self.b_enabled:
+                    raise ValueError('the profiling is over')
+                profile.enable()
+                self.profiles.append(profile)
+            except ValueError:
+                # since Python 3.12 only one profiler can be active in the process, only the reactor is profiled
+                sys.setprofile(None)
+
+    def spider_closed(self, spider, reason):
+        threading.setprofile(None)
+        self.main_profile.disable()
+        with self.lock:
+            self.b_enabled = False
+            # the threads of the pipeline are stopped when the spider is closed
+            a_profiles = [self.main_profile] + self.profiles
+
+        stats = pstats.Stats(*a_profiles)
+        if os.path.isfile(self.s_profile_file):
+            stats.add(self.s_profile_file)
+        stats.dump_stats(self.s_profile_file)
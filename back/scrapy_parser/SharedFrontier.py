@@ -0,0 +1,131 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import hashlib
+import logging
+import sqlite3
+from contextlib import contextmanager
+
+from scrapy_parser.SimpleDupeFilter import get_canonical_url
+
+statif_logger = logging.getLogger('statification')
+
+
+class SharedFrontier(object):
+    """
+    The frontier shared by the crawler processes of a sharded statification. Each process owns a partition of the
+    urls (computed with a hash of the url), the urls found by a process that belong to another one are written into a
+    SQLite database where the owner will fetch them.
+    The database also stores the state of each shard, the crawl is over when every shard is idle and no url is
+    waiting in the frontier.
+    """
+    def __init__(self, s_frontier_file, i_shards, i_shard):
+        """
+        Open the shared frontier and register the shard
+        :param s_frontier_file: the path to the SQLite database of the frontier
+        :param i_shards: the number of crawler processes
+        :param i_shard: the number of the shard of this process, between 0 and i_shards - 1
+        """
+        self.i_shards = i_shards
+        self.i_shard = i_shard
+
+        # the processes write concurrently into the database, wait for the lock instead of failing
+        self.connection = sqlite3.connect(s_frontier_file, timeout=60, isolation_level=None)
+        self.connection.execute('PRAGMA journal_mode=WAL')
+        self.connection.execute('PRAGMA synchronous=NORMAL')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS frontier '
+                                '(key TEXT PRIMARY KEY, url TEXT NOT NULL, referer TEXT, shard INTEGER NOT NULL, '
+                                'claimed INTEGER NOT NULL DEFAULT 0)')
+        self.connection.execute('CREATE INDEX IF NOT EXISTS frontier_shard_claimed ON frontier (shard, claimed)')
+        self.connection.execute('CREATE TABLE IF NOT EXISTS shards (shard INTEGER PRIMARY KEY, idle INTEGER NOT NULL)')
+        self.connection.execute('INSERT OR REPLACE INTO shards (shard, idle) VALUES (?, 0)', (i_shard,))
+
+    def get_shard(self, s_url):
+        """
+        Get the shard that owns an url
+        :param s_url: the url
+        :return: the number of the shard
+        """
+        # the urls considered as the same one by the dupe filter are crawled by the same shard
+        return int(hashlib.sha1(get_canonical_url(s_url).encode('utf-8')).hexdigest()[:8], 16) % self.i_shards
+
+    def is_owned(self, s_url):
+        """
+        :param s_url: the url
+        :return: True if the url belongs to the shard of this process
+        """
+        return self.get_shard(s_url) == self.i_shard
+
+    def push(self, a_urls, s_referer=None):
+        """
+        Hand off urls to the shards that own them, nothing is done for the urls already in the frontier
+        :param a_urls: the list of the urls
+        :param s_referer: the url of the document where the urls have been found
+        """
+        with self.transaction():
+            self.connection.executemany(
+                'INSERT OR IGNORE INTO frontier (key, url, referer, shard) VALUES (?, ?, ?, ?)',
+                [(get_canonical_url(s_url), s_url, s_referer, self.get_shard(s_url)) for s_url in a_urls])
+
+    def pop(self, i_limit=1000):
+        """
+        Get the urls handed off to this shard by the other ones, the shard is marked as busy if there are some
+        :param i_limit: the maximum number of urls to get
+        :return: the list of the urls as tuples (url, referer)
+        """
+        with self.transaction():
+            a_urls = self.connection.execute(
+                'SELECT key, url, referer FROM frontier WHERE shard = ? AND claimed = 0 LIMIT ?',
+                (self.i_shard, i_limit)).fetchall()
+            if a_urls:
+                self.connection.executemany('UPDATE frontier SET claimed = 1 WHERE key = ?',
+                                            [(s_key,) for s_key, s_url, s_referer in a_urls])
+                self.connection.execute('UPDATE shards SET idle = 0 WHERE shard = ?', (self.i_shard,))
+        return [(s_url, s_referer) for s_key, s_url, s_referer in a_urls]
+
+    def is_crawl_finished(self):
+        """
+        Mark the shard as idle and check if the whole crawl is over : every shard is registered and idle and no url
+        is waiting in the frontier. It must be called only when the crawler of this process has nothing to do.
+        :return: True if the crawl is over
+        """
+        with self.transaction():
+            self.connection.execute('UPDATE shards SET idle = 1 WHERE shard = ?', (self.i_shard,))
+            i_idle_shards = self.connection.execute('SELECT COUNT(*) FROM shards WHERE idle = 1').fetchone()[0]
+            i_waiting_urls = self.connection.execute('SELECT COUNT(*) FROM frontier WHERE claimed = 0').fetchone()[0]
+        return i_idle_shards == self.i_shards and i_waiting_urls == 0
+
+    @contextmanager
+    def transaction(self):
+        """
+        Execute the statements of a with block in a transaction that locks the database, so the state of the frontier
+        read by a shard can't be modified by another one before the end of the block
+        """
+        self.connection.execute('BEGIN IMMEDIATE')
+        try:
+            yield self.connection
+        except Exception:
+            self.connection.execute('ROLLBACK')
+            raise
+        self.connection.execute('COMMIT')
+
+    def close(self):
+        """
+        Close the connection to the database
+        """
+        self.connection.close()
+
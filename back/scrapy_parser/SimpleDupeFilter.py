@@ -15,48 +15,75 @@ MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
 GNU General Public License for more details.
 You should have received a copy of the GNU General Public License
 """
+import hashlib
 import logging
 
 from scrapy.dupefilters import RFPDupeFilter
 from scrapy.utils.job import job_dir
+from w3lib.url import canonicalize_url
+
+from scrapy_parser.CompactHashSet import CompactHashSet
+from scrapy_parser.CrawlJournal import SeenJournal
 
 statif_logger = logging.getLogger('statification')
 
 
+def get_canonical_url(s_url):
+    """
+    Get the canonical form of an url, the urls that point to the same document get the same canonical url,
+    considering url like :
+    http://mysite.mydomain/
+    http://mysite.mydomain
+    http://mysite.mydomain/index.html
+    :param s_url: the url
+    :return: the canonical url
+    """
+    s_key = canonicalize_url(s_url)
+    if s_key.endswith('/index.html'):
+        s_key = s_key[:-len('index.html')]
+    return s_key.rstrip('/')
+
+
+def get_url_hash(s_url):
+    """
+    Get the 64-bit hash of the canonical form of an url
+    :param s_url: the url
+    :return: the hash, an integer between 0 and 2^64 - 1
+    """
+    return int.from_bytes(hashlib.sha1(get_canonical_url(s_url).encode('utf-8')).digest()[:8], 'little')
+
+
 class SimpleDupeFilter(RFPDupeFilter):
     """
     A simple Dupe Filter
+    The seen urls are stored as the 64-bit hash of their canonical form in a compact set, so
+    http://mysite.mydomain/, http://mysite.mydomain and http://mysite.mydomain/index.html are the same url.
+    If a job directory is set, the seen urls are written into it and reloaded when the crawl is resumed
     """
     def __init__(self, path=None):
-        RFPDupeFilter.__init__(self, path)
+        # the seen urls are journaled by the filter, not the fingerprints written by RFPDupeFilter
+        RFPDupeFilter.__init__(self)
+        self.fingerprints = CompactHashSet()
+        self.journal = SeenJournal(path) if path else None
+
+        if self.journal is not None:
+            for url in self.journal.load():
+                self.fingerprints.add(get_url_hash(url))
 
     @classmethod
     def from_settings(cls, settings):
-        return cls(job_dir(settings))
+        return cls(settings.get('CRAWLER_JOB_DIR') or job_dir(settings))
 
     def request_seen(self, request):
-        # get the request fingerprint
-        fp = self.request_fingerprint(request)
-
-        # get an alternate request with index.html at the end
-        # it will stop doing twice the same request for url pointing to index.html file, considering url like :
-        # http://mysite.mydomain/
-        # http://mysite.mydomain
-        # http://mysite.mydomain/index.html
-        if request.url.endswith('/'):
-            req = request.replace(url=(request.url + "index.html"))
-        else:
-            req = request.replace(url=(request.url + "/index.html"))
-        fp2 = self.request_fingerprint(req)
-
-        # if fingerprints exist then the url has been already crawled
-        if fp in self.fingerprints or fp2 in self.fingerprints:
+        # add returns True if the url has been already crawled
+        if self.fingerprints.add(get_url_hash(request.url)):
             return True
         statif_logger.info('do request : ' + request.url)
 
-        # add both fingerprints to the list of seen url
-        self.fingerprints.add(fp)
-        self.fingerprints.add(fp2)
+        if self.journal is not None:
+            self.journal.add(request.url)
 
     def close(self, reason):
+        if self.journal is not None:
+            self.journal.close()
         self.fingerprints = None
@@ -0,0 +1,174 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+import bisect
+import json
+import logging
+import os
+import time
+
+from scrapy import signals
+from scrapy.exceptions import NotConfigured
+from twisted.internet.task import LoopingCall
+
+statif_logger = logging.getLogger('statification')
+
+# the prefix of the stats of the number of responses by HTTP status
+RESPONSE_STATUS_PREFIX = 'downloader/response_status_count/'
+
+# the upper bounds in seconds of the buckets of the histogram of the download latency
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2.5, 5, 10, 30, 60)
+
+
+class StatsExporter(object):
+    """
+    Scrapy extension that writes a snapshot of the stats of the crawl into a JSON file periodically, the application
+    reads it to follow the progress of the crawl. The file is replaced atomically, so it is never read partially
+    written, and a snapshot that can't be written is skipped so the next ones still are. The snapshot contains :
+    - pages         :   the number of responses processed by the spider
+    - bytes         :   the number of bytes downloaded, the large files streamed by the spider included
+    - items         :   the number of files sent to the pipeline
+    - errors        :   the number of errors logged
+    - http_errors   :   the number of responses with an HTTP error status
+    - queue         :   the number of requests waiting in the scheduler
+    - in_progress   :   the number of requests being downloaded or processed
+    - rate          :   the number of pages processed per second since the previous snapshot
+    - mime_types    :   the number of responses by MIME type
+    - latency       :   the histogram of the download latency of the responses in seconds, the cumulative count of
+                        each bucket by upper bound (buckets), the sum (sum) and the count (count) of the latencies
+    - time          :   the time of the snapshot
+    - finished      :   True in the last snapshot, written when the spider is closed
+    """
+    def __init__(self, crawler, s_stats_file, f_interval=1):
+        """
+        :param crawler: the crawler
+        :param s_stats_file: the path to the file of the snapshot
+        :param f_interval: the number of seconds between two snapshots
+        """
+        self.crawler = crawler
+        self.s_stats_file = s_stats_file
+        self.f_interval = f_interval
+        self.task = LoopingCall(self.export)
+        self.i_last_pages = 0
+        self.f_last_time = None
+        self.mime_types = {}
+        self.a_latency_counts = [0] * len(LATENCY_BUCKETS)
+        self.f_latency_sum = 0.0
+        self.i_latency_count = 0
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        s_stats_file = crawler.settings.get('STATS_EXPORTER_FILE')
+        if not s_stats_file:
+            raise NotConfigured
+        exporter = cls(crawler, s_stats_file, crawler.settings.getfloat('STATS_EXPORTER_INTERVAL', 1))
+        crawler.signals.connect(exporter.spider_opened, signal=signals.spider_opened)
+        crawler.signals.connect(exporter.spider_closed, signal=signals.spider_closed)
+        crawler.signals.connect(exporter.response_received, signal=signals.response_received)
+        return exporter
+
+    def spider_opened(self, spider):
+        self.f_last_time = time.time()
+        self.task.start(self.f_interval, now=True)
+
+    def spider_closed(self, spider, reason):
+        if self.task.running:
+            self.task.stop()
+        self.export(b_finished=True)
+
+    def response_received(self, response, request, spider):
+        # the MIME type of the Content-Type header, text/plain if it isn't specified like MirroringSpider.get_mime
+        s_mime = 'text/plain'
+        if 'Content-Type' in response.headers:
+            s_mime = response.headers['Content-Type'].decode('utf-8', 'replace').split(';')[0].strip().lower()
+        self.mime_types[s_mime] = self.mime_types.get(s_mime, 0) + 1
+
+        f_latency = request.meta.get('download_latency')
+        if f_latency is not None:
+            i_bucket = bisect.bisect_left(LATENCY_BUCKETS, f_latency)
+            if i_bucket < len(LATENCY_BUCKETS):
+                self.a_latency_counts[i_bucket] += 1
+            self.f_latency_sum += f_latency
+            self.i_latency_count += 1
+
+    def get_latency(self):
+        """
+        :return: the histogram of the download latency with cumulative counts, as written in the snapshot
+        """
+        buckets = {}
+        i_cumulative_count = 0
+        for f_bucket, i_count in zip(LATENCY_BUCKETS, self.a_latency_counts):
+            i_cumulative_count += i_count
+            buckets[str(f_bucket)] = i_cumulative_count
+        return {'buckets': buckets, 'sum': round(self.f_latency_sum, 6), 'count': self.i_latency_count}
+
+    def get_snapshot(self, b_finished=False):
+        """
+        :param b_finished: True if the crawl is over
+        :return: the snapshot of the stats as a python dict
+        """
+        stats = self.crawler.stats
+        f_time = time.time()
+        i_pages = stats.get_value('custom_count', 0)
+        f_elapsed = f_time - self.f_last_time if self.f_last_time is not None else 0
+
+        i_queue = 0
+        i_in_progress = 0
+        slot = getattr(self.crawler.engine, 'slot', None)
+        if slot is not None:
+            i_queue = len(slot.scheduler)
+            i_in_progress = len(slot.inprogress)
+
+        snapshot = {
+            'pages': i_pages,
+            'bytes': stats.get_value('downloader/response_bytes', 0) + stats.get_value('mirroring/streamed_bytes', 0),
+            'items': stats.get_value('item_scraped_count', 0),
+            'errors': stats.get_value('log_count/ERROR', 0),
+            'http_errors': sum(i_count for s_key, i_count in stats.get_stats().items()
+                               if s_key.startswith(RESPONSE_STATUS_PREFIX) and
+                               int(s_key[len(RESPONSE_STATUS_PREFIX):]) >= 400),
+            'queue': i_queue,
+            'in_progress': i_in_progress,
+            'rate': round((i_pages - self.i_last_pages) / f_elapsed, 2) if f_elapsed > 0 else 0,
+            'mime_types': dict(self.mime_types),
+            'latency': self.get_latency(),
+            'time': f_time,
+            'finished': b_finished
+        }
+        self.i_last_pages = i_pages
+        self.f_last_time = f_time
+        return snapshot
+
+    def export(self, b_finished=False):
+        """
+        Write the snapshot of the stats into the file. The errors are logged and not raised, an error would stop the
+        LoopingCall and no snapshot would be written until the end of the crawl
+        :param b_finished: True if the crawl is over
+        """
+        s_temp_file = self.s_stats_file + '.tmp'
+        try:
+            with open(s_temp_file, 'w') as f_stats_file:
+                json.dump(self.get_snapshot(b_finished), f_stats_file)
+            os.replace(s_temp_file, self.s_stats_file)
+        except Exception as e:
+            # not an error, it would be counted in the stats of the crawl
+            statif_logger.warning('The stats of the crawl could not be written into {0}: {1!r}'.format(
+                self.s_stats_file, e))
+            try:
+                os.remove(s_temp_file)
+            except OSError:
+                pass
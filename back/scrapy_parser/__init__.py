@@ -32,6 +32,26 @@ NEWSPIDER_MODULE = 'scrapy_parser.spiders'
 # USER_AGENT = 'scrapy mirroring'
 
 ITEM_PIPELINES = {'scrapy_parser.pipelines.MirroringPipeline': 1}
+# the number of threads that write the files and the number of items that can wait to be written
+MIRRORING_WRITER_THREADS = 4
+MIRRORING_WRITER_QUEUE_SIZE = 100
+# the body of the large binary files is written into the output directory while it is downloaded instead of being kept
+# in memory, by the download handler of the http and https urls. MIRRORING_STREAM_MIN_SIZE is the minimum size of the
+# files streamed, the files whose size is unknown are always streamed
+DOWNLOAD_HANDLERS = {'http': 'scrapy_parser.downloads.StreamingDownloadHandler',
+                     'https': 'scrapy_parser.downloads.StreamingDownloadHandler'}
+MIRRORING_STREAM_MIN_SIZE = 1048576
+
+# the JournalDownloaderMiddleware is called after the RetryMiddleware (550) when a download fails
+DOWNLOADER_MIDDLEWARES = {'scrapy_parser.middlewares.IncrementalMiddleware': 543,
+                          'scrapy_parser.middlewares.JournalDownloaderMiddleware': 545}
+
+SPIDER_MIDDLEWARES = {'scrapy_parser.middlewares.JournalMiddleware': 1000}
+
+# write a snapshot of the stats of the crawl into STATS_EXPORTER_FILE every STATS_EXPORTER_INTERVAL seconds,
+# the file is given by the application. If PROFILER_FILE is given, the crawl is profiled into it
+EXTENSIONS = {'scrapy_parser.Profiler.Profiler': 100, 'scrapy_parser.StatsExporter.StatsExporter': 500}
+STATS_EXPORTER_INTERVAL = 1
 
 HTTPERROR_ALLOW_ALL = True
 
@@ -55,3 +75,6 @@ METAREFRESH_ENABLED = False
 DNSCACHE_ENABLED = True
 # DUPEFILTER_CLASS = "scrapy_parser.BLOOMDupeFilter.BLOOMDupeFilter"
 DUPEFILTER_CLASS = "scrapy_parser.SimpleDupeFilter.SimpleDupeFilter"
+# the number of urls of the first bloom filter of BLOOMDupeFilter and its maximum false positive rate
+DUPEFILTER_BLOOM_CAPACITY = 100000
+DUPEFILTER_BLOOM_ERROR_RATE = 0.00001
@@ -0,0 +1,180 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+# The download handler of the http and https urls, it writes the body of the large files into the output directory
+# while it is downloaded by scrapy, so the content of the files is never kept in memory.
+
+import hashlib
+import os
+import uuid
+
+from scrapy.core.downloader.handlers.http11 import HTTP11DownloadHandler, ScrapyAgent
+from twisted.internet import defer
+from twisted.web.iweb import UNKNOWN_LENGTH
+
+
+class StreamedBody(object):
+    """
+    The body of a response written into a hidden temporary file while it is downloaded, the sha1 of the content is
+    computed at the same time. It replaces the buffer in memory of the reader of scrapy, it is only created when the
+    first bytes are received
+    """
+    def __init__(self, s_directory):
+        """
+        :param s_directory: the directory of the temporary file, on the same filesystem as the file where the content
+                            will be saved so the temporary file can be renamed atomically
+        """
+        self.s_filename = os.path.join(s_directory, '.' + uuid.uuid4().hex + '.part')
+        self.f_file = None
+        self.sha1 = hashlib.sha1()
+
+    def write(self, data):
+        """
+        Write a chunk of the body into the temporary file
+        :param data: the bytes received
+        """
+        if self.f_file is None:
+            os.makedirs(os.path.dirname(self.s_filename) or '.', exist_ok=True)
+            self.f_file = open(self.s_filename, 'xb')
+        self.f_file.write(data)
+        self.sha1.update(data)
+
+    def truncate(self, i_size):
+        """
+        Truncate the temporary file, the reader truncates its buffer before cancelling a download larger than
+        DOWNLOAD_MAXSIZE
+        :param i_size: the new size
+        """
+        if self.f_file is not None:
+            self.f_file.truncate(i_size)
+
+    def getvalue(self):
+        """
+        :return: the body of the response delivered to the spider, empty since the content is in the temporary file
+        """
+        return b''
+
+    def get_hash(self):
+        """
+        :return: the sha1 of the content
+        """
+        return self.sha1.hexdigest()
+
+    def close(self):
+        """
+        Close the temporary file, it is created if the body is empty
+        """
+        if self.f_file is None:
+            self.write(b'')
+        self.f_file.close()
+
+    def discard(self):
+        """
+        Close and remove the temporary file, when the download has failed
+        """
+        if self.f_file is not None:
+            self.f_file.close()
+            os.remove(self.s_filename)
+            self.f_file = None
+
+
+class StreamingAgent(ScrapyAgent):
+    """
+    The agent of StreamingDownloadHandler, it downloads the responses like the agent of scrapy but writes the body of
+    the responses chosen by the spider into a StreamedBody
+    """
+    def _cb_bodyready(self, txresponse, request):
+        """
+        Called when the headers of the response are received, before its body
+        """
+        get_stream_directory = getattr(self._crawler.spider, 'get_stream_directory', None)
+        headers = self._headers_from_twisted_response(txresponse)
+        i_length = txresponse.length if txresponse.length != UNKNOWN_LENGTH else None
+
+        # the compressed bodies are decompressed in memory by the HttpCompressionMiddleware, they are not streamed
+        s_directory = get_stream_directory(headers, i_length) \
+            if get_stream_directory is not None and txresponse.code == 200 and b'Content-Encoding' not in headers \
+            else None
+        if s_directory is None:
+            return super()._cb_bodyready(txresponse, request)
+
+        body = StreamedBody(s_directory)
+        deliver_body = txresponse.deliverBody
+
+        def deliver_body_to_file(reader):
+            # the reader of scrapy still checks the size of the body, sends the bytes_received signal and handles the
+            # end of the download, only its buffer is replaced by the temporary file
+            reader._bodybuf = body
+            deliver_body(reader)
+
+        txresponse.deliverBody = deliver_body_to_file
+        result = super()._cb_bodyready(txresponse, request)
+
+        # the download has been stopped by a headers_received handler or the body is empty, nothing was written
+        if not isinstance(result, defer.Deferred):
+            return result
+        return result.addCallbacks(self._cb_streamed, self._eb_streamed, callbackArgs=(request, body),
+                                   errbackArgs=(body,))
+
+    @staticmethod
+    def _cb_streamed(result, request, body):
+        """
+        Called when the body has been written into the temporary file, the response will be delivered with the
+        'streamed' flag, the path to the temporary file and the sha1 of the content are added to the meta of the request
+        """
+        body.close()
+        a_flags = result['flags'] or []
+        if result.get('failure') is not None or 'download_stopped' in a_flags:
+            body.discard()
+            return result
+
+        request.meta['stream_file'] = body.s_filename
+        request.meta['stream_hash'] = body.get_hash()
+        result['flags'] = a_flags + ['streamed']
+        return result
+
+    @staticmethod
+    def _eb_streamed(failure, body):
+        """
+        Called when the download has failed, timed out or has been cancelled, the temporary file is removed
+        """
+        body.discard()
+        return failure
+
+
+class StreamingDownloadHandler(HTTP11DownloadHandler):
+    """
+    The download handler of the http and https urls. The spider chooses the responses whose body is written into a
+    temporary file of the output directory instead of being kept in memory, with its get_stream_directory method
+    called with the headers of the response and the length of its body (None if it is unknown). These responses are
+    delivered with an empty body and the 'streamed' flag, the meta of their request contains the path to the temporary
+    file (stream_file) and the sha1 of the content (stream_hash). The body is only downloaded once, by scrapy, with its
+    middlewares, its concurrency and its settings.
+    """
+    def download_request(self, request, spider):
+        """
+        :return: a Deferred for the HTTP download
+        """
+        agent = StreamingAgent(
+            contextFactory=self._contextFactory,
+            pool=self._pool,
+            maxsize=getattr(spider, 'download_maxsize', self._default_maxsize),
+            warnsize=getattr(spider, 'download_warnsize', self._default_warnsize),
+            fail_on_dataloss=self._fail_on_dataloss,
+            crawler=self._crawler,
+        )
+        return agent.download_request(request)
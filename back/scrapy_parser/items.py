@@ -48,6 +48,8 @@ class MirroringItem(Item):
     """
     content = Field()
     filename = Field()
+    # the temporary file where the content has been streamed, it replaces the content
+    temp_filename = Field()
 
     def mkdir(self):
         """
@@ -65,8 +67,8 @@ class MirroringItem(Item):
             os.remove(path)
             os.makedirs(path)
         else:
-            # the directory doesn't exist we create it
-            os.makedirs(path)
+            # the directory doesn't exist we create it, it can be created at the same time by another writer thread
+            os.makedirs(path, exist_ok=True)
 
     def save(self, content=None):
         """
@@ -74,6 +76,15 @@ class MirroringItem(Item):
         :param content: content of a file
         :type content: str
         """
+        # the content has been streamed into a temporary file, move it where the file must be saved
+        if content is None and self.get('temp_filename'):
+            self.mkdir()
+            try:
+                os.replace(self['temp_filename'], self['filename'])
+            except IsADirectoryError:
+                os.remove(self['temp_filename'])
+            return
+
         if content is None:
             content = self['content']
 
@@ -96,7 +107,12 @@ class MirroringItemHtml(MirroringItem):
         Here we do the specific treatment to save HTML files
         """
         root = self['content']
-        self.save(etree.tostring(root, method="html", encoding=root.docinfo.encoding, pretty_print=True))
+
+        # the document has already been serialized by the parser pool
+        if isinstance(root, bytes):
+            self.save()
+        else:
+            self.save(etree.tostring(root, method="html", encoding=root.docinfo.encoding, pretty_print=True))
 
 
 class MirroringItemCss(MirroringItem):
@@ -131,7 +147,12 @@ class MirroringItemXml(MirroringItem):
         Here we do the specific treatment to save XML files
         """
         root = self['content']
-        self.save(etree.tostring(root, method="xml", encoding=root.docinfo.encoding, pretty_print=True))
+
+        # the document has already been serialized by the parser pool
+        if isinstance(root, bytes):
+            self.save()
+        else:
+            self.save(etree.tostring(root, method="xml", encoding=root.docinfo.encoding, pretty_print=True))
 
 
 class MirroringItemJs(MirroringItem):
@@ -0,0 +1,108 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+# Define here the models for your downloader and spider middlewares
+#
+# See: http://doc.scrapy.org/en/latest/topics/downloader-middleware.html
+# See: http://doc.scrapy.org/en/latest/topics/spider-middleware.html
+
+
+class IncrementalMiddleware(object):
+    """
+    Add the validators of the previous statification to the requests, so the web server can answer
+    '304 Not Modified' for the content that didn't change since the previous statification.
+    It does nothing if the spider doesn't run in incremental mode.
+    """
+    def process_request(self, request, spider):
+        """
+        Add the If-None-Match and If-Modified-Since headers to the request
+        :type request: Request
+        :type spider: MirroringSpider
+        """
+        validators = getattr(spider, 'validators', None)
+
+        # the spider asks for the full content when the local copy of the file is missing
+        if validators is None or request.meta.get('incremental_skip'):
+            return None
+
+        validator = validators.get_previous(request.url)
+        if validator:
+            if validator['etag']:
+                request.headers.setdefault('If-None-Match', validator['etag'])
+            if validator['last_modified']:
+                request.headers.setdefault('If-Modified-Since', validator['last_modified'])
+        return None
+
+
+def mark_request_done(request, spider):
+    """
+    Mark the url of a request as done in the journal of the crawl, with the urls that have been redirected to it.
+    It does nothing if no job directory is set.
+    :type request: Request
+    :type spider: MirroringSpider
+    """
+    journal = getattr(spider, 'journal', None)
+    if journal is not None:
+        journal.mark_done(request.meta.get('redirect_urls', []) + [request.url])
+
+
+class JournalMiddleware(object):
+    """
+    Mark the url of a response as done in the journal of the crawl once everything the spider produced from it has
+    been processed, so the links found in the response are always seen by the dupe filter before their document is
+    marked as done. The response that the spider fails to process is marked as done too, like a response with an
+    HTTP error status. It does nothing if no job directory is set.
+    """
+    def process_spider_output(self, response, result, spider):
+        """
+        Forward the output of the spider then mark the response as done
+        :type response: Response
+        :type spider: MirroringSpider
+        """
+        for element in result:
+            yield element
+
+        mark_request_done(response.request, spider)
+
+    def process_spider_exception(self, response, exception, spider):
+        """
+        Mark the response as done when the spider or a spider middleware fails to process it (HttpError...),
+        the exception is then handled by the other middlewares
+        :type response: Response
+        :type exception: Exception
+        :type spider: MirroringSpider
+        """
+        mark_request_done(response.request, spider)
+        return None
+
+
+class JournalDownloaderMiddleware(object):
+    """
+    Mark the url of a request whose download failed (DNS error, timeout, refused connection...) as done in the journal
+    of the crawl, so the request isn't scheduled again each time the crawl is resumed. It runs after the
+    RetryMiddleware, so only the requests that failed after all their retries are marked as done.
+    It does nothing if no job directory is set.
+    """
+    def process_exception(self, request, exception, spider):
+        """
+        Mark the request as done, the exception is then handled by the other middlewares
+        :type request: Request
+        :type exception: Exception
+        :type spider: MirroringSpider
+        """
+        mark_request_done(request, spider)
+        return None
@@ -0,0 +1,164 @@
+# coding=utf-8
+"""
+Cornetto
+
+Copyright (C) 2018–2019 ANSSI
+Contributors:
+2018–2019 Bureau Applicatif tech-sdn-app@ssi.gouv.fr
+This program is free software: you can redistribute it and/or modify
+it under the terms of the GNU General Public License as published by
+the Free Software Foundation, either version 3 of the License, or
+(at your option) any later version.
+This program is distributed in the hope that it will be useful,
+but WITHOUT ANY WARRANTY; without even the implied warranty of
+MERCHANTABILITY or FITNESS FOR A PARTICULAR PURPOSE. See the
+GNU General Public License for more details.
+You should have received a copy of the GNU General Public License
+"""
+# The functions of this file don't depend on the spider, they can be executed in another process so the parsing of
+# the documents can use all the cores of the server.
+
+import multiprocessing
+import re
+
+from concurrent.futures import ProcessPoolExecutor
+from lxml import html
+from lxml import etree
+from twisted.internet.defer import Deferred
+from twisted.python.failure import Failure
+
+# the attributes that can contain a link in a HTML document
+HTML_LINKS_XPATH = '//a/@href | //applet/@code | //area/@href | //bgsound/@src | //body/@background | //embed/@src | //fig/@src | //form/@action | //frame/@src | //iframe/@src | //img/@src | //input/@src | //layer/@src | //link/@href | //object/@data | //overlay/@src | //script/@src | //table/@background | //td/@background | //tr/@background | //video/@src | //video/@poster | //audio/@src | //source/@src | //div/@style | //section/@style | //article/@style | //a/@style'
+
+CSS_LINKS_REGEX = re.compile(rb"url\s*\(\s*[\"']?([^)\"']+)[\"']?\s*\)")
+
+
+def parse_html_document(s_url, body):
+    """
+    Parse a HTML document
+    :param s_url: the url of the document
+    :param body: the content of the document
+    :return: the lxml tree of the document
+    """
+    return etree.fromstring(body, parser=html.HTMLParser(encoding="utf-8", remove_comments=False),
+                            base_url=s_url).getroottree()
+
+
+def parse_xml_document(s_url, body):
+    """
+    Parse a XML document
+    :param s_url: the url of the document
+    :param body: the content of the document
+    :return: the lxml tree of the document
+    """
+    return etree.fromstring(body, parser=etree.XMLParser(strip_cdata=False, resolve_entities=False),
+                            base_url=s_url).getroottree()
+
+
+def get_html_links(root):
+    """
+    Search for links in a HTML document
+    :param root: the lxml tree of the document
+    :return: the list of the links, as they are written in the document
+    """
+    return [str(link) for link in root.xpath(HTML_LINKS_XPATH)]
+
+
+def get_css_links(body):
+    """
+    Search for links in a CSS file
+    :param body: the content of the file
+    :return: the list of the links, as they are written in the file
+    """
+    return [url.decode('utf-8') for url in CSS_LINKS_REGEX.findall(body)]
+
+
+def get_xml_links(root):
+    """
+    Search for links in a XML document (RSS feeds)
+    :param root: the lxml tree of the document
+    :return: the list of the links, as they are written in the document
+    """
+    # Parse XML to find every declared namespaces
+    namespaces = {}
+    for event, elem in etree.iterwalk(root, ('start', 'start-ns')):
+        if event == 'start-ns':
+            namespaces[elem[0]] = elem[1]
+        elif event == 'start':
+            break
+
+    # Search for links
+    xpath = "/rss/channel/link | /rss/channel/item/link | /rss/channel/item/comments"
+    if 'atom' in namespaces:
+        xpath += " | /rss/channel/atom:link[@href]"
+    if 'wfw' in namespaces:
+        xpath += " | /rss/channel/item/wfw:commentRss"
+
+    links = []
+    for elem in root.xpath(xpath, namespaces=namespaces):
+        if elem.tag == '{' + namespaces['atom'] + '}link':
+            links.append(elem.get('href'))
+        else:
+            links.append(elem.text)
+    return links
+
+
+def parse_document(mime, s_url, body, url_regex, url_replacement, b_serialize):
+    """
+    Do all the CPU intensive work of the spider for a document : replace the urls, parse the document,
+    search for links and serialize the document. This function is executed in the processes of the parser pool.
+    :param mime: the MIME type of the document (text/html, text/css or text/xml)
+    :param s_url: the url of the document
+    :param body: the content of the document as it was downloaded
+    :param url_regex: the pattern of the regex used to replace the urls
+    :param url_replacement: the url that will replace the urls matched by the regex
+    :param b_serialize: True if the content of the document will be saved
+    :return: a tuple containing the list of the links and the content to save (None if b_serialize is False)
+    """
+    # replace all url that match the regex by urlReplacement
+    body = re.compile(url_regex, re.I).sub(url_replacement, body)
+
+    if mime == "text/html":
+        root = parse_html_document(s_url, body)
+        content = etree.tostring(root, method="html", encoding=root.docinfo.encoding, pretty_print=True) \
+            if b_serialize else None
+        return get_html_links(root), content
+
+    elif mime == "text/xml":
+        root = parse_xml_document(s_url, body)
+        content = etree.tostring(root, method="xml", encoding=root.docinfo.encoding, pretty_print=True) \
+            if b_serialize else None
+        return get_xml_links(root), content
+
+    return get_css_links(body), body if b_serialize else None
+
+
+def create_parser_pool(i_processes):
+    """
+    Create the pool of processes that parse the documents. The processes are started by a fork server : the crawler
+    process runs threads (the writers of the pipeline) and forking it could copy a lock held by one of them, the child
+    would then deadlock
+    :param i_processes: the number of processes
+    :return: the pool
+    """
+    return ProcessPoolExecutor(i_processes, mp_context=multiprocessing.get_context('forkserver'))
+
+
+def deferred_from_future(future):
+    """
+    Create a Deferred that will be fired in the reactor thread with the result of a concurrent.futures.Future
+    :param future: the future
+    :return: the Deferred
+    """
+    from twisted.internet import reactor
+
+    deferred = Deferred()
+
+    def fire(done_future):
+        if done_future.exception() is not None:
+            deferred.errback(Failure(done_future.exception()))
+        else:
+            deferred.callback(done_future.result())
+
+    future.add_done_callback(lambda done_future: reactor.callFromThread(fire, done_future))
+    return deferred
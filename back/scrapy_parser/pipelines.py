@@ -20,19 +20,91 @@ You should have received a copy of the GNU General Public License
 # Don't forget to add your pipeline to the ITEM_PIPELINES setting
 # See: http://doc.scrapy.org/en/latest/topics/item-pipeline.html
 
+from twisted.internet.defer import Deferred, DeferredList, DeferredSemaphore, succeed
+from twisted.internet.threads import deferToThreadPool
+from twisted.python.threadpool import ThreadPool
+
 from scrapy_parser.spiders.MirroringSpider import MirroringSpider
 
 from scrapy_parser.items import MirroringItem
 
 
 class MirroringPipeline(object):
+    """
+    Pipeline that link a MirroringSpider to the MirroringItem.
+    The items are written by a pool of threads so the disk I/O doesn't block the reactor. The writes of a same file
+    are done in order, and when too many writes are pending the pipeline stops accepting items : the responses are
+    then kept by the scraper, which stops the downloads.
+    """
+    def __init__(self, i_threads=4, i_queue_size=100):
+        """
+        :param i_threads: the maximum number of writer threads
+        :param i_queue_size: the maximum number of items being written or waiting to be written
+        """
+        self.pool = ThreadPool(minthreads=0, maxthreads=i_threads, name='MirroringPipeline')
+        self.semaphore = DeferredSemaphore(i_queue_size)
+
+    @classmethod
+    def from_crawler(cls, crawler):
+        return cls(crawler.settings.getint('MIRRORING_WRITER_THREADS', 4),
+                   crawler.settings.getint('MIRRORING_WRITER_QUEUE_SIZE', 100))
+
+    def open_spider(self, spider):
+        self.pool.start()
+
+    def close_spider(self, spider):
+        """
+        Wait for the pending writes then stop the writer threads
+        :return: a Deferred fired when all the items have been written
+        """
+        deferred = DeferredList(list(getattr(spider, 'pending_writes', {}).values()))
+        deferred.addBoth(lambda _: self.pool.stop())
+        return deferred
+
     def process_item(self, item, spider):
         """
-        Pipeline that link a MirroringSpider to the MirroringItem
+        Write the item in a writer thread. The write is registered in the pending writes of the spider before it
+        waits for a free place in the write queue, so the journal of the crawl never marks the url of an item as done
+        before its file is written
         :type item: Object
         :type spider: MirroringSpider
+        :return: the item or a Deferred fired with the item when it has been written
+        """
+        if not (isinstance(spider, MirroringSpider) and isinstance(item, MirroringItem)):
+            return item
+
+        s_filename = item['filename']
+        previous = spider.pending_writes.get(s_filename)
+
+        # fired when the file has been written, the next write of the file waits for it
+        written = Deferred()
+        spider.pending_writes[s_filename] = written
+
+        if previous is None:
+            deferred = succeed(None)
+        else:
+            deferred = Deferred()
+            previous.addBoth(lambda result: deferred.callback(None) or result)
+
+        # wait for a free place in the write queue
+        deferred.addCallback(lambda _: self.semaphore.run(self.write_item, item))
+
+        def finished(result):
+            if spider.pending_writes.get(s_filename) is written:
+                del spider.pending_writes[s_filename]
+            written.callback(None)
+            return result
+
+        deferred.addBoth(finished)
+        deferred.addCallback(lambda _: item)
+        return deferred
+
+    def write_item(self, item):
+        """
+        Write the item in a writer thread
+        :type item: MirroringItem
+        :return: a Deferred fired when the item has been written
         """
-        if isinstance(spider, MirroringSpider) and isinstance(item, MirroringItem):
-            item.process()
+        from twisted.internet import reactor
 
-        return item
+        return deferToThreadPool(reactor, self.pool, item.process)
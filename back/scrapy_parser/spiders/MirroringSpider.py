@@ -19,20 +19,50 @@ along with this program. If not, see http://www.gnu.org/licenses/.
 
 # TODO you should customize this spider to adapt it's behavior to your needs.
 
+import hashlib
 import re
 from urllib import parse
-from lxml import html
-from lxml import etree
+from scrapy import signals
+from scrapy.exceptions import DontCloseSpider
 from scrapy.http import Request
 from scrapy.spiders import Spider
+from twisted.internet.defer import DeferredList
+from twisted.internet.task import LoopingCall
+from scrapy_parser.CrawlEvents import CrawlEvents, EventsLogHandler, EVENT_EXTERNAL_LINK, EVENT_HTTP_ERROR, \
+    EVENT_FORBIDDEN_CONTENT, EVENT_STATS
+from scrapy_parser.CrawlJournal import CrawlJournal
+from scrapy_parser.CrawlValidators import CrawlValidators
+from scrapy_parser.SharedFrontier import SharedFrontier
 from scrapy_parser.items import *
+from scrapy_parser.parsers import parse_html_document, parse_xml_document, get_html_links, get_css_links, \
+    get_xml_links, parse_document, deferred_from_future, create_parser_pool
 
 
 class MirroringSpider(Spider):
     name = "mirroring"
 
+    IMG_MIME_TYPES = ["image/gif", "image/jpeg", "image/png", "image/x-ms-bmp", "image/vnd.microsoft.icon",
+                      "image/x-icon"]
+
+    JS_MIME_TYPES = ["application/javascript", "text/javascript"]
+
+    # Here are all the MIME type of files that will be downloaded and stored
+    # TODO This list is an example, any other type that should be downloaded must be added here
+    OTHER_MIME_TYPES = ["application/font-woff", "application/vnd.ms-fontobject", "text/plain", "application/x-gzip",
+                        "application/zip", "application/rtf", "video/mp4", "video/webm", "text/csv",
+                        "application/x-x509-ca-cert", "application/x-pkcs7-crl", "application/msword",
+                        "application/vnd.ms-excel", "application/epub+zip", "application/x-mobi8-ebook",
+                        "application/xml", "image/svg+xml"]
+
+    # the large files of these types are streamed into the output directory instead of being kept in memory, by the
+    # StreamingDownloadHandler
+    STREAMED_MIME_TYPES = ["application/pdf", "video/mp4", "video/webm", "application/zip", "application/x-gzip",
+                           "application/epub+zip", "application/x-mobi8-ebook", "application/msword",
+                           "application/vnd.ms-excel"] + IMG_MIME_TYPES
+
     def __init__(self, crawler, output="", urls="", domains="", url_regex="", url_replacement='/',
-                 crawler_count_file=None, *args, **kwargs):
+                 validators_file=None, parse_processes=0, shards=1, shard=0,
+                 frontier_file=None, events_file=None, *args, **kwargs):
         """
         Constructor of the spider, here we set different parameters into the attributes of the spiders
         :param crawler the crawler to bound to the spider
@@ -41,7 +71,14 @@ class MirroringSpider(Spider):
         :param domains: the allowed domains , separated by comma
         :param url_regex: the regex to be match for url replacement
         :param url_replacement: the url that will replace the matched urlRegex
-        :param crawler_count_file: the path to the file that  will be use to store the count of crawled urls
+        :param validators_file: the path to the file that store the validators of the previous statification,
+                                if set the spider runs in incremental mode
+        :param parse_processes: the number of processes used to parse the HTML, CSS and XML files,
+                                if 0 the files are parsed by the spider process
+        :param shards: the number of crawler processes of a sharded statification
+        :param shard: the number of the shard crawled by this process, between 0 and shards - 1
+        :param frontier_file: the path to the database shared by the crawler processes of a sharded statification
+        :param events_file: the path to the file where the events of the crawl are written
         :param args: list of other args
         :param kwargs: dictionary of other args
         """
@@ -54,13 +91,55 @@ class MirroringSpider(Spider):
         self.visitedURLs = set() # list of urls crawled
         self.outURLS = set() # list of external urls found during the crawl
         self.cachedResourcePath = set()
-        self.sCrawlerProgressCountFile = crawler_count_file
 
         # set two regex that are used in the parser
         self.urlRegex = re.compile(url_regex.strip('\"').encode('utf-8'), re.I)
         self.urlReplacement = url_replacement.strip('\"').encode('utf-8')
         self.crawler = crawler
 
+        # in sharded mode this process only crawls its partition of the urls, the other ones are handed off to
+        # their shard through the shared frontier
+        self.frontier = SharedFrontier(frontier_file, int(shards), int(shard)) \
+            if frontier_file and int(shards) > 1 else None
+        self.frontier_poll = LoopingCall(self.poll_frontier)
+
+        # in incremental mode keep the validators (ETag, Last-Modified, hash) of each url,
+        # in sharded mode each shard writes its own validators file
+        if not validators_file:
+            self.validators = None
+        elif self.frontier is not None:
+            self.validators = CrawlValidators(validators_file, validators_file + '.new.' + str(shard))
+        else:
+            self.validators = CrawlValidators(validators_file)
+
+        # the pool of processes that parse the documents, so the parsing isn't limited to one core
+        self.parser_pool = create_parser_pool(int(parse_processes)) if int(parse_processes) > 0 else None
+
+        # if a job directory is set, the state of the crawl is written periodically into it, so a crawl that has
+        # been stopped can be resumed
+        s_job_dir = crawler.settings.get('CRAWLER_JOB_DIR')
+        self.journal = CrawlJournal(s_job_dir) if s_job_dir else None
+        self.journal_flush = LoopingCall(self.flush_journal)
+        if self.journal is not None:
+            self.outURLS.update(self.journal.external_links)
+
+        # the results of the crawl (external links, errors...) are written as events, the errors logged by scrapy too
+        self.events = CrawlEvents(events_file) if events_file else None
+        self.events_log_handler = EventsLogHandler(self.events) if self.events is not None else None
+        if self.events_log_handler is not None:
+            logging.getLogger().addHandler(self.events_log_handler)
+
+        # the Deferreds of the files being written by the pipeline, by file
+        self.pending_writes = {}
+
+        # the minimum size of the large files streamed into the output directory
+        self.i_stream_min_size = crawler.settings.getint('MIRRORING_STREAM_MIN_SIZE', 0)
+
+        crawler.signals.connect(self.opened, signal=signals.spider_opened)
+        crawler.signals.connect(self.closed, signal=signals.spider_closed)
+        if self.frontier is not None:
+            crawler.signals.connect(self.idle, signal=signals.spider_idle)
+
     @classmethod
     def from_crawler(cls, crawler, output="", urls="", domains="", *args, **kwargs):
         """
@@ -97,140 +176,420 @@ class MirroringSpider(Spider):
 
     def start_requests(self):
         """
-        This will be call to start the first requests
+        This will be call to start the first requests, when a crawl is resumed the pending requests of the
+        previous crawl are scheduled again
         """
+        if self.journal is not None:
+            for url in self.journal.get_pending_urls():
+                # the url has already been seen by the dupe filter
+                yield Request(url, dont_filter=True)
+
         for url in self.start_urls:
-            yield Request(url)
+            if self.frontier is not None and not self.frontier.is_owned(url):
+                self.frontier.push([url])
+            else:
+                yield Request(url)
+
+    def opened(self, spider):
+        """
+        Called when the spider is opened, start to poll the urls handed off by the other shards in sharded mode
+        and to write the journal of the crawl if a job directory is set
+        """
+        if self.frontier is not None:
+            self.frontier_poll.start(1, now=False)
+
+        if self.journal is not None:
+            # a resumed crawl continues to count from the urls already crawled
+            self.crawler.stats.set_value('custom_count', len(self.journal.done))
+            self.journal_flush.start(self.crawler.settings.getfloat('CRAWLER_JOURNAL_INTERVAL', 5), now=False)
+
+    def flush_journal(self):
+        """
+        Write the state of the crawl into the job directory. The validators are written before the urls marked as
+        done, so the validators of every url crawled are kept when the crawl is resumed, and the urls marked as done
+        are written once the files being written by the pipeline are saved
+        :return: a Deferred fired when the journal has been written
+        """
+        if self.validators is not None:
+            self.validators.save()
+
+        a_done = self.journal.take_unflushed_done()
+        deferred = DeferredList(list(self.pending_writes.values()))
+        deferred.addBoth(lambda _: self.journal.flush(a_done))
+        return deferred
+
+    def get_stream_directory(self, headers, body_length):
+        """
+        Called by the StreamingDownloadHandler when the headers of a response are received, the body of the large files
+        that can be streamed is written into a temporary file of the output directory instead of being kept in memory
+        :param headers: the headers of the response
+        :param body_length: the length of the body, None if it is unknown
+        :return: the directory of the temporary file, None if the body isn't streamed
+        """
+        # the length is unknown if the response is chunked
+        if body_length is not None and body_length < self.i_stream_min_size:
+            return None
+
+        if self.get_mime(headers) in self.STREAMED_MIME_TYPES:
+            return self.output
+        return None
+
+    def idle(self, spider):
+        """
+        Called when the spider has nothing to do in sharded mode, the spider is kept open until the whole crawl is over
+        :raise DontCloseSpider if the other shards are still running or if new urls have been handed off to this one
+        """
+        if self.poll_frontier():
+            raise DontCloseSpider
+
+        if not self.frontier.is_crawl_finished():
+            raise DontCloseSpider
+
+    def poll_frontier(self):
+        """
+        Schedule the urls handed off to this shard by the other ones
+        :return: the number of urls scheduled
+        """
+        a_urls = self.frontier.pop()
+        for url, referer in a_urls:
+            self.crawler.engine.crawl(Request(url, headers={'Referer': referer} if referer else None))
+        return len(a_urls)
+
+    def closed(self, reason):
+        """
+        Called when the spider is closed, save the validators of the crawl in incremental mode and the journal,
+        stop the parser pool and the polling of the shared frontier, then write the stats of the crawl into the events
+        file
+        :param reason: the reason why the spider has been closed
+        """
+        if self.validators is not None:
+            self.validators.save()
+
+        if self.journal is not None:
+            if self.journal_flush.running:
+                self.journal_flush.stop()
+            self.journal.close()
+
+        if self.parser_pool is not None:
+            self.parser_pool.shutdown()
+
+        if self.frontier is not None:
+            if self.frontier_poll.running:
+                self.frontier_poll.stop()
+            self.frontier.close()
+
+        if self.events is not None:
+            self.emit_event(EVENT_STATS, response_received_count=self.crawler.stats.get_value(
+                'response_received_count', 0))
+            logging.getLogger().removeHandler(self.events_log_handler)
+            self.events.close()
 
     def parse(self, response):
         """
         The method that will manage how to parse any web content
+        :return: an iterable of requests and items, or a Deferred that will be fired with a list of requests and
+                 items when the document has been parsed by the parser pool
         """
-        url_regex = self.urlRegex
-
+        # the count is written periodically with the other stats by the StatsExporter extension
         self.crawler.stats.inc_value('custom_count')
-        file = open(self.sCrawlerProgressCountFile, 'w')
-        file.write(str(self.crawler.stats.get_value('custom_count')))
-        file.close()
+
+        # the content didn't change since the previous statification, reuse the local file
+        if response.status == 304 and self.validators is not None:
+            return self.parse_not_modified(response)
 
         # catch error HTTP
         if not (200 <= response.status < 400):
-            statif_logger.log(logging.WARNING, "HTTP error [%i] for %s from %s" % (
-                response.status, response.url, response.request.headers.get('Referer', b'').decode('utf-8')))
-            return
+            self.log_http_error(response.status, response)
+            return None
 
         current_url = parse.urlparse(response.url)
         current_filename = self.get_local_filename(current_url)
+        output_filename = self.output + current_filename
 
-        # get Content-Type in headers, if not specified treat as text/plain
-        if 'Content-Type' in response.headers:
-            mime = response.headers['Content-Type'].decode('utf-8').split(';')[0].strip()
-        else:
-            mime = 'text/plain'
+        mime = self.get_mime(response.headers)
 
-        if mime == "text/html":
-            # replace all url that match the regex by urlReplacement
-            body = url_regex.sub(self.urlReplacement, response.body)
+        # the content of the large files has been streamed into the output directory
+        if 'streamed' in response.flags:
+            return self.parse_streamed(response, mime, current_filename, output_filename)
 
-            root = etree.fromstring(body, parser=html.HTMLParser(encoding="utf-8", remove_comments=False),
-                                    base_url=response.url).getroottree()
+        if self.validators is not None and mime in self.get_allowed_mime_types():
+            s_hash = hashlib.sha1(response.body).hexdigest()
+            previous = self.validators.get_previous(response.url)
 
-            # Search for links
-            for link in root.xpath(
-                    '//a/@href | //applet/@code | //area/@href | //bgsound/@src | //body/@background | //embed/@src | //fig/@src | //form/@action | //frame/@src | //iframe/@src | //img/@src | //input/@src | //layer/@src | //link/@href | //object/@data | //overlay/@src | //script/@src | //table/@background | //td/@background | //tr/@background | //video/@src | //video/@poster | //audio/@src | //source/@src | //div/@style | //section/@style | //article/@style | //a/@style'):
+            # the content is the same as the one of the previous statification, don't write the file again
+            if previous and previous['hash'] == s_hash and os.path.isfile(output_filename):
+                output_filename = None
 
-                link = parse.urljoin(response.url, link)
+            if response.status == 200:
+                self.validators.add(response.url,
+                                    response.headers.get('ETag', b'').decode('utf-8') or None,
+                                    response.headers.get('Last-Modified', b'').decode('utf-8') or None,
+                                    s_hash, mime, current_filename)
 
-                if not re.match('^https?:|data:', link):
-                    statif_logger.log(logging.DEBUG, "Unknown external link format [%s]" % link)
-                    continue
+        # send the documents to the parser pool
+        if self.parser_pool is not None and mime in ["text/html", "text/css", "text/xml"]:
+            return self.parse_in_pool(response.url, mime, response.body, output_filename)
 
-                if (parse.urlparse(link).netloc not in self.allowed_domains) and (link not in self.outURLS):
-                    self.outURLS.add(link)
-                    statif_logger.log(logging.INFO, "External link detected [%s] in %s" % (link, response.url))
-                yield Request(link)
+        return self.parse_content(response, mime, output_filename)
 
-            yield MirroringItemHtml(filename=self.output + current_filename, content=root)
+    def parse_streamed(self, response, mime, current_filename, output_filename):
+        """
+        Create the item that moves the temporary file where the body of a response has been streamed to the place
+        where the file will be saved
+        :param response: the response without its body
+        :param mime: the MIME type of the response
+        :param current_filename: the path to the local file, relative to the output directory
+        :param output_filename: the path where the file will be saved
+        :return: the list of the items
+        """
+        s_temp_filename = response.meta['stream_file']
+        s_hash = response.meta['stream_hash']
+
+        # the streamed content isn't counted by the downloader
+        self.crawler.stats.inc_value('mirroring/streamed_bytes', os.path.getsize(s_temp_filename))
+
+        if self.validators is not None:
+            previous = self.validators.get_previous(response.url)
+            self.validators.add(response.url,
+                                response.headers.get('ETag', b'').decode('utf-8') or None,
+                                response.headers.get('Last-Modified', b'').decode('utf-8') or None,
+                                s_hash, mime, current_filename)
+
+            # the content is the same as the one of the previous statification
+            if previous and previous['hash'] == s_hash and os.path.isfile(output_filename):
+                os.remove(s_temp_filename)
+                return []
+
+        if mime == "application/pdf":
+            return [MirroringItemPdf(filename=output_filename, temp_filename=s_temp_filename)]
+        elif mime in self.IMG_MIME_TYPES:
+            return [MirroringItemImg(filename=output_filename, temp_filename=s_temp_filename)]
+        return [MirroringItem(filename=output_filename, temp_filename=s_temp_filename)]
+
+    def parse_content(self, response, mime, output_filename):
+        """
+        Parse the content of a response depending on its MIME type
+        :param response: the response
+        :param mime: the MIME type of the response
+        :param output_filename: the path where the file will be saved, None if the file shouldn't be saved
+        """
+        url_regex = self.urlRegex
 
-        elif mime == "text/css":
+        if mime == "text/html":
             # replace all url that match the regex by urlReplacement
             body = url_regex.sub(self.urlReplacement, response.body)
+            yield from self.parse_html(response.url, body, output_filename)
 
-            # Search for links
-            for url in re.findall(b"url\s*\(\s*[\"']?([^)\"']+)[\"']?\s*\)", body):
-                link = parse.urljoin(response.url, url.decode('utf-8'))
-                if not re.match('^https?:|data:', link):
-                    statif_logger.log(logging.DEBUG, "Unknown external link format [%s] in %s" % (link, response.url))
-                    continue
-
-                if (parse.urlparse(link).netloc not in self.allowed_domains) and (link not in self.outURLS):
-                    self.outURLS.add(link)
-                    statif_logger.log(logging.INFO, "External link detected [%s] in %s" % (link, response.url))
-                yield Request(link)
-
-            yield MirroringItemCss(filename=self.output + current_filename, content=body)
-
-        elif mime == "application/pdf":
-            yield MirroringItemPdf(filename=self.output + current_filename, content=response.body)
+        elif mime == "text/css":
+            # replace all url that match the regex by urlReplacement
+            body = url_regex.sub(self.urlReplacement, response.body)
+            yield from self.parse_css(response.url, body, output_filename)
 
         elif mime == "text/xml":
             # get the body content and encode it as utf-8
             body = url_regex.sub(self.urlReplacement, response.body)
+            yield from self.parse_xml(response.url, body, output_filename)
 
-            root = etree.fromstring(body, parser=etree.XMLParser(strip_cdata=False, resolve_entities=False),
-                                    base_url=response.url).getroottree()
-
-            # Parse XML to find every declared namespaces
-            namespaces = {}
-            for event, elem in etree.iterwalk(root, ('start', 'start-ns')):
-                if event == 'start-ns':
-                    namespaces[elem[0]] = elem[1]
-                elif event == 'start':
-                    break
-
-            # Search for links
-            xpath = "/rss/channel/link | /rss/channel/item/link | /rss/channel/item/comments"
-            if 'atom' in namespaces:
-                xpath += " | /rss/channel/atom:link[@href]"
-            if 'wfw' in namespaces:
-                xpath += " | /rss/channel/item/wfw:commentRss"
-            for elem in root.xpath(xpath, namespaces=namespaces):
-                if elem.tag == '{' + namespaces['atom'] + '}link':
-                    link = elem.get('href')
-                else:
-                    link = elem.text
-
-                link = parse.urljoin(response.url, link)
-
-                if not re.match('^https?:|data:', link):
-                    statif_logger.log(logging.WARNING, "Unknown external link format [%s]" % link)
-                    continue
-
-                if (parse.urlparse(link).netloc not in self.allowed_domains) and (link not in self.outURLS):
-                    self.outURLS.add(link)
-                    statif_logger.log(logging.INFO, "External link detected [%s] in %s" % (link, response.url))
-                yield Request(link)
+        elif output_filename is None:
+            # the file is already up to date in the output directory
+            pass
 
-            yield MirroringItemXml(filename=self.output + current_filename, content=root)
+        elif mime == "application/pdf":
+            yield MirroringItemPdf(filename=output_filename, content=response.body)
 
-        elif mime in ["image/gif", "image/jpeg", "image/png", "image/x-ms-bmp", "image/vnd.microsoft.icon",
-                      "image/x-icon"]:
-            yield MirroringItemImg(filename=self.output + current_filename, content=response.body)
+        elif mime in self.IMG_MIME_TYPES:
+            yield MirroringItemImg(filename=output_filename, content=response.body)
 
-        elif mime in ["application/javascript", "text/javascript"]:
+        elif mime in self.JS_MIME_TYPES:
             # get the body content and encode it as utf-8
             body = url_regex.sub(self.urlReplacement, response.body)
 
-            yield MirroringItemJs(filename=self.output + current_filename, content=body)
+            yield MirroringItemJs(filename=output_filename, content=body)
 
-        # Here are all the MIME type of files that will be downloaded and stored
-        # TODO This list is an example, any other type that should be downloaded must be added here
-        elif mime in ["application/font-woff", "application/vnd.ms-fontobject", "text/plain", "application/x-gzip",
-                      "application/zip", "application/rtf", "video/mp4", "video/webm", "text/csv",
-                      "application/x-x509-ca-cert", "application/x-pkcs7-crl", "application/msword",
-                      "application/vnd.ms-excel", "application/epub+zip", "application/x-mobi8-ebook",
-                      "application/xml", "image/svg+xml"]:
-            yield MirroringItem(filename=self.output + current_filename, content=response.body)
+        elif mime in self.OTHER_MIME_TYPES:
+            yield MirroringItem(filename=output_filename, content=response.body)
 
         else:  # Content not allowed
             statif_logger.log(logging.WARNING, "Forbidden content [%s] detected in %s" % (mime, response.url))
+            self.emit_event(EVENT_FORBIDDEN_CONTENT, mime=mime, url=response.url)
+
+    def parse_not_modified(self, response):
+        """
+        Manage a '304 Not Modified' response in incremental mode : the file of the previous statification is kept
+        and, for the files that can contain links, the links are extracted from the local file.
+        """
+        previous = self.validators.get_previous(response.url)
+
+        # the full content has already been asked for, the server answers 304 to any request
+        if response.meta.get('incremental_skip'):
+            self.log_http_error(response.status, response)
+            return
+
+        # no validator has been stored for the url (a 304 after a redirect or sent without a conditional request) or
+        # the local copy is missing, ask for the full content
+        if previous is None or not os.path.isfile(self.output + previous['filename']):
+            yield Request(response.url, dont_filter=True, meta={'incremental_skip': True})
+            return
+
+        output_filename = self.output + previous['filename']
+        self.validators.keep_previous(response.url,
+                                      response.headers.get('ETag', b'').decode('utf-8') or None,
+                                      response.headers.get('Last-Modified', b'').decode('utf-8') or None)
+
+        if previous['mime'] in ["text/html", "text/css", "text/xml"]:
+            # the local file has already been modified with the url replacement
+            with open(output_filename, 'rb') as f_local_file:
+                body = f_local_file.read()
+
+            if previous['mime'] == "text/html":
+                yield from self.parse_html(response.url, body, None)
+            elif previous['mime'] == "text/css":
+                yield from self.parse_css(response.url, body, None)
+            else:
+                yield from self.parse_xml(response.url, body, None)
+
+    def parse_html(self, s_url, body, output_filename):
+        """
+        Search for links in a HTML file and create the item to save it
+        :param s_url: the url of the file
+        :param body: the content of the file where the url replacement has been done
+        :param output_filename: the path where the file will be saved, None if the file shouldn't be saved
+        """
+        root = parse_html_document(s_url, body)
+
+        yield from self.follow_links(s_url, get_html_links(root))
+
+        if output_filename:
+            yield MirroringItemHtml(filename=output_filename, content=root)
+
+    def parse_css(self, s_url, body, output_filename):
+        """
+        Search for links in a CSS file and create the item to save it
+        :param s_url: the url of the file
+        :param body: the content of the file where the url replacement has been done
+        :param output_filename: the path where the file will be saved, None if the file shouldn't be saved
+        """
+        yield from self.follow_links(s_url, get_css_links(body))
+
+        if output_filename:
+            yield MirroringItemCss(filename=output_filename, content=body)
+
+    def parse_xml(self, s_url, body, output_filename):
+        """
+        Search for links in a XML file (RSS feeds) and create the item to save it
+        :param s_url: the url of the file
+        :param body: the content of the file where the url replacement has been done
+        :param output_filename: the path where the file will be saved, None if the file shouldn't be saved
+        """
+        root = parse_xml_document(s_url, body)
+
+        yield from self.follow_links(s_url, get_xml_links(root), logging.WARNING)
+
+        if output_filename:
+            yield MirroringItemXml(filename=output_filename, content=root)
+
+    def parse_in_pool(self, s_url, mime, body, output_filename):
+        """
+        Send a HTML, CSS or XML document to the parser pool
+        :param s_url: the url of the document
+        :param mime: the MIME type of the document
+        :param body: the content of the document as it was downloaded
+        :param output_filename: the path where the file will be saved, None if the file shouldn't be saved
+        :return: a Deferred that will be fired with the list of requests and items
+        """
+        future = self.parser_pool.submit(parse_document, mime, s_url, body, self.urlRegex.pattern,
+                                         self.urlReplacement, output_filename is not None)
+        deferred = deferred_from_future(future)
+        deferred.addCallback(self.parse_pool_result, s_url, mime, output_filename)
+        return deferred
+
+    def parse_pool_result(self, result, s_url, mime, output_filename):
+        """
+        Create the requests and the item from the result of the parser pool, it's executed in the spider process
+        :param result: a tuple containing the list of the links and the serialized content of the document
+        :param s_url: the url of the document
+        :param mime: the MIME type of the document
+        :param output_filename: the path where the file will be saved, None if the file shouldn't be saved
+        :return: the list of requests and items
+        """
+        links, content = result
+
+        a_output = list(self.follow_links(s_url, links, logging.WARNING if mime == "text/xml" else logging.DEBUG))
+
+        if output_filename:
+            if mime == "text/html":
+                a_output.append(MirroringItemHtml(filename=output_filename, content=content))
+            elif mime == "text/xml":
+                a_output.append(MirroringItemXml(filename=output_filename, content=content))
+            else:
+                a_output.append(MirroringItemCss(filename=output_filename, content=content))
+        return a_output
+
+    def follow_links(self, s_url, links, i_unknown_link_level=logging.DEBUG):
+        """
+        Create the requests for the links found in a document and log the external links, in sharded mode the links
+        that belong to another shard are handed off to it
+        :param s_url: the url of the document
+        :param links: the links found in the document
+        :param i_unknown_link_level: the level used to log the links that have an unknown format
+        """
+        a_handed_off_links = []
+
+        for link in links:
+            link = parse.urljoin(s_url, link)
+
+            if not re.match('^https?:|data:', link):
+                statif_logger.log(i_unknown_link_level, "Unknown external link format [%s] in %s" % (link, s_url))
+                continue
+
+            if parse.urlparse(link).netloc not in self.allowed_domains:
+                if link not in self.outURLS:
+                    self.outURLS.add(link)
+                    if self.journal is not None:
+                        self.journal.add_external_link(link)
+                    statif_logger.log(logging.INFO, "External link detected [%s] in %s" % (link, s_url))
+                    self.emit_event(EVENT_EXTERNAL_LINK, url=link, source=s_url)
+            elif self.frontier is not None and not self.frontier.is_owned(link):
+                a_handed_off_links.append(link)
+                continue
+            yield Request(link)
+
+        if a_handed_off_links:
+            self.frontier.push(a_handed_off_links, s_url)
+
+    def log_http_error(self, i_status, response):
+        """
+        Log a response with an HTTP error status
+        :param i_status: the HTTP status
+        :param response: the response
+        """
+        s_referer = response.request.headers.get('Referer', b'').decode('utf-8')
+        statif_logger.log(logging.WARNING, "HTTP error [%i] for %s from %s" % (i_status, response.url, s_referer))
+        self.emit_event(EVENT_HTTP_ERROR, code=i_status, url=response.url, source=s_referer)
+
+    def emit_event(self, s_type, **fields):
+        """
+        Write an event into the events file, if it is set
+        :param s_type: the type of the event
+        :param fields: the attributes of the event
+        """
+        if self.events is not None:
+            self.events.emit(s_type, **fields)
+
+    @staticmethod
+    def get_mime(headers):
+        """
+        :param headers: the headers of a response
+        :return: the MIME type of the Content-Type header, text/plain if it isn't specified
+        """
+        if 'Content-Type' in headers:
+            return headers['Content-Type'].decode('utf-8').split(';')[0].strip()
+        return 'text/plain'
+
+    @classmethod
+    def get_allowed_mime_types(cls):
+        """
+        :return: the list of all the MIME types of the files that will be downloaded and stored
+        """
+        return ["text/html", "text/css", "text/xml", "application/pdf"] + cls.IMG_MIME_TYPES + cls.JS_MIME_TYPES + \
+            cls.OTHER_MIME_TYPES
@@ -26,7 +26,7 @@ setup(
     author='Bureau Applicatif',
     author_email='tech-sdn-app@ssi.gouv.fr',
     description='A tool to manage static version of a website.',
-    packages=find_packages(exclude=['build', 'docs', 'tests*', 'static']),
+    packages=find_packages(exclude=['build', 'docs', 'tests*', 'benchmarks*', 'static']),
     include_package_data=True,
     package_data={
         'cornetto': [
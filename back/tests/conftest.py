@@ -0,0 +1,29 @@
+from datetime import datetime
+
+import pytest
+
+from cornetto.models import Base, open_session_db, close_session_db, get_engine
+from cornetto.models.Statification import Statification, Status
+
+
+@pytest.fixture()
+def database_uri(tmp_path):
+    s_database_uri = 'sqlite:///' + str(tmp_path / 'cornetto.db')
+    Base.metadata.create_all(get_engine(s_database_uri))
+    return s_database_uri
+
+
+@pytest.fixture()
+def session(database_uri):
+    session = open_session_db(database_uri)
+    yield session
+    close_session_db(database_uri)
+
+
+@pytest.fixture()
+def statification(session):
+    statification = Statification('', 'designation', 'description', datetime.utcnow(), datetime.utcnow(),
+                                  Status.CREATED)
+    session.add(statification)
+    session.commit()
+    return statification
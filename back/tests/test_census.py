@@ -0,0 +1,47 @@
+import os
+
+import pytest
+
+from cornetto.FileCensus import FileCensus
+
+
+@pytest.fixture()
+def repository(tmp_path):
+    s_repository = str(tmp_path / 'repository')
+    a_files = [('.git/objects/pack.html', 5000), ('index.html', 10), ('a/b/page.html', 20), ('a/file.zip', 1000),
+               ('a/README', 5), ('c/image.png', 300), ('c/d/old.zip', 40)]
+    for s_file, i_size in a_files:
+        os.makedirs(os.path.dirname(os.path.join(s_repository, s_file)), exist_ok=True)
+        with open(os.path.join(s_repository, s_file), 'wb') as f_file:
+            f_file.write(b'x' * i_size)
+    return s_repository
+
+
+def test_file_census(repository):
+    census = FileCensus(repository, i_threads=2, i_largest_files=3).scan()
+
+    # the .git directory is ignored and the files without extension are only in the largest files
+    assert census.get_scanned_files() == [('html', 2, 30), ('png', 1, 300), ('zip', 2, 1040)]
+    assert census.get_largest_files() == [('a/file.zip', 1000), ('c/image.png', 300), ('c/d/old.zip', 40)]
+
+    census = FileCensus(repository, i_largest_files=10).scan()
+    assert census.get_largest_files() == [('a/file.zip', 1000), ('c/image.png', 300), ('c/d/old.zip', 40),
+                                          ('a/b/page.html', 20), ('index.html', 10), ('a/README', 5)]
+
+
+def test_file_census_skips_unreadable_directories(repository, monkeypatch):
+    scandir = os.scandir
+
+    def scandir_without_permission(s_directory):
+        if s_directory == os.path.join(repository, 'c'):
+            raise PermissionError(13, 'Permission denied', s_directory)
+        return scandir(s_directory)
+
+    monkeypatch.setattr(os, 'scandir', scandir_without_permission)
+    census = FileCensus(repository).scan()
+
+    assert census.get_scanned_files() == [('html', 2, 30), ('zip', 1, 1000)]
+
+    # the census can't be done without the root directory
+    with pytest.raises(FileNotFoundError):
+        FileCensus(os.path.join(repository, 'missing')).scan()
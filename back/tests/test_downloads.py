@@ -0,0 +1,136 @@
+import functools
+import hashlib
+import os
+import threading
+import time
+from http.server import HTTPServer, SimpleHTTPRequestHandler
+
+import pytest
+from scrapy.http import Request
+from scrapy.utils.test import get_crawler
+from twisted.internet import reactor
+from twisted.internet.base import BlockingResolver
+from twisted.python.failure import Failure
+
+from cornetto.StatificationProcess import StatificationProcess, PARTIAL_FILE_REGEX
+from scrapy_parser.downloads import StreamingDownloadHandler
+from scrapy_parser.spiders.MirroringSpider import MirroringSpider
+
+CONTENT = os.urandom(256 * 1024)
+
+
+class SiteHandler(SimpleHTTPRequestHandler):
+    def do_GET(self):
+        self.server.a_paths.append(self.path)
+        if self.path == '/truncated.zip':
+            # the connection is closed before the end of the body
+            self.send_response(200)
+            self.send_header('Content-Type', 'application/zip')
+            self.send_header('Content-Length', str(2 * len(CONTENT)))
+            self.end_headers()
+            self.wfile.write(CONTENT)
+            return
+        super().do_GET()
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture()
+def server(tmp_path):
+    s_site = str(tmp_path / 'site')
+    os.makedirs(s_site)
+    with open(os.path.join(s_site, 'file.zip'), 'wb') as f_file:
+        f_file.write(CONTENT)
+    with open(os.path.join(s_site, 'small.zip'), 'wb') as f_file:
+        f_file.write(b'small')
+    server = HTTPServer(('127.0.0.1', 0), functools.partial(SiteHandler, directory=s_site))
+    server.a_paths = []
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    yield server
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture()
+def resolver():
+    # the names are resolved in the thread pool of the reactor, it only starts when the reactor runs
+    previous_resolver = reactor.installResolver(BlockingResolver())
+    yield
+    reactor.installResolver(previous_resolver)
+
+
+def get_result(deferred, f_timeout=30):
+    # run the reactor until the Deferred is fired
+    a_results = []
+    deferred.addBoth(a_results.append)
+    f_end = time.monotonic() + f_timeout
+    while not a_results:
+        assert time.monotonic() < f_end, 'the Deferred has not been fired'
+        reactor.iterate(0.01)
+    return a_results[0]
+
+
+def test_stream_large_response(tmp_path, server, resolver):
+    s_url = 'http://127.0.0.1:%d/' % server.server_address[1]
+    crawler = get_crawler(MirroringSpider, {'MIRRORING_STREAM_MIN_SIZE': 1024})
+    spider = MirroringSpider.from_crawler(crawler, str(tmp_path / 'output'), s_url, '127.0.0.1')
+    crawler.spider = spider
+    handler = StreamingDownloadHandler.from_crawler(crawler)
+
+    try:
+        request = Request(s_url + 'file.zip')
+        response = get_result(handler.download_request(request, spider))
+        response.request = request
+
+        # the body has been written into a temporary file of the output directory while it was downloaded
+        assert 'streamed' in response.flags
+        assert response.body == b''
+        s_temp_filename = request.meta['stream_file']
+        assert os.path.dirname(s_temp_filename) == spider.output
+        assert PARTIAL_FILE_REGEX.match(os.path.basename(s_temp_filename))
+        with open(s_temp_filename, 'rb') as f_file:
+            assert f_file.read() == CONTENT
+        assert request.meta['stream_hash'] == hashlib.sha1(CONTENT).hexdigest()
+
+        # the temporary file is moved where the file is saved, the url has been requested once
+        a_items = list(spider.parse(response))
+        assert [item['temp_filename'] for item in a_items] == [s_temp_filename]
+        a_items[0].save()
+        with open(spider.output + '/file.zip', 'rb') as f_file:
+            assert f_file.read() == CONTENT
+        assert os.listdir(spider.output) == ['file.zip']
+        assert server.a_paths == ['/file.zip']
+
+        # the small files are kept in memory
+        response = get_result(handler.download_request(Request(s_url + 'small.zip'), spider))
+        assert 'streamed' not in response.flags
+        assert response.body == b'small'
+
+        # the temporary file of a failed download is removed
+        for request in [Request(s_url + 'truncated.zip'), Request(s_url + 'file.zip', meta={'download_maxsize': 2048})]:
+            failure = get_result(handler.download_request(request, spider))
+            assert isinstance(failure, Failure)
+            assert 'stream_file' not in request.meta
+        assert os.listdir(spider.output) == ['file.zip']
+        assert server.a_paths == ['/file.zip', '/small.zip', '/truncated.zip', '/file.zip']
+    finally:
+        get_result(handler.close())
+
+
+def test_delete_partial_files(tmp_path):
+    s_repository = str(tmp_path / 'repository')
+    os.makedirs(os.path.join(s_repository, 'files'))
+    os.makedirs(os.path.join(s_repository, '.git'))
+    a_files = ['files/.0123456789abcdef0123456789abcdef.part', 'files/file.zip', 'files/report.part',
+               '.git/.0123456789abcdef0123456789abcdef.part']
+    for s_file in a_files:
+        open(os.path.join(s_repository, s_file), 'w').close()
+    statification_process = StatificationProcess(
+        s_logger='cornetto', s_repository_path=s_repository, s_python_path='', s_urls='', s_domains='',
+        s_log_file=str(tmp_path / 'statif.log'), s_project_directory='', s_database_uri='', s_pid_file='',
+        s_lock_file='', s_crawler_progress_counter_file=str(tmp_path / 'counter'))
+
+    statification_process.delete_partial_files()
+
+    assert [os.path.isfile(os.path.join(s_repository, s_file)) for s_file in a_files] == [False, True, True, True]
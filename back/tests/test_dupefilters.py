@@ -0,0 +1,83 @@
+import os
+import random
+
+from scrapy.http import Request
+
+from scrapy_parser.BLOOMDupeFilter import BLOOMDupeFilter, BLOOM_FILE
+from scrapy_parser.CompactHashSet import CompactHashSet
+from scrapy_parser.SimpleDupeFilter import SimpleDupeFilter
+
+
+def test_bloom_snapshot_round_trip(tmp_path):
+    s_job_dir = str(tmp_path / 'job')
+    a_urls = ['http://web.test/page%d.html' % i_page for i_page in range(500)]
+
+    # a small capacity so the filter grows during the crawl
+    dupe_filter = BLOOMDupeFilter(s_job_dir, i_initial_capacity=100)
+    assert not any(dupe_filter.request_seen(Request(s_url)) for s_url in a_urls[:300])
+    assert len(dupe_filter.fingerprints.filters) > 1
+    dupe_filter.close('shutdown')
+    assert os.path.isfile(os.path.join(s_job_dir, BLOOM_FILE))
+
+    # the crawl is resumed then killed, the urls seen after the snapshot are only in the journal
+    dupe_filter = BLOOMDupeFilter(s_job_dir, i_initial_capacity=100)
+    assert all(dupe_filter.request_seen(Request(s_url)) for s_url in a_urls[:300])
+    assert not any(dupe_filter.request_seen(Request(s_url)) for s_url in a_urls[300:400])
+    dupe_filter.journal.close()
+
+    dupe_filter = BLOOMDupeFilter(s_job_dir, i_initial_capacity=100)
+    assert all(dupe_filter.request_seen(Request(s_url)) for s_url in a_urls[:400])
+    # the urls are canonicalized
+    assert dupe_filter.request_seen(Request('http://web.test/page0.html#top'))
+    assert dupe_filter.request_seen(Request('http://web.test/dir/index.html')) is None
+    assert dupe_filter.request_seen(Request('http://web.test/dir/'))
+    assert not any(dupe_filter.request_seen(Request(s_url)) for s_url in a_urls[400:])
+    dupe_filter.close('finished')
+
+
+def test_compact_hash_set_resizes():
+    rand = random.Random(0)
+    a_hashes = [rand.getrandbits(64) for _ in range(5000)]
+    # hashes with the same low bits are stored in consecutive slots
+    a_hashes += [i_high << 32 for i_high in range(1, 100)]
+    hash_set = CompactHashSet(8)
+
+    assert not any(hash_set.add(i_hash) for i_hash in a_hashes)
+    assert len(hash_set.table) > 8 * 512
+    assert len(hash_set) == len(a_hashes)
+    assert all(i_hash in hash_set for i_hash in a_hashes)
+    assert all(hash_set.add(i_hash) for i_hash in a_hashes)
+    assert len(hash_set) == len(a_hashes)
+    assert not any(rand.getrandbits(64) in hash_set for _ in range(1000))
+
+
+def test_compact_hash_set_zero():
+    hash_set = CompactHashSet()
+
+    assert 0 not in hash_set
+    assert not hash_set.add(0)
+    assert 0 in hash_set
+    # the hash 0 is merged with the hash 1
+    assert 1 in hash_set
+    assert hash_set.add(1)
+    assert len(hash_set) == 1
+
+
+def test_simple_dupe_filter(tmp_path):
+    s_job_dir = str(tmp_path / 'job')
+    dupe_filter = SimpleDupeFilter(s_job_dir)
+
+    assert not dupe_filter.request_seen(Request('http://web.test/'))
+    assert dupe_filter.request_seen(Request('http://web.test'))
+    assert dupe_filter.request_seen(Request('http://web.test/index.html'))
+    assert not dupe_filter.request_seen(Request('http://web.test/page.html?b=2&a=1'))
+    assert dupe_filter.request_seen(Request('http://web.test/page.html?a=1&b=2'))
+    assert not dupe_filter.request_seen(Request('http://web.test/other.html'))
+    dupe_filter.close('shutdown')
+
+    # the seen urls are reloaded when the crawl is resumed
+    dupe_filter = SimpleDupeFilter(s_job_dir)
+    assert dupe_filter.request_seen(Request('http://web.test/index.html'))
+    assert dupe_filter.request_seen(Request('http://web.test/other.html'))
+    assert not dupe_filter.request_seen(Request('http://web.test/new.html'))
+    dupe_filter.close('finished')
@@ -0,0 +1,64 @@
+import json
+
+from cornetto.EventsIngester import EventsIngester
+from cornetto.models.ErrorTypeMIME import ErrorTypeMIME
+from cornetto.models.ExternalLink import ExternalLink
+from cornetto.models.HtmlError import HtmlError
+
+
+def get_line(s_type, **fields):
+    fields['type'] = s_type
+    return json.dumps(fields) + '\n'
+
+
+def get_counts(session, statification):
+    session.expire_all()
+    return {c_class.__name__: session.query(c_class).filter(c_class.statification_id == statification.id).count()
+            for c_class in [ExternalLink, HtmlError, ErrorTypeMIME]}
+
+
+def test_ingest_events(tmp_path, database_uri, session, statification):
+    s_events_file = str(tmp_path / 'statif.log.events.jsonl')
+    s_truncated_line = get_line('external_link', url='http://ext.test/b', source='http://web.test/page.html')
+
+    # the crawler is writing the last line
+    with open(s_events_file, 'w') as f_events_file:
+        f_events_file.write(get_line('external_link', url='http://ext.test/a', source='http://web.test/') +
+                            get_line('http_error', code=404, url='http://web.test/missing', source='http://web.test/') +
+                            get_line('external_link', url='http://ext.test/a', source='http://web.test/page.html') +
+                            get_line('stats', response_received_count=10) +
+                            s_truncated_line[:20])
+
+    EventsIngester('cornetto', database_uri, [s_events_file]).ingest(session)
+
+    assert get_counts(session, statification) == {'ExternalLink': 1, 'HtmlError': 1, 'ErrorTypeMIME': 0}
+    assert statification.nb_item == 10
+
+    with open(s_events_file, 'a') as f_events_file:
+        f_events_file.write(s_truncated_line[20:] +
+                            get_line('external_link', url='http://ext.test/a', source='http://web.test/other.html') +
+                            get_line('forbidden_content', mime='application/x-test', url='http://web.test/file'))
+
+    # a new ingester resumes from the position registered in the database, as after a restart of the application
+    ingester = EventsIngester('cornetto', database_uri, [s_events_file])
+    ingester.ingest(session)
+
+    assert get_counts(session, statification) == {'ExternalLink': 2, 'HtmlError': 1, 'ErrorTypeMIME': 1}
+    assert sorted(s_url for s_url, in session.query(ExternalLink.url)) == ['http://ext.test/a', 'http://ext.test/b']
+    assert statification.nb_item == 10
+
+    # nothing new to register
+    ingester.ingest(session)
+    assert get_counts(session, statification) == {'ExternalLink': 2, 'HtmlError': 1, 'ErrorTypeMIME': 1}
+
+    # the external links detected by another shard are registered once
+    s_shard_events_file = str(tmp_path / 'statif.log.events.jsonl.1')
+    with open(s_shard_events_file, 'w') as f_events_file:
+        f_events_file.write(get_line('external_link', url='http://ext.test/b', source='http://web.test/') +
+                            get_line('external_link', url='http://ext.test/c', source='http://web.test/') +
+                            get_line('stats', response_received_count=5))
+    ingester.a_events_files.append(s_shard_events_file)
+    ingester.ingest(session)
+
+    assert get_counts(session, statification) == {'ExternalLink': 3, 'HtmlError': 1, 'ErrorTypeMIME': 1}
+    assert statification.nb_item == 15
@@ -0,0 +1,150 @@
+import threading
+
+from sqlalchemy import event, inspect, create_engine
+from sqlalchemy.engine import Engine
+
+from cornetto.models import Base, get_engine, upgrade_database, open_session_db, close_session_db, \
+    enable_sqlite_wal, set_sqlite_pragmas
+from cornetto.models.HtmlError import HtmlError
+from cornetto.models.LargestFile import LargestFile
+from cornetto.models.Statification import BULK_INSERT_CHUNK_SIZE
+
+
+def test_add_objects_to_statification(session, statification):
+    i_rows = 2 * BULK_INSERT_CHUNK_SIZE + 10
+    # one row out of ten has no url, it is ignored and isn't counted in the chunks
+    rows = [('404', '' if i_row % 10 == 0 else 'http://web.test/%d' % i_row, 'http://web.test/')
+            for i_row in range(i_rows)]
+    i_valid_rows = i_rows - len(range(0, i_rows, 10))
+
+    a_commits = []
+    event.listen(session, 'after_commit', lambda committed_session: a_commits.append(True))
+
+    assert statification.add_objects_to_statification(HtmlError, session, rows) == i_valid_rows
+
+    # a transaction by full chunk and one for the last rows
+    assert len(a_commits) == i_valid_rows // BULK_INSERT_CHUNK_SIZE + 1
+    assert session.query(HtmlError).filter(HtmlError.statification_id == statification.id).count() == i_valid_rows
+    assert session.query(HtmlError).filter(HtmlError.url == '').count() == 0
+    assert {s_url for s_url, in session.query(HtmlError.url)} == {row[1] for row in rows if row[1]}
+
+
+def test_add_objects_to_statification_without_commit(session, statification):
+    rows = [('404', 'http://web.test/%d' % i_row, 'http://web.test/') for i_row in range(25)] + [('404', None, None)]
+
+    assert statification.add_objects_to_statification(HtmlError, session, rows, i_chunk_size=10,
+                                                      b_commit=False) == 25
+    # the rows are inserted in the transaction of the caller
+    session.rollback()
+    assert session.query(HtmlError).count() == 0
+
+
+def test_largest_files(session, statification):
+    rows = [('files/report.pdf', 1000), ('index.html', 10), ('img/photo.png', 300)]
+
+    assert statification.add_objects_to_statification(LargestFile, session, rows) == 3
+
+    # the largest file first
+    assert [largest_file.get_dict()['path'] for largest_file in
+            LargestFile.get_from_statification_id(session, statification.id)] == \
+        ['files/report.pdf', 'img/photo.png', 'index.html']
+
+
+def test_upgrade_database(tmp_path):
+    engine = get_engine('sqlite:///' + str(tmp_path / 'old.db'))
+    # the tables of a database created before the census of the files
+    engine.execute('CREATE TABLE statifications (id INTEGER NOT NULL PRIMARY KEY, "commit" VARCHAR UNIQUE, '
+                   'designation VARCHAR NOT NULL, description VARCHAR, cre_date DATETIME NOT NULL, '
+                   'upd_date DATETIME NOT NULL, status VARCHAR(9) NOT NULL, nb_item INTEGER)')
+    engine.execute('CREATE TABLE scanned_files (id INTEGER NOT NULL PRIMARY KEY, type_file VARCHAR NOT NULL, '
+                   'nb INTEGER NOT NULL, statification_id INTEGER NOT NULL REFERENCES statifications (id))')
+    engine.execute("INSERT INTO statifications VALUES (1, '', 'designation', NULL, '2019-01-01 00:00:00.000000', "
+                   "'2019-01-01 00:00:00.000000', 'STATIFIED', 10)")
+    engine.execute("INSERT INTO scanned_files VALUES (1, 'html', 2, 1)")
+
+    Base.metadata.create_all(engine)
+    upgrade_database(engine)
+
+    inspector = inspect(engine)
+    assert 'largest_files' in inspector.get_table_names()
+    assert 'size' in [column['name'] for column in inspector.get_columns('scanned_files')]
+    # the files counted by the previous version are kept, without their size
+    assert engine.execute('SELECT type_file, nb, size FROM scanned_files').fetchall() == [('html', 2, None)]
+
+
+def test_engine_shared_by_threads(database_uri):
+    engine = get_engine(database_uri)
+    assert get_engine(database_uri) is engine
+
+    session = open_session_db(database_uri)
+    assert open_session_db(database_uri) is session
+    session.execute('SELECT 1')
+
+    # another thread has its own session with the same engine
+    a_results = []
+
+    def open_other_session():
+        a_results.append((open_session_db(database_uri), get_engine(database_uri)))
+        close_session_db(database_uri)
+
+    thread = threading.Thread(target=open_other_session)
+    thread.start()
+    thread.join()
+    assert a_results[0][0] is not session
+    assert a_results[0][1] is engine
+
+    # the session of the thread is removed, its connection is given back to the pool of the shared engine
+    pool = engine.pool
+    close_session_db(database_uri)
+    assert pool.checkedout() == 0
+    assert pool.checkedin() == 1
+    assert get_engine(database_uri) is engine
+    assert engine.pool is pool
+
+    session = open_session_db(database_uri)
+    session.execute('SELECT 1')
+    # the connection of the pool is reused
+    assert pool.checkedout() == 1
+    assert pool.checkedin() == 0
+    close_session_db(database_uri)
+
+
+def test_upgrade_database_indexes(tmp_path):
+    engine = get_engine('sqlite:///' + str(tmp_path / 'old.db'))
+    # the tables of a database created before the indexes
+    Base.metadata.create_all(engine)
+    for table in Base.metadata.sorted_tables:
+        for index in table.indexes:
+            index.drop(bind=engine)
+
+    # the migration can run each time the application starts
+    upgrade_database(engine)
+    upgrade_database(engine)
+
+    inspector = inspect(engine)
+    a_indexes = [(table.name, index.name) for table in Base.metadata.sorted_tables for index in table.indexes]
+    assert ('html_errors', 'ix_html_errors_statification_id') in a_indexes
+    assert all(s_index in [index['name'] for index in inspector.get_indexes(s_table)] for s_table, s_index in a_indexes)
+
+
+def test_enable_sqlite_wal(tmp_path):
+    s_database_uri = 'sqlite:///' + str(tmp_path / 'cornetto.db')
+    enable_sqlite_wal(s_database_uri)
+    # the engine of the application
+    app_engine = create_engine(s_database_uri)
+    enable_sqlite_wal(s_database_uri, app_engine)
+    enable_sqlite_wal('sqlite://')
+
+    for engine in [get_engine(s_database_uri), app_engine]:
+        with engine.connect() as connection:
+            assert connection.execute('PRAGMA journal_mode').scalar() == 'wal'
+            assert connection.execute('PRAGMA synchronous').scalar() == 1
+            assert connection.execute('PRAGMA busy_timeout').scalar() == 30000
+
+    # the other databases are not tuned
+    assert not event.contains(Engine, 'connect', set_sqlite_pragmas)
+    for s_other_database_uri, s_journal_mode in [('sqlite:///' + str(tmp_path / 'other.db'), 'delete'),
+                                                 ('sqlite://', 'memory')]:
+        with get_engine(s_other_database_uri).connect() as connection:
+            assert connection.execute('PRAGMA journal_mode').scalar() == s_journal_mode
+            assert connection.execute('PRAGMA busy_timeout').scalar() != 30000
@@ -0,0 +1,20 @@
+from scrapy_parser.parsers import create_parser_pool, parse_document
+
+
+def test_parse_document_in_pool():
+    pool = create_parser_pool(2)
+    try:
+        future = pool.submit(parse_document, 'text/html', 'http://web.test/',
+                             b'<html><body><a href="http://web.test/page.html">page</a>'
+                             b'<img src="/img.png"></body></html>',
+                             b'http://web.test', b'', True)
+        links, content = future.result(timeout=60)
+
+        assert links == ['/page.html', '/img.png']
+        assert b'<a href="/page.html">' in content
+
+        future = pool.submit(parse_document, 'text/css', 'http://web.test/style.css',
+                             b'body { background: url("../img/bg.png"); }', b'http://web.test', b'', False)
+        assert future.result(timeout=60) == (['../img/bg.png'], None)
+    finally:
+        pool.shutdown()
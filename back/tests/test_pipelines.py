@@ -0,0 +1,53 @@
+import os
+import time
+
+from scrapy.utils.test import get_crawler
+from twisted.internet import reactor
+
+from scrapy_parser.CrawlJournal import DONE_FILE
+from scrapy_parser.items import MirroringItem
+from scrapy_parser.pipelines import MirroringPipeline
+from scrapy_parser.spiders.MirroringSpider import MirroringSpider
+
+
+def wait_for(deferred, f_timeout=30):
+    # run the reactor until the Deferred is fired, the results of the writer threads are delivered by the reactor
+    f_end = time.monotonic() + f_timeout
+    while not deferred.called:
+        assert time.monotonic() < f_end, 'the Deferred has not been fired'
+        reactor.iterate(0.01)
+
+
+def test_journal_waits_for_queued_items(tmp_path):
+    s_job_dir = str(tmp_path / 'job')
+    crawler = get_crawler(MirroringSpider, {'CRAWLER_JOB_DIR': s_job_dir})
+    spider = MirroringSpider.from_crawler(crawler, str(tmp_path / 'output'), 'http://web.test/', 'web.test')
+    pipeline = MirroringPipeline(i_threads=1, i_queue_size=1)
+
+    # the write queue is full : the first item is being written, the other ones wait for a free place
+    a_filenames = [spider.output + '/page%d.html' % i_page for i_page in range(3)] + [spider.output + '/page0.html']
+    a_results = [pipeline.process_item(MirroringItem(filename=s_filename, content=b'content %d' % i_item), spider)
+                 for i_item, s_filename in enumerate(a_filenames)]
+    spider.journal.mark_done(['http://web.test/page%d.html' % i_page for i_page in range(3)])
+
+    # every item is a pending write, even if it waits for a free place in the queue
+    assert sorted(spider.pending_writes) == sorted(set(a_filenames))
+
+    flushed = spider.flush_journal()
+    with open(os.path.join(s_job_dir, DONE_FILE)) as f_done_file:
+        assert f_done_file.read() == ''
+
+    # the writer threads start, the journal is written once the files are saved
+    pipeline.open_spider(spider)
+    wait_for(flushed)
+
+    assert all(result.called for result in a_results)
+    assert spider.pending_writes == {}
+    # the writes of a same file are done in order
+    with open(spider.output + '/page0.html', 'rb') as f_file:
+        assert f_file.read() == b'content 3'
+    with open(os.path.join(s_job_dir, DONE_FILE)) as f_done_file:
+        assert sorted(f_done_file.read().split()) == ['http://web.test/page%d.html' % i_page for i_page in range(3)]
+
+    wait_for(pipeline.close_spider(spider))
+    spider.journal.close()
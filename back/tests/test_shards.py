@@ -0,0 +1,104 @@
+import os
+
+import pytest
+
+from cornetto.StatificationProcess import StatificationProcess
+from scrapy_parser.SharedFrontier import SharedFrontier
+
+
+def get_urls_by_shard(frontier, i_shard, i_count):
+    a_urls = []
+    i_page = 0
+    while len(a_urls) < i_count:
+        s_url = 'http://web.test/page%d.html' % i_page
+        if frontier.get_shard(s_url) == i_shard:
+            a_urls.append(s_url)
+        i_page += 1
+    return a_urls
+
+
+@pytest.fixture()
+def frontiers(tmp_path):
+    s_frontier_file = str(tmp_path / 'frontier.db')
+    frontier_0 = SharedFrontier(s_frontier_file, 2, 0)
+    frontier_1 = SharedFrontier(s_frontier_file, 2, 1)
+    yield frontier_0, frontier_1
+    frontier_0.close()
+    frontier_1.close()
+
+
+def test_frontier_handoff(frontiers):
+    frontier_0, frontier_1 = frontiers
+    a_urls = get_urls_by_shard(frontier_0, 1, 3)
+
+    assert not any(frontier_0.is_owned(s_url) for s_url in a_urls)
+    assert all(frontier_1.is_owned(s_url) for s_url in a_urls)
+
+    frontier_0.push(a_urls, 'http://web.test/')
+    # the urls already in the frontier are not handed off again
+    frontier_0.push(a_urls[:1])
+
+    assert frontier_0.pop() == []
+    assert sorted(frontier_1.pop()) == sorted((s_url, 'http://web.test/') for s_url in a_urls)
+    # the urls are claimed, they are handed off only once
+    assert frontier_1.pop() == []
+
+
+def test_frontier_crawl_finished(frontiers):
+    frontier_0, frontier_1 = frontiers
+    s_url = get_urls_by_shard(frontier_0, 1, 1)[0]
+
+    # the shard 1 is idle before the shard 0 hands off an url to it
+    assert not frontier_1.is_crawl_finished()
+    frontier_0.push([s_url])
+
+    # the url is waiting in the frontier, the crawl isn't over
+    assert not frontier_0.is_crawl_finished()
+
+    # the shard 1 crawls the url, it is busy again
+    assert frontier_1.pop() == [(s_url, None)]
+    assert not frontier_0.is_crawl_finished()
+
+    # both shards are idle and no url is waiting
+    assert frontier_1.is_crawl_finished()
+    assert frontier_0.is_crawl_finished()
+
+
+def test_frontier_crawl_finished_waits_for_every_shard(tmp_path):
+    frontier_0 = SharedFrontier(str(tmp_path / 'frontier.db'), 2, 0)
+    try:
+        # the shard 1 hasn't started yet
+        assert not frontier_0.is_crawl_finished()
+    finally:
+        frontier_0.close()
+
+
+def test_merge_shards_files(tmp_path):
+    s_log_file = str(tmp_path / 'statif.log')
+    s_validators_file = str(tmp_path / 'validators.jsonl')
+    s_frontier_file = str(tmp_path / 'frontier.db')
+    statification_process = StatificationProcess(
+        s_logger='cornetto', s_repository_path='', s_python_path='', s_urls='', s_domains='', s_log_file=s_log_file,
+        s_project_directory='', s_database_uri='', s_pid_file='', s_lock_file='',
+        s_crawler_progress_counter_file=str(tmp_path / 'counter'), b_incremental=True,
+        s_validators_file=s_validators_file, i_shards=2, s_frontier_file=s_frontier_file)
+
+    with open(s_log_file, 'w') as f_log_file:
+        f_log_file.write('start\n')
+    for i_shard in range(2):
+        with open(s_log_file + '.' + str(i_shard), 'w') as f_shard_log_file:
+            # the same external link can be detected by several shards, it is deduplicated from the events files
+            f_shard_log_file.write('shard %d line 1\nINFO: External link detected [http://ext.test/] in '
+                                   'http://web.test/\n' % i_shard)
+        with open(s_validators_file + '.new.' + str(i_shard), 'w') as f_shard_validators_file:
+            f_shard_validators_file.write('{"url": "http://web.test/%d"}\n' % i_shard)
+    SharedFrontier(s_frontier_file, 2, 0).close()
+
+    statification_process.merge_shards_files()
+
+    with open(s_log_file) as f_log_file:
+        assert f_log_file.read() == 'start\nshard 0 line 1\nINFO: External link detected [http://ext.test/] in ' \
+            'http://web.test/\nshard 1 line 1\nINFO: External link detected [http://ext.test/] in http://web.test/\n'
+    with open(s_validators_file + '.new') as f_validators_file:
+        assert f_validators_file.read() == '{"url": "http://web.test/0"}\n{"url": "http://web.test/1"}\n'
+    assert sorted(os.listdir(str(tmp_path))) == ['statif.log', 'validators.jsonl.new']
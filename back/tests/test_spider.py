@@ -0,0 +1,106 @@
+import json
+import os
+
+import pytest
+from scrapy.http import HtmlResponse, Request
+from scrapy.spidermiddlewares.httperror import HttpError
+from scrapy.utils.test import get_crawler
+from twisted.internet.error import DNSLookupError
+
+from scrapy_parser.CrawlJournal import SEEN_FILE
+from scrapy_parser.middlewares import JournalMiddleware, JournalDownloaderMiddleware
+from scrapy_parser.spiders.MirroringSpider import MirroringSpider
+
+
+def get_spider(tmp_path, settings=None, **kwargs):
+    crawler = get_crawler(MirroringSpider, settings)
+    return MirroringSpider.from_crawler(crawler, str(tmp_path / 'output'), 'http://web.test/', 'web.test', **kwargs)
+
+
+def get_response(s_url, i_status=200, body=b'', headers=None, meta=None):
+    return HtmlResponse(s_url, status=i_status, body=body, headers=headers,
+                        request=Request(s_url, meta=meta or {}))
+
+
+@pytest.fixture()
+def validators_file(tmp_path):
+    s_validators_file = str(tmp_path / 'validators.jsonl')
+    with open(s_validators_file, 'w') as f_validators_file:
+        f_validators_file.write(json.dumps({
+            'url': 'http://web.test/page.html',
+            'etag': '"v1"',
+            'last_modified': None,
+            'hash': 'da39a3ee5e6b4b0d3255bfef95601890afd80709',
+            'mime': 'text/html',
+            'filename': '/page.html'
+        }) + '\n')
+    return s_validators_file
+
+
+def test_not_modified_keeps_local_file(tmp_path, validators_file):
+    spider = get_spider(tmp_path, validators_file=validators_file)
+    os.makedirs(spider.output)
+    with open(spider.output + '/page.html', 'wb') as f_local_file:
+        f_local_file.write(b'<html><body><a href="/other.html">other</a></body></html>')
+
+    a_output = list(spider.parse(get_response('http://web.test/page.html', 304, headers={'ETag': '"v2"'})))
+
+    # the links are extracted from the local file and the file isn't written again
+    assert [request.url for request in a_output] == ['http://web.test/other.html']
+    assert spider.validators.current['http://web.test/page.html']['etag'] == '"v2"'
+
+
+def test_not_modified_without_local_file(tmp_path, validators_file):
+    spider = get_spider(tmp_path, validators_file=validators_file)
+
+    a_output = list(spider.parse(get_response('http://web.test/page.html', 304)))
+
+    assert len(a_output) == 1
+    assert a_output[0].url == 'http://web.test/page.html'
+    assert a_output[0].dont_filter
+    assert a_output[0].meta['incremental_skip']
+
+
+def test_not_modified_without_validator(tmp_path, validators_file):
+    spider = get_spider(tmp_path, validators_file=validators_file)
+
+    # a 304 for an url crawled for the first time, for example after a redirect
+    a_output = list(spider.parse(get_response('http://web.test/unknown.html', 304)))
+
+    assert len(a_output) == 1
+    assert a_output[0].url == 'http://web.test/unknown.html'
+    assert a_output[0].meta['incremental_skip']
+
+    # the server answers 304 to the request without validators too, the url is not requested again
+    a_output = list(spider.parse(get_response('http://web.test/unknown.html', 304, meta={'incremental_skip': True})))
+
+    assert a_output == []
+    assert 'http://web.test/unknown.html' not in spider.validators.current
+
+
+def test_resume_skips_failed_requests(tmp_path):
+    settings = {'CRAWLER_JOB_DIR': str(tmp_path / 'job')}
+    spider = get_spider(tmp_path, settings)
+    # the urls seen by the dupe filter before the crawl is stopped
+    with open(str(tmp_path / 'job' / SEEN_FILE), 'w') as f_seen_file:
+        f_seen_file.write('http://web.test/page.html\nhttp://web.test/unknown-host.html\n'
+                          'http://web.test/moved.html\nhttp://web.test/forbidden.html\nhttp://web.test/pending.html\n')
+
+    response = get_response('http://web.test/page.html')
+    assert list(JournalMiddleware().process_spider_output(response, [], spider)) == []
+
+    # the download failed after all its retries
+    request = Request('http://web.test/redirected.html', meta={'redirect_urls': ['http://web.test/moved.html']})
+    assert JournalDownloaderMiddleware().process_exception(request, DNSLookupError(), spider) is None
+    request = Request('http://web.test/unknown-host.html')
+    assert JournalDownloaderMiddleware().process_exception(request, DNSLookupError(), spider) is None
+
+    # the response is rejected by a spider middleware
+    response = get_response('http://web.test/forbidden.html', 403)
+    assert JournalMiddleware().process_spider_exception(response, HttpError(response), spider) is None
+    spider.journal.close()
+
+    # the failed requests are not scheduled again when the crawl is resumed
+    spider = get_spider(tmp_path, settings)
+    assert [request.url for request in spider.start_requests()] == ['http://web.test/pending.html', 'http://web.test/']
+    spider.journal.close()
@@ -0,0 +1,84 @@
+import json
+import logging
+import os
+
+import pytest
+from scrapy.http import Request, Response
+from scrapy.utils.test import get_crawler
+
+from scrapy_parser.StatsExporter import StatsExporter
+
+
+@pytest.fixture()
+def exporter(tmp_path):
+    crawler = get_crawler(settings_dict={'STATS_EXPORTER_FILE': str(tmp_path / 'stats.json')})
+    return StatsExporter.from_crawler(crawler)
+
+
+def receive_response(exporter, s_content_type, f_latency):
+    request = Request('http://web.test/', meta={'download_latency': f_latency})
+    response = Response('http://web.test/', headers={'Content-Type': s_content_type}, request=request)
+    exporter.response_received(response, request, None)
+
+
+def test_stats_snapshot(exporter):
+    stats = exporter.crawler.stats
+    for s_key, i_value in [('custom_count', 10), ('downloader/response_bytes', 1000), ('mirroring/streamed_bytes', 500),
+                           ('item_scraped_count', 7), ('log_count/ERROR', 1),
+                           ('downloader/response_status_count/200', 8), ('downloader/response_status_count/404', 2),
+                           ('downloader/response_status_count/500', 1)]:
+        stats.set_value(s_key, i_value)
+    receive_response(exporter, 'text/html; charset=utf-8', 0.07)
+    receive_response(exporter, 'Text/HTML', 0.3)
+    receive_response(exporter, 'image/png', 100)
+
+    exporter.export()
+
+    with open(exporter.s_stats_file) as f_stats_file:
+        snapshot = json.load(f_stats_file)
+    assert {s_field: snapshot[s_field] for s_field in ['pages', 'bytes', 'items', 'errors', 'http_errors', 'queue',
+                                                         'in_progress', 'mime_types', 'finished']} == {
+        'pages': 10, 'bytes': 1500, 'items': 7, 'errors': 1, 'http_errors': 3, 'queue': 0, 'in_progress': 0,
+        'mime_types': {'text/html': 2, 'image/png': 1}, 'finished': False}
+    # the latencies beyond the last bucket are only in the sum and the count
+    assert snapshot['latency']['buckets']['0.05'] == 0
+    assert snapshot['latency']['buckets']['0.1'] == 1
+    assert snapshot['latency']['buckets']['0.5'] == 2
+    assert snapshot['latency']['buckets']['60'] == 2
+    assert snapshot['latency']['sum'] == 100.37
+    assert snapshot['latency']['count'] == 3
+
+    exporter.export(b_finished=True)
+    with open(exporter.s_stats_file) as f_stats_file:
+        assert json.load(f_stats_file)['finished']
+
+
+def test_stats_atomic_write(exporter, monkeypatch, caplog):
+    a_replaced = []
+    replace = os.replace
+
+    def record_replace(s_source, s_destination):
+        # the snapshot is complete before it replaces the previous one
+        with open(s_source) as f_stats_file:
+            a_replaced.append((s_source, s_destination, json.load(f_stats_file)['pages']))
+        replace(s_source, s_destination)
+    monkeypatch.setattr(os, 'replace', record_replace)
+
+    exporter.export()
+    assert a_replaced == [(exporter.s_stats_file + '.tmp', exporter.s_stats_file, 0)]
+    assert not os.path.exists(exporter.s_stats_file + '.tmp')
+
+    # a snapshot that can't be written keeps the previous one and doesn't stop the next ones
+    exporter.crawler.stats.set_value('custom_count', 5)
+    monkeypatch.setattr(exporter, 'get_snapshot', lambda b_finished: {'pages': object()})
+    with caplog.at_level(logging.WARNING, logger='statification'):
+        exporter.export()
+    assert 'could not be written' in caplog.text
+    assert not os.path.exists(exporter.s_stats_file + '.tmp')
+    with open(exporter.s_stats_file) as f_stats_file:
+        assert json.load(f_stats_file)['pages'] == 0
+
+    monkeypatch.undo()
+    exporter.export()
+    with open(exporter.s_stats_file) as f_stats_file:
+        assert json.load(f_stats_file)['pages'] == 5
@@ -0,0 +1,84 @@
+import threading
+import time
+
+import pytest
+
+from cornetto.StatusCache import StatusCache
+
+
+@pytest.fixture()
+def build_status():
+    a_calls = []
+
+    def build_status():
+        a_calls.append(True)
+        return {'calls': len(a_calls)}
+    build_status.a_calls = a_calls
+    return build_status
+
+
+def test_status_cache_stamp(tmp_path, build_status):
+    s_file = str(tmp_path / 'status.json')
+    status_cache = StatusCache(60)
+
+    assert status_cache.get([s_file], build_status) == {'calls': 1}
+    assert status_cache.get([s_file], build_status) == {'calls': 1}
+
+    # the file is created, then modified
+    with open(s_file, 'w') as f_file:
+        f_file.write('{}')
+    assert status_cache.get([s_file], build_status) == {'calls': 2}
+    assert status_cache.get([s_file], build_status) == {'calls': 2}
+    with open(s_file, 'w') as f_file:
+        f_file.write('{"isRunning": true}')
+    assert status_cache.get([s_file], build_status) == {'calls': 3}
+
+    # the requests get a copy of the snapshot
+    status_cache.get([s_file], build_status)['calls'] = 0
+    assert status_cache.get([s_file], build_status) == {'calls': 3}
+
+    status_cache.invalidate()
+    assert status_cache.get([s_file], build_status) == {'calls': 4}
+
+
+def test_status_cache_ttl(tmp_path, monkeypatch, build_status):
+    f_now = [1000.0]
+    monkeypatch.setattr(time, 'monotonic', lambda: f_now[0])
+    status_cache = StatusCache(2)
+
+    assert status_cache.get([], build_status) == {'calls': 1}
+    f_now[0] += 1.5
+    assert status_cache.get([], build_status) == {'calls': 1}
+    f_now[0] += 0.5
+    assert status_cache.get([], build_status) == {'calls': 2}
+
+    # the cache is disabled
+    status_cache = StatusCache(0)
+    assert status_cache.get([], build_status) == {'calls': 3}
+    assert status_cache.get([], build_status) == {'calls': 4}
+
+
+def test_status_cache_concurrent_readers(build_status):
+    status_cache = StatusCache(60)
+    i_threads = 8
+    barrier = threading.Barrier(i_threads)
+
+    def slow_build_status():
+        time.sleep(0.2)
+        return build_status()
+
+    a_status = []
+
+    def read_status():
+        barrier.wait()
+        a_status.append(status_cache.get([], slow_build_status))
+
+    a_threads = [threading.Thread(target=read_status) for i_thread in range(i_threads)]
+    for thread in a_threads:
+        thread.start()
+    for thread in a_threads:
+        thread.join()
+
+    # the readers waited for the status built by the first one
+    assert len(build_status.a_calls) == 1
+    assert a_status == [{'calls': 1}] * i_threads
@@ -1,3 +1,5 @@
+import base64
+import gzip
 import os
 
 import pytest
@@ -5,7 +7,9 @@ from flask import json
 from werkzeug.datastructures import Headers
 
 from cornetto.models import open_session_db
-from cornetto import create_app
+from cornetto import create_app, views
+from cornetto.models.HtmlError import HtmlError
+from cornetto.models.Statification import Statification
 
 config = {
     'DEBUG': True,
@@ -16,6 +20,7 @@ config = {
     'DOMAINS': '',
     'LOGFILE': 'tests/statif.log',
     'PROJECT_DIRECTORY': 'cornettto',
+    'PYTHONPATH': '',
     'PIDFILE': 'tests/.pid.data',
     'LOCKFILE': 'tests/.lock_access',
     'STATUS_BACKGROUND': 'tests/.status_background.json',
@@ -61,6 +66,7 @@ def test_statification_status(setup_module, setup_fonction):
     assert not data['isLocked']
     assert not data['isRunning']
     assert data['nbItemToCrawl'] == 100
+    assert not data['isResumable']
     assert data['status'] == 3
     assert data['statusBackground'] == {}
     assert data['status_code'] == 200
@@ -86,3 +92,225 @@ def test_do_start_statif(setup_module, setup_fonction):
 
     data = json.loads(r.get_data())
     assert data['status_code'] == 200
+
+
+def test_do_resume_statif(setup_module, setup_fonction):
+    r = setup_fonction['client'].post(
+        '/api/statification/resume',
+        headers=Headers([
+            ('X-Forwarded-User', setup_fonction['x_forwarded_user'])
+        ])
+    )
+
+    assert r.status_code == 200
+
+    data = json.loads(r.get_data())
+    assert not data['success']
+    assert data['error'] == 'no_statification_to_resume'
+
+
+def test_statification_events(setup_module, setup_fonction):
+    r = setup_fonction['client'].get(
+        '/api/statification/events?duration=0'
+    )
+
+    assert r.status_code == 200
+    assert r.mimetype == 'text/event-stream'
+
+    # the stream starts with the current status
+    a_events = r.get_data(as_text=True).split('\n\n')
+    assert a_events[0] == 'retry: 2000'
+    assert a_events[1].startswith('event: status\ndata: ')
+
+    data = json.loads(a_events[1][len('event: status\ndata: '):])
+    assert not data['isRunning']
+    assert data['statusBackground'] == {}
+
+
+def test_statification_events_progress(setup_module, monkeypatch):
+    app = create_app(None, dict(config, STATUS_CACHE_TTL=60))
+    monkeypatch.setattr(app.statifProcess, 'is_running', lambda: True)
+    a_counts = []
+
+    def get_current_statif_counts():
+        a_counts.append(True)
+        return {'html_errors': 3}
+    monkeypatch.setattr(views, 'get_current_statif_counts', get_current_statif_counts)
+    monkeypatch.setattr(views, 'EVENTS_INTERVAL', 0.05)
+
+    r = app.test_client().get(
+        '/api/statification/events?duration=0.5'
+    )
+
+    # the status is checked about ten times, the counts are read from the snapshot and sent once as they don't change
+    a_events = r.get_data(as_text=True).split('\n\n')
+    assert [s_event.split('\n')[0] for s_event in a_events] == ['retry: 2000', 'event: status', 'event: progress', '']
+    progress = json.loads(a_events[2][len('event: progress\ndata: '):])
+    assert progress['counts'] == {'html_errors': 3}
+    assert progress['crawlStats']['pages'] == 0
+    assert len(a_counts) == 1
+
+
+def test_metrics(setup_module, setup_fonction):
+    setup_fonction['client'].get(
+        '/api/statification/count'
+    )
+    r = setup_fonction['client'].get(
+        '/metrics'
+    )
+
+    assert r.status_code == 200
+    assert r.mimetype == 'text/plain'
+
+    s_metrics = r.get_data(as_text=True)
+    assert '# TYPE cornetto_http_request_duration_seconds histogram' in s_metrics
+    assert 'cornetto_http_request_duration_seconds_count{method="GET",route="/api/statification/count",status="200"}' \
+        in s_metrics
+    assert 'cornetto_crawl_running 0' in s_metrics
+
+
+def test_profiling(setup_module):
+    client = create_app(None, dict(config, PROFILING=True, PROFILING_ROUTES=['/api/statification/count'])).test_client()
+    client.get(
+        '/api/statification/count'
+    )
+    client.get(
+        '/api/statification/list'
+    )
+    r = client.get(
+        '/api/profiling/routes?sort=time&limit=5'
+    )
+
+    data = json.loads(r.data)
+    assert data['success']
+    assert [route['route'] for route in data['routes']] == ['/api/statification/count']
+    assert data['routes'][0]['requests'] == 1
+    assert 0 < len(data['routes'][0]['hotspots']) <= 5
+
+    r = client.get(
+        '/api/profiling/crawl?commit='
+    )
+
+    data = json.loads(r.data)
+    assert not data['success']
+    assert data['error'] == 'profile_not_found'
+
+
+@pytest.fixture()
+def collections_client(database_uri, session, statification):
+    rows = [('404', 'http://web.test/missing%d.html' % i_row, 'http://web.test/' if i_row < 3 else 'http://web.test/a')
+            for i_row in range(5)] + [('500', 'http://web.test/error%d.html' % i_row, 'http://web.test/')
+                                      for i_row in range(2)]
+    statification.add_objects_to_statification(HtmlError, session, rows)
+    return create_app(None, dict(config, DATABASE_URI=database_uri)).test_client()
+
+
+def test_statification_collection_pages(collections_client):
+    r = collections_client.get(
+        '/api/statification/html_errors?commit=&limit=3'
+    )
+
+    assert r.status_code == 200
+    data = json.loads(r.data)
+    assert [html_error['url'] for html_error in data['html_errors']] == \
+        ['http://web.test/missing0.html', 'http://web.test/missing1.html', 'http://web.test/missing2.html']
+    assert data['next'] is not None
+
+    # the next pages start after the last object of the previous one
+    a_urls = [html_error['url'] for html_error in data['html_errors']]
+    while data['next'] is not None:
+        data = json.loads(collections_client.get(
+            '/api/statification/html_errors?commit=&limit=3&after=' + data['next']
+        ).data)
+        a_urls += [html_error['url'] for html_error in data['html_errors']]
+    assert a_urls == ['http://web.test/missing%d.html' % i_row for i_row in range(5)] + \
+        ['http://web.test/error%d.html' % i_row for i_row in range(2)]
+
+    # the filters and the sort are kept from page to page
+    data = json.loads(collections_client.get(
+        '/api/statification/html_errors?commit=&limit=1&error_code=404&source=/a&order=error_code&sort=desc'
+    ).data)
+    assert [html_error['url'] for html_error in data['html_errors']] == ['http://web.test/missing4.html']
+    data = json.loads(collections_client.get(
+        '/api/statification/html_errors?commit=&limit=1&error_code=404&source=/a&order=error_code&sort=desc&after=' +
+        data['next']
+    ).data)
+    assert [html_error['url'] for html_error in data['html_errors']] == ['http://web.test/missing3.html']
+
+
+def test_statification_collection_bad_cursor(collections_client):
+    for s_cursor in ['not-a-cursor', base64.urlsafe_b64encode(b'{"id": 1}').decode('ascii')]:
+        r = collections_client.get(
+            '/api/statification/html_errors?commit=&after=' + s_cursor
+        )
+
+        data = json.loads(r.data)
+        assert not data['success']
+        assert data['error'] == 'parameter_unvalid'
+
+
+def test_statification_summary(collections_client):
+    r = collections_client.get(
+        '/api/statification/summary?commit='
+    )
+
+    assert r.status_code == 200
+    summary = json.loads(r.data)['summary']
+    assert summary['html_errors']['total'] == 7
+    assert summary['html_errors']['error_code'] == [{'error_code': '404', 'count': 5},
+                                                    {'error_code': '500', 'count': 2}]
+    assert summary['html_errors']['source'] == [{'source': 'http://web.test/', 'count': 5},
+                                                {'source': 'http://web.test/a', 'count': 2}]
+    assert summary['external_links']['total'] == 0
+
+    # drill down into the 404 errors, counted by source
+    r = collections_client.get(
+        '/api/statification/summary?commit=&collection=html_errors&error_code=404'
+    )
+
+    summary = json.loads(r.data)['summary']
+    assert list(summary) == ['html_errors']
+    assert summary['html_errors'] == {'total': 5, 'source': [{'source': 'http://web.test/', 'count': 3},
+                                                             {'source': 'http://web.test/a', 'count': 2}]}
+
+
+def test_statification_report(database_uri, session, statification):
+    s_commit = 'a' * 40
+    statification.add_objects_to_statification(HtmlError, session, [('404', 'http://web.test/missing.html',
+                                                                     'http://web.test/')])
+    Statification.upd_commit(session, '', s_commit)
+    client = create_app(None, dict(config, DATABASE_URI=database_uri)).test_client()
+
+    # the report is sent compressed to the clients that accept gzip, each representation has its own ETag
+    r = client.get('/api/statification?commit=' + s_commit, headers={'Accept-Encoding': 'gzip'})
+    assert r.status_code == 200
+    assert r.headers['Content-Encoding'] == 'gzip'
+    s_gzip_etag = r.headers['ETag']
+    data = json.loads(gzip.decompress(r.data))
+    assert [html_error['url'] for html_error in data['html_errors']] == ['http://web.test/missing.html']
+
+    r = client.get('/api/statification?commit=' + s_commit)
+    assert r.status_code == 200
+    assert 'Content-Encoding' not in r.headers
+    s_etag = r.headers['ETag']
+    assert json.loads(r.data) == data
+    assert s_gzip_etag == s_etag[:-1] + '-gzip"'
+
+    # the client already has the report
+    for s_accept_encoding, s_if_none_match in [('gzip', s_gzip_etag), ('identity', s_etag)]:
+        r = client.get('/api/statification?commit=' + s_commit,
+                       headers={'Accept-Encoding': s_accept_encoding, 'If-None-Match': s_if_none_match})
+        assert r.status_code == 304
+        assert r.data == b''
+
+    # the ETag of the other representation doesn't match
+    r = client.get('/api/statification?commit=' + s_commit, headers={'If-None-Match': s_gzip_etag})
+    assert r.status_code == 200
+
+    # an unknown statification has no report
+    r = client.get('/api/statification?commit=' + 'b' * 40)
+    assert r.status_code == 200
+    assert 'ETag' not in r.headers
+    data = json.loads(r.data)
+    assert data['statification'] is None
+    assert data['html_errors'] is None